@@ -1,4 +1,9 @@
 import cv2, json
+import numpy as np
+
+from aws_rekognition_library.faces import load_face_table
+from aws_rekognition_library.render import face_colors, emotion_labels, label_rows, draw_faces
+from open_cv_library.anonymize import anonymize_region
 
 def user_options():
     print("*********************************************")
@@ -76,35 +81,26 @@ def save_new_image(option):
         print(f"Error processing image: {e}")
 
 
-# Applies a blur to faces detected in an image using information from a JSON file
-# If a filter is provided, only blurs faces that match the filter condition
-def apply_blur_to_faces(image, json_route, filter_18=None):
-    with open(json_route, 'r') as file:
-        data = json.load(file)
-
-    if "FaceDetails" not in data or not data["FaceDetails"]:
-        raise ValueError("Required information was not found in the specified JSON file :(")
+# Applies a blur to faces detected in an image using information from a JSON file (or an already parsed response)
+# If a filter is provided, only blurs faces that match the filter condition: a function that receives the face of the
+# JSON, or a boolean array with one value per face of the FaceTable
+# 'method' is one of the anonymization methods of open_cv_library/anonymize.py
+def apply_blur_to_faces(image, json_route, filter_18=None, method="gaussian"):
+    table = load_face_table(json_route)
 
     image_height, image_width, _ = image.shape
 
-    for face in data["FaceDetails"]:
-        if filter_18 and not filter_18(face):
-            continue
-
-        bounding_box = face.get("BoundingBox", {})
-        if not bounding_box:
-            continue
+    # Calculates pixel coordinates based on image size
+    boxes = table.pixel_boxes(image_width, image_height)
 
-        # Calculates pixel coordinates based on image size
-        x = int(bounding_box["Left"] * image_width)
-        y = int(bounding_box["Top"] * image_height)
-        width = int(bounding_box["Width"] * image_width)
-        height = int(bounding_box["Height"] * image_height)
+    if callable(filter_18):
+        boxes = boxes[np.array([bool(filter_18(face)) for face in table.records], dtype=bool)]
+    elif filter_18 is not None:
+        boxes = boxes[np.asarray(filter_18, dtype=bool)]
 
-        # Applies a Gaussian blur to the face region
-        face_region = image[y:y + height, x:x + width]
-        blurred_face = cv2.GaussianBlur(face_region, (51, 51), 30)
-        image[y:y + height, x:x + width] = blurred_face
+    for x, y, width, height in boxes:
+        # Anonymizes the face region, with a kernel scaled to its size
+        anonymize_region(image, x, y, width, height, method)
 
     return image
 
@@ -116,134 +112,64 @@ def blur_faces(image, json_route):
 
 # Blur only the faces of people under 18 in the image
 def blur_under_18_faces(image, json_route):
-
-    def is_under_18(face):
-        age_range = face.get("AgeRange", {})
-        return age_range.get("Low", 0) < 18
-
-    return apply_blur_to_faces(image, json_route, is_under_18)
+    table = load_face_table(json_route)
+    return apply_blur_to_faces(image, table, table.age_low < 18)
 
 
 # Draw rectangles around faces detected in the image and assign them a color based on age and gender
+# Colors, emotions and label positions are computed for the whole table at once, then every face is drawn in order
 def get_square_on_faces(image, json_route):
-    with open(json_route, 'r') as file:
-        data = json.load(file)
-
-    if "FaceDetails" not in data or not data["FaceDetails"]:
-        raise ValueError("Required information was not found in the specified JSON file :(")
+    table = load_face_table(json_route)
 
     image_height, image_width, _ = image.shape
+    boxes = table.pixel_boxes(image_width, image_height)
 
-    for face in data["FaceDetails"]:
-        bounding_box = face.get("BoundingBox", {})
-        if not bounding_box:
-            continue
-
-        x = int(bounding_box["Left"] * image_width)
-        y = int(bounding_box["Top"] * image_height)
-        width = int(bounding_box["Width"] * image_width)
-        height = int(bounding_box["Height"] * image_height)
-
-        # Determine the color according to age and gender
-        age_range = face.get("AgeRange", {})
-        min_age = age_range.get("Low", 0)
-        gender = face.get("Gender", {}).get("Value", "Unknown")
-        emotions = face.get("Emotions", [])
-
-        if min_age < 18:
-            color = (0, 255, 255)
-        elif gender == "Male":
-             color = (0, 0, 255)
-        elif gender == "Female":
-            color = (0, 255, 0)
-        else:
-            color = (255, 255, 255)
-
-        # Draw a rectangle around the face
-        cv2.rectangle(image, (x, y), (x + width, y + height), color, 2)
-
+    # Yellow for minors, then by gender
+    colors = face_colors(table, table.age_low < 18, (0, 255, 255))
 
-        emotion_text = ""
-        if emotions:
-            # Sort the emotions by 'Confidence' level and select two highest
-            emotions_sorted = sorted(emotions, key=lambda emotion: emotion["Confidence"], reverse=True)[:2]
-            emotion_text = ", ".join(f"{e['Type']} ({e['Confidence']:.1f}%)" for e in emotions_sorted)
+    # The label with the two emotions of highest confidence goes over the face, or under it near the top border
+    emotions = (emotion_labels(table, 2), label_rows(boxes, 10, 20, 20))
 
-        # Defines the position of the label
-        label_position = (x, y - 10 if y > 20 else y + height + 20)
-        cv2.putText(image, emotion_text, label_position, cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1, cv2.LINE_AA)
-
-    return image
+    return draw_faces(image, boxes, colors, [emotions])
 
 
 # Function that labels faces in an image and saves the information to a JSON file
-def apply_labels_to_image(image, json_route, save_json):
-    with open(json_route, 'r') as file:
-        data = json.load(file)
+# The names are asked to the user unless they are given in 'labels' (one per face, in the order of the JSON)
+# With verbose=False the route of the saved JSON is not printed (e.g. in the workers of the manifest runner)
+def apply_labels_to_image(image, json_route, save_json, labels=None, verbose=True):
+    table = load_face_table(json_route)
 
-    if "FaceDetails" not in data or not data["FaceDetails"]:
-        raise ValueError("Required information was not found in the specified JSON file :(")
+    # The table is shared between calls, so the names are stored in a copy of the response
+    data = dict(table.response, FaceDetails=[dict(face) for face in table.response["FaceDetails"]])
 
     image_height, image_width, _ = image.shape
-    labeled_faces = []
-
-    for i, face in enumerate(data["FaceDetails"]):
-        bounding_box = face.get("BoundingBox", {})
-        if not bounding_box:
-            continue
+    boxes = table.pixel_boxes(image_width, image_height)
 
-        x = int(bounding_box["Left"] * image_width)
-        y = int(bounding_box["Top"] * image_height)
-        width = int(bounding_box["Width"] * image_width)
-        height = int(bounding_box["Height"] * image_height)
+    names = []
+    for row, (x, y) in enumerate(boxes[:, :2].tolist()):
+        face = data["FaceDetails"][table.indices[row]]
 
         # Ask user for a label/name
-        label = input(f"Enter a name for face {i + 1} at position ({x}, {y}): ").strip()
-        face["Name"] = label  # Store the name in JSON
-
-        # Determine if the person is a minor and blur the face if needed
-        is_minor = False
-        if "AgeRange" in face:
-            age_max = face["AgeRange"].get("High", 100)
-            if age_max < 18:
-                is_minor = True
-                face_region = image[y:y + height, x:x + width]
-                blurred_face = cv2.GaussianBlur(face_region, (51, 51), 30)
-                image[y:y + height, x:x + width] = blurred_face
-
-        # Assign rectangle color based on age and gender
-        if is_minor:
-            color = (255, 0, 0)  # Blue for minors
-        elif face.get("Gender", {}).get("Value") == "Male":
-            color = (0, 0, 255)  # Red for males
-        elif face.get("Gender", {}).get("Value") == "Female":
-            color = (0, 255, 0)  # Green for females
+        if labels is None:
+            label = input(f"Enter a name for face {table.indices[row] + 1} at position ({x}, {y}): ").strip()
         else:
-            color = (255, 255, 255)  # White for unknown
-
-        # Draw rectangle around the face
-        cv2.rectangle(image, (x, y), (x + width, y + height), color, 2)
-
-        # Extract emotion text
-        emotions = face.get("Emotions", [])
-        if emotions:
-            emotions_sorted = sorted(emotions, key=lambda e: e["Confidence"], reverse=True)[:2]
-            emotion_text = ", ".join(f"{e['Type']} ({e['Confidence']:.1f}%)" for e in emotions_sorted)
-        else:
-            emotion_text = "No emotion data"
+            label = labels[row].strip() if row < len(labels) else ""
+        face["Name"] = label  # Store the name in JSON
+        names.append(label)
 
-        # Position text labels
-        label_position = (x, y - 10 if y > 20 else y + height + 20)
-        emotion_position = (x, y - 30 if y > 40 else y + height + 40)
-        cv2.putText(image, label, label_position, cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1, cv2.LINE_AA)
-        cv2.putText(image, emotion_text, emotion_position, cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1, cv2.LINE_AA)
+    # Minors are blurred and get a blue rectangle, the rest are colored by gender
+    minors = table.age_high < 18
+    colors = face_colors(table, minors, (255, 0, 0))
 
-        # Store labeled face information
-        labeled_faces.append(face)
+    # The name goes right over the face and the emotions over the name (or both under the face near the top border)
+    lines = [(names, label_rows(boxes, 10, 20, 20)),
+             (emotion_labels(table, 2, "No emotion data"), label_rows(boxes, 30, 40, 40))]
+    draw_faces(image, boxes, colors, lines, blur=minors)
 
         # Save updated JSON
     with open(save_json, 'w') as file:
         json.dump(data, file, indent=4)
 
-    print(f"Labeled face data saved in --> {save_json}")
+    if verbose:
+        print(f"Labeled face data saved in --> {save_json}")
     return image
@@ -0,0 +1,158 @@
+import argparse, csv, json, os, time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from aws_rekognition_library.aws_images import (blur_faces, blur_under_18_faces, get_square_on_faces,
+                                                apply_labels_to_image)
+
+OPERATIONS = {
+    "blur": blur_faces,
+    "blur_under_18": blur_under_18_faces,
+    "square_face": get_square_on_faces,
+    "apply_labels": apply_labels_to_image,
+}
+
+# Function that reads a manifest with one row per image: CSV with a header, or JSONL with one object per line
+# Columns: image, json, operation and, optionally, output, save_json and labels ('|'-separated in CSV, a list in JSONL)
+def read_manifest(manifest_route):
+    with open(manifest_route, 'r', newline='') as file:
+        if manifest_route.lower().endswith(('.jsonl', '.ndjson')):
+            rows = [json.loads(line) for line in file if line.strip()]
+        else:
+            rows = list(csv.DictReader(file))
+
+    for row in rows:
+        if isinstance(row.get("labels"), str):
+            row["labels"] = row["labels"].split('|') if row["labels"] else []
+
+        missing = [column for column in ("image", "json", "operation") if not row.get(column)]
+        if missing:
+            raise ValueError(f"Manifest row {row} has no {', '.join(missing)}")
+
+    return rows
+
+# Function that returns the folder the images of the manifest are relative to: the deepest one containing all of them
+def images_root(rows):
+    try:
+        return os.path.commonpath([os.path.dirname(os.path.abspath(row["image"])) for row in rows])
+    except ValueError:
+        return None  # Images on different drives
+
+# Function that fills the outputs the rows do not give: '<stem>_<operation>.jpg' (and '<stem>_labels.json' for
+# apply_labels) under the path of the image relative to the other images, so images with the same name in different
+# folders do not overwrite each other. A name already taken by an earlier row (e.g. a repeated row) gets the index of
+# the row. Outputs given in the manifest that repeat raise ValueError, since the rows would overwrite each other
+def assign_outputs(rows, output_dir):
+    root = images_root(rows)
+    taken = {}
+
+    def claim(route, index, default):
+        if os.path.abspath(route) in taken:
+            if not default:
+                raise ValueError(f"Manifest rows {taken[os.path.abspath(route)]} and {index} write the same file "
+                                 f"{route}")
+            stem, extension = os.path.splitext(route)
+            route = f"{stem}_{index}{extension}"
+        taken[os.path.abspath(route)] = index
+        return route
+
+    # The routes given in the manifest are claimed first, so a default never takes them
+    for index, row in enumerate(rows):
+        if row.get("output"):
+            # Ensure that the output file has a valid extension
+            if not row["output"].endswith(('.jpg', '.jpeg', '.png', '.bmp')):
+                row["output"] += '.jpg'
+            row["output"] = claim(row["output"], index, False)
+        if row.get("save_json") and row["operation"] == "apply_labels":
+            row["save_json"] = claim(row["save_json"], index, False)
+
+    for index, row in enumerate(rows):
+        image = os.path.splitext(os.path.abspath(row["image"]))[0]
+        stem = os.path.join(output_dir, os.path.relpath(image, root) if root else os.path.basename(image))
+
+        if not row.get("output"):
+            row["output"] = claim(f"{stem}_{row['operation']}.jpg", index, True)
+        if not row.get("save_json") and row["operation"] == "apply_labels":
+            row["save_json"] = claim(f"{stem}_labels.json", index, True)
+
+    return rows
+
+# Function that processes one row of the manifest (with its outputs, see assign_outputs) and returns its result
+# It never raises
+def run_row(row):
+    start = time.perf_counter()
+    save_route = row["output"]
+    result = {"image": row["image"], "operation": row["operation"], "output": None, "ok": False, "error": None}
+
+    try:
+        if row["operation"] not in OPERATIONS:
+            raise ValueError(f"Invalid operation: {row['operation']}. Choose between {', '.join(OPERATIONS)}")
+
+        img = cv2.imread(row["image"])
+        if img is None:
+            raise ValueError("The image could not be read from the specified path! :(")
+
+        if row["operation"] == "apply_labels":
+            img = apply_labels_to_image(img, row["json"], row["save_json"], row.get("labels") or [], verbose=False)
+        else:
+            img = OPERATIONS[row["operation"]](img, row["json"])
+
+        if not cv2.imwrite(save_route, img):
+            raise ValueError(f"The image could not be saved in {save_route}")
+
+        result.update(output=save_route, ok=True)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+# Function that runs every row of a manifest on a pool of processes and writes a summary JSON with the result and
+# the time of every row and the error count. Returns the summary
+def run_manifest(manifest_route, output_dir, workers=None, summary_route=None):
+    rows = assign_outputs(read_manifest(manifest_route), output_dir)
+    for directory in {os.path.dirname(row[column]) for row in rows for column in ("output", "save_json")
+                      if row.get(column)} - {''} | {output_dir}:
+        os.makedirs(directory, exist_ok=True)
+    start = time.perf_counter()
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(run_row, rows, chunksize=max(1, len(rows) // (workers * 4))))
+
+    summary = {
+        "manifest": manifest_route,
+        "rows": len(results),
+        "processed": sum(result["ok"] for result in results),
+        "errors": sum(not result["ok"] for result in results),
+        "seconds": time.perf_counter() - start,
+        "results": results,
+    }
+
+    with open(summary_route or os.path.join(output_dir, "summary.json"), 'w') as file:
+        json.dump(summary, file, indent=4)
+
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply the Rekognition annotation tools to the rows of a manifest")
+    parser.add_argument('manifest', help="CSV or JSONL with image, json and operation columns")
+    parser.add_argument('output_dir')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--summary', default=None, help="Summary JSON path (default: OUTPUT_DIR/summary.json)")
+    args = parser.parse_args(argv)
+
+    summary = run_manifest(args.manifest, args.output_dir, args.workers, args.summary)
+
+    for result in summary["results"]:
+        status = "OK   " if result["ok"] else "ERROR"
+        print(f"{status} {result['operation']:<14} {result['image']} ({result['seconds'] * 1000:.1f} ms)"
+              f"{' ' + result['error'] if result['error'] else ''}")
+
+    print(f"\n{summary['processed']} processed, {summary['errors']} errors in {summary['seconds']:.2f} s")
+
+    return 1 if summary["errors"] else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,117 @@
+import json, os, threading
+from collections import OrderedDict
+
+import numpy as np
+
+GENDERS = ("Unknown", "Male", "Female")
+
+# Compact, array-backed view of the faces of a Rekognition DetectFaces response: one row per face with a BoundingBox
+# A response with an empty 'FaceDetails' (an image without faces) is a table of zero rows
+class FaceTable:
+
+    def __init__(self, response):
+        if not isinstance(response.get("FaceDetails"), list):
+            raise ValueError("Required information was not found in the specified JSON file :(")
+
+        self.response = response
+        self.indices = [i for i, face in enumerate(response["FaceDetails"]) if face.get("BoundingBox")]
+        self.records = [response["FaceDetails"][i] for i in self.indices]
+
+        count = len(self.records)
+        self.boxes = np.zeros((count, 4), dtype=np.float64)  # Left, Top, Width, Height (normalized)
+        self.age_low = np.zeros(count, dtype=np.int16)
+        self.age_high = np.full(count, 100, dtype=np.int16)
+        self.gender = np.zeros(count, dtype=np.int8)  # Index in GENDERS
+
+        emotion_types = {}
+        emotion_rows = []
+
+        for row, face in enumerate(self.records):
+            box = face["BoundingBox"]
+            self.boxes[row] = (box["Left"], box["Top"], box["Width"], box["Height"])
+
+            age_range = face.get("AgeRange", {})
+            self.age_low[row] = age_range.get("Low", 0)
+            self.age_high[row] = age_range.get("High", 100)
+
+            gender = face.get("Gender", {}).get("Value", "Unknown")
+            self.gender[row] = GENDERS.index(gender) if gender in GENDERS else 0
+
+            for emotion in face.get("Emotions", []):
+                column = emotion_types.setdefault(emotion["Type"], len(emotion_types))
+                emotion_rows.append((row, column, emotion["Confidence"]))
+
+        # Confidence of every emotion type per face, -1 where the face has no value for that type
+        self.emotion_types = tuple(emotion_types)
+        self.emotions = np.full((count, len(self.emotion_types)), -1, dtype=np.float32)
+        for row, column, confidence in emotion_rows:
+            self.emotions[row, column] = confidence
+
+    def __len__(self):
+        return len(self.records)
+
+    # Converts the normalized boxes into pixel boxes (x, y, w, h) as an int32 (N, 4) array, clipped to the image
+    def pixel_boxes(self, image_width, image_height):
+        scale = np.array([image_width, image_height, image_width, image_height], dtype=np.float64)
+        boxes = np.trunc(self.boxes * scale).astype(np.int32)
+
+        x0 = np.clip(boxes[:, 0], 0, image_width)
+        y0 = np.clip(boxes[:, 1], 0, image_height)
+        x1 = np.clip(boxes[:, 0] + boxes[:, 2], 0, image_width)
+        y1 = np.clip(boxes[:, 1] + boxes[:, 3], 0, image_height)
+
+        return np.stack([x0, y0, np.maximum(x1 - x0, 0), np.maximum(y1 - y0, 0)], axis=1).astype(np.int32)
+
+    # Returns the columns of the 'count' emotions with the highest confidence of every face and their confidences,
+    # both (N, count) and sorted by confidence. Only those columns are sorted: argpartition selects them first
+    def top_emotion_columns(self, count=2):
+        count = min(count, self.emotions.shape[1])
+        if count == 0:
+            return np.zeros((len(self), 0), dtype=np.intp), np.zeros((len(self), 0), dtype=np.float32)
+
+        columns = self.emotions.shape[1]
+        if count < columns:
+            candidates = np.argpartition(-self.emotions, count - 1, axis=1)[:, :count]
+        else:
+            candidates = np.broadcast_to(np.arange(columns), self.emotions.shape)
+
+        # Sort the selected columns by confidence (descending), the lowest column first on ties
+        confidences = np.take_along_axis(self.emotions, candidates, axis=1)
+        order = np.lexsort((candidates, -confidences), axis=1)
+        return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(confidences, order, axis=1)
+
+# Number of parsed JSON files kept in memory (every table holds its whole response)
+TABLE_CACHE_SIZE = 32
+
+_tables = OrderedDict()
+_lock = threading.Lock()
+
+# Function that parses a Rekognition JSON file into a FaceTable only once: the last TABLE_CACHE_SIZE tables are
+# memoized by file path, modification time and size, so a changed file is parsed again and the least recently used
+# tables are dropped, keeping memory flat in runs over many JSONs
+# An already parsed response (dict) or a FaceTable are also accepted, e.g. records of a streamed dump
+def load_face_table(json_route):
+    if isinstance(json_route, FaceTable):
+        return json_route
+    if isinstance(json_route, dict):
+        return FaceTable(json_route)
+
+    route = os.path.abspath(json_route)
+    stat = os.stat(route)
+    key = (route, stat.st_mtime_ns, stat.st_size)
+
+    with _lock:
+        table = _tables.get(key)
+        if table is not None:
+            _tables.move_to_end(key)
+            return table
+
+    with open(json_route, 'r') as file:
+        table = FaceTable(json.load(file))
+
+    with _lock:
+        _tables[key] = table
+        while len(_tables) > TABLE_CACHE_SIZE:
+            _tables.popitem(last=False)
+
+    return table
@@ -0,0 +1,174 @@
+import argparse, json, os, tempfile, time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from open_cv_library.batch import list_images, source_root
+from open_cv_library.cache import ResultCache
+from open_cv_library.cascades import get_cascade, FACE_CASCADE, EYE_CASCADE
+from open_cv_library.images import detect_faces, image_size, load_image
+from open_cv_library.watch import sidecar_route
+
+# Name of the detector in the cache keys: a new version invalidates the cached responses
+DETECTOR = "haar-detect-faces-v1"
+
+
+# Function that detects the faces of an image with the bundled Haar cascades and returns them as the 'FaceDetails' of
+# a Rekognition DetectFaces response: a normalized 'BoundingBox' per face and, when 'eyes' is True and the eye cascade
+# finds them, 'eyeLeft'/'eyeRight' landmarks. Age, gender and emotions are not estimated, so those keys are absent and
+# the annotation tools use their defaults (e.g. blur_under_18_faces treats every face as a minor)
+def detect_face_details(image, max_side=None, min_size=None, eyes=True):
+    gray_image = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    image_height, image_width = gray_image.shape
+    eye_cascade = get_cascade(EYE_CASCADE) if eyes else None
+    details = []
+
+    for x, y, w, h in detect_faces(gray_image, get_cascade(FACE_CASCADE), max_side, min_size=min_size):
+        face = {"BoundingBox": {"Width": w / image_width, "Height": h / image_height, "Left": x / image_width,
+                                "Top": y / image_height}}
+
+        if eye_cascade is not None:
+            # The eyes are looked for in the upper half of the face, the two largest ones from left to right
+            found = eye_cascade.detectMultiScale(gray_image[y:y + h // 2, x:x + w], 1.1, 5)
+            found = sorted(sorted(found, key=lambda eye: eye[2] * eye[3], reverse=True)[:2], key=lambda eye: eye[0])
+
+            if len(found) == 2:
+                face["Landmarks"] = [{"Type": name, "X": (x + ex + ew / 2) / image_width,
+                                      "Y": (y + ey + eh / 2) / image_height}
+                                     for name, (ex, ey, ew, eh) in zip(("eyeLeft", "eyeRight"), found)]
+
+        details.append(face)
+
+    return details
+
+
+# Function that returns the DetectFaces response of an image file (or encoded bytes). An image without faces gives an
+# empty 'FaceDetails', which the annotation tools read as zero faces (the image is returned unchanged)
+# With 'max_side' a JPEG is decoded directly at a reduced resolution: the boxes are normalized, so they do not change
+def detect_response(image_route_in, max_side=None, min_size=None, eyes=True):
+    size = image_size(image_route_in) if max_side else None
+    gray_image = load_image(image_route_in, max_side / max(size) if size else None, gray=True)
+
+    if min_size and size:
+        factor = max(gray_image.shape) / max(size)
+        min_size = (max(int(min_size[0] * factor), 1), max(int(min_size[1] * factor), 1))
+
+    return {"FaceDetails": detect_face_details(gray_image, max_side, min_size, eyes)}
+
+
+# Function that writes the response of an image to 'json_route_out', the same file the annotation tools read
+# With a ResultCache, responses are keyed by the content of the image and the detector parameters, so an image that
+# was already analyzed (even under another name) is not detected again. Returns a result that never raises
+def detect_to_json(image_route_in, json_route_out, cache=None, max_side=None, min_size=None, eyes=True):
+    start = time.perf_counter()
+    result = {"image": image_route_in, "json": None, "faces": 0, "cached": False, "ok": False, "error": None}
+
+    try:
+        key = None
+        if cache is not None:
+            key = cache.key(image_route_in, DETECTOR, (max_side, min_size, eyes), ".json")
+            result["cached"] = cache.get(key, json_route_out)
+
+        if result["cached"]:
+            with open(json_route_out, 'r') as file:
+                result["faces"] = len(json.load(file)["FaceDetails"])
+        else:
+            response = detect_response(image_route_in, max_side, min_size, eyes)
+
+            # Written to a temporary file and renamed, so a reader never sees half a JSON
+            descriptor, temporary_route = tempfile.mkstemp(dir=os.path.dirname(json_route_out) or '.', suffix='.tmp')
+            with os.fdopen(descriptor, 'w') as file:
+                json.dump(response, file, indent=4)
+            os.replace(temporary_route, json_route_out)
+
+            if cache is not None:
+                cache.put(key, json_route_out)
+            result["faces"] = len(response["FaceDetails"])
+
+        result.update(json=json_route_out, ok=True)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+# Function that runs once in every worker: parses both cascades before the first image arrives
+def init_worker():
+    get_cascade(FACE_CASCADE)
+    get_cascade(EYE_CASCADE)
+
+
+# Function that writes '<json_dir>/<image stem>.json' for every image of a directory (or glob) on a pool of processes
+# The folders of the images under the source are mirrored in 'json_dir' (see watch.sidecar_route), so images with the
+# same name in different folders keep their own JSON. Images that would share one (e.g. 'a.jpg' and 'a.png') raise
+# ValueError before anything is detected. Returns a summary with the result and the time of every image
+def detect_batch(source, json_dir, workers=None, cache_dir=None, max_side=None, min_size=None, eyes=True):
+    routes = list_images(source)
+    root = source_root(source)
+    json_routes = [sidecar_route(route, json_dir, root) for route in routes]
+
+    duplicates = sorted({json_route for json_route in json_routes if json_routes.count(json_route) > 1})
+    if duplicates:
+        raise ValueError(f"Several images would write the same JSON: {', '.join(duplicates)}")
+
+    for directory in {os.path.dirname(json_route) for json_route in json_routes} | {json_dir}:
+        os.makedirs(directory, exist_ok=True)
+    cache = ResultCache(cache_dir) if cache_dir else None
+    start = time.perf_counter()
+
+    arguments = (routes, json_routes, [cache] * len(routes), [max_side] * len(routes), [min_size] * len(routes),
+                 [eyes] * len(routes))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        init_worker()
+        results = list(map(detect_to_json, *arguments))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+            results = list(executor.map(detect_to_json, *arguments,
+                                        chunksize=max(1, len(routes) // (workers * 4))))
+
+        # The copies of the cache in the workers neither count for this one nor evict (see ResultCache)
+        if cache is not None:
+            cache.hits += sum(result["cached"] for result in results)
+            cache.misses += sum(result["ok"] and not result["cached"] for result in results)
+            cache.refresh()
+
+    return {
+        "source": source,
+        "images": len(results),
+        "processed": sum(result["ok"] for result in results),
+        "cached": sum(result["cached"] for result in results),
+        "errors": sum(not result["ok"] for result in results),
+        "seconds": time.perf_counter() - start,
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write Rekognition-style DetectFaces JSONs with the local cascades")
+    parser.add_argument('source', help="Directory or glob pattern with the input images")
+    parser.add_argument('json_dir', help="Output folder: one <image stem>.json per image, in the folders "
+                                                "of the images")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cache', default=None, help="Folder of the response cache")
+    parser.add_argument('--max-side', type=int, default=None, help="Detect on an image of at most this side")
+    parser.add_argument('--no-eyes', action='store_true', help="Skip the eye landmarks")
+    args = parser.parse_args(argv)
+
+    summary = detect_batch(args.source, args.json_dir, args.workers, args.cache, args.max_side, eyes=not args.no_eyes)
+
+    for result in summary["results"]:
+        status = "OK   " if result["ok"] else "ERROR"
+        print(f"{status} {result['image']}: {result['faces']} faces{' (cached)' if result['cached'] else ''} "
+              f"({result['seconds'] * 1000:.1f} ms){' ' + result['error'] if result['error'] else ''}")
+
+    print(f"\n{summary['processed']} processed ({summary['cached']} cached), {summary['errors']} errors in "
+          f"{summary['seconds']:.2f} s")
+
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
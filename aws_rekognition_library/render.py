@@ -0,0 +1,62 @@
+import cv2
+
+import numpy as np
+
+from aws_rekognition_library.faces import GENDERS
+from open_cv_library.anonymize import anonymize_region
+
+MALE_COLOR = (0, 0, 255)
+FEMALE_COLOR = (0, 255, 0)
+UNKNOWN_COLOR = (255, 255, 255)
+
+
+# Function that computes the color (BGR) of every face of a FaceTable at once, as an int (N, 3) array
+# Faces in the 'minors' mask get 'minor_color', the rest are colored by gender
+def face_colors(table, minors, minor_color):
+    colors = np.empty((len(table), 3), dtype=np.int32)
+    colors[:] = UNKNOWN_COLOR
+    colors[table.gender == GENDERS.index("Male")] = MALE_COLOR
+    colors[table.gender == GENDERS.index("Female")] = FEMALE_COLOR
+    colors[np.asarray(minors, dtype=bool)] = minor_color
+
+    return colors
+
+
+# Function that formats the 'count' emotions with the highest confidence of every face as the text of its label
+# Faces without emotion data get 'empty'
+def emotion_labels(table, count=2, empty=""):
+    columns, confidences = table.top_emotion_columns(count)
+    names = table.emotion_types
+
+    return [", ".join(f"{names[column]} ({confidence:.1f}%)" for column, confidence in zip(row_columns, row_confidences)
+                      if confidence >= 0) or empty
+            for row_columns, row_confidences in zip(columns.tolist(), confidences.tolist())]
+
+
+# Function that computes the baseline of a line of text for every box: 'above' pixels over the box when there is
+# room for it (the top of the box is below 'room'), otherwise 'below' pixels under the bottom of the box
+def label_rows(boxes, above, below, room):
+    y, height = boxes[:, 1], boxes[:, 3]
+    return np.where(y > room, y - above, y + height + below)
+
+
+# Function that draws a rectangle and its lines of text for every face, in order, on the image
+# 'lines' is a list of (texts, rows) pairs: one text and one baseline per face for every line
+# Faces in the 'blur' mask are anonymized before drawing, as their rectangle and labels are drawn over the blur
+def draw_faces(image, boxes, colors, lines, blur=None):
+    boxes = boxes.tolist()
+    colors = [tuple(color) for color in colors.tolist()]
+    lines = [(texts, rows.tolist()) for texts, rows in lines]
+    blur = [False] * len(boxes) if blur is None else np.asarray(blur, dtype=bool).tolist()
+
+    for row, (x, y, width, height) in enumerate(boxes):
+        if blur[row]:
+            anonymize_region(image, x, y, width, height)
+
+        color = colors[row]
+        cv2.rectangle(image, (x, y), (x + width, y + height), color, 2)
+
+        for texts, rows in lines:
+            cv2.putText(image, texts[row], (x, rows[row]), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1, cv2.LINE_AA)
+
+    return image
@@ -0,0 +1,132 @@
+import argparse, json, os, time
+
+import cv2
+
+from aws_rekognition_library.aws_images import blur_faces, blur_under_18_faces, get_square_on_faces
+
+OPERATIONS = {
+    "blur": blur_faces,
+    "blur_under_18": blur_under_18_faces,
+    "square_face": get_square_on_faces,
+}
+
+# Function that reads a newline-delimited JSON dump one record at a time, starting at a byte offset
+# Yields (offset, line) where offset is the position right after the record, i.e. where to resume from
+# The lines are parsed by the caller, so a malformed one is reported as an error and skipped instead of stopping the run
+def iter_records(dump_route, offset=0):
+    with open(dump_route, 'rb') as file:
+        file.seek(offset)
+
+        for line in iter(file.readline, b''):
+            offset += len(line)
+            if line.strip():
+                yield offset, line
+
+# Functions that persist the offset of the last processed record, written atomically so a crash never leaves a
+# half-written checkpoint
+def read_checkpoint(checkpoint_route):
+    if not checkpoint_route or not os.path.exists(checkpoint_route):
+        return 0
+
+    with open(checkpoint_route, 'r') as file:
+        return json.load(file)["offset"]
+
+def write_checkpoint(checkpoint_route, offset):
+    temporary_route = f"{checkpoint_route}.tmp"
+
+    with open(temporary_route, 'w') as file:
+        json.dump({"offset": offset}, file)
+
+    os.replace(temporary_route, checkpoint_route)
+
+# Function that returns the output of an image key: the same relative path under 'output_dir', so keys with the same
+# name in different folders (e.g. 'a/x.jpg' and 'b/x.jpg') do not overwrite each other. Keys that would leave
+# 'output_dir' (absolute or with '..') raise ValueError
+def output_route(output_dir, image_name):
+    relative = os.path.normpath(image_name)
+
+    if os.path.isabs(relative) or relative.split(os.sep)[0] == os.pardir:
+        raise ValueError(f"The image key {image_name} is outside the image folder")
+
+    return os.path.join(output_dir, relative)
+
+# Function that streams a dump of DetectFaces responses through one of the operations with constant memory
+# Every record is paired with its image through 'image_key' (a path relative to 'image_dir', kept under 'output_dir'
+# for the output, see output_route); the response is the record itself, or the value of 'response_key' when the
+# responses are nested. With a checkpoint the run can be resumed after a crash from the offset of the last processed
+# record
+def process_stream(dump_route, image_dir, output_dir, operation, checkpoint_route=None, offset=None, image_key="Image",
+                   response_key=None, checkpoint_every=100, on_result=None):
+    if operation not in OPERATIONS:
+        raise ValueError(f"Invalid operation: {operation}. Choose between {', '.join(OPERATIONS)}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    offset = read_checkpoint(checkpoint_route) if offset is None else offset
+    summary = {"start_offset": offset, "processed": 0, "errors": 0}
+    start = time.perf_counter()
+
+    for count, (offset, line) in enumerate(iter_records(dump_route, offset), start=1):
+        result = {"image": None, "output": None, "ok": False, "error": None, "offset": offset}
+
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError(f"The record is a {type(record).__name__}, not an object")
+
+            image_name = result["image"] = record.get(image_key)
+            if not image_name:
+                raise ValueError(f"The record has no '{image_key}' field")
+            image_route_out = output_route(output_dir, image_name)
+
+            img = cv2.imread(os.path.join(image_dir, image_name))
+            if img is None:
+                raise ValueError("The image could not be read from the specified path! :(")
+
+            img = OPERATIONS[operation](img, record[response_key] if response_key else record)
+
+            result["output"] = image_route_out
+            os.makedirs(os.path.dirname(result["output"]), exist_ok=True)
+            result["ok"] = bool(cv2.imwrite(result["output"], img))
+            if not result["ok"]:
+                raise ValueError(f"The image could not be saved in {result['output']}")
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+
+        summary["processed" if result["ok"] else "errors"] += 1
+        if on_result:
+            on_result(result)
+
+        if checkpoint_route and count % checkpoint_every == 0:
+            write_checkpoint(checkpoint_route, offset)
+
+    if checkpoint_route:
+        write_checkpoint(checkpoint_route, offset)
+
+    summary.update(end_offset=offset, seconds=time.perf_counter() - start)
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a NDJSON dump of DetectFaces responses through an operation")
+    parser.add_argument('dump', help="Newline-delimited JSON, one DetectFaces response per image")
+    parser.add_argument('image_dir')
+    parser.add_argument('output_dir')
+    parser.add_argument('operation', choices=list(OPERATIONS))
+    parser.add_argument('--checkpoint', default=None, help="File with the offset to resume from")
+    parser.add_argument('--offset', type=int, default=None, help="Byte offset to start from (overrides the checkpoint)")
+    parser.add_argument('--image-key', default="Image")
+    parser.add_argument('--response-key', default=None)
+    args = parser.parse_args(argv)
+
+    def report(result):
+        if not result["ok"]:
+            print(f"ERROR {result['image'] or 'offset ' + str(result['offset'])} {result['error']}")
+
+    summary = process_stream(args.dump, args.image_dir, args.output_dir, args.operation, args.checkpoint, args.offset,
+                             args.image_key, args.response_key, on_result=report)
+    print(f"{summary['processed']} processed, {summary['errors']} errors, offset {summary['start_offset']} -> "
+          f"{summary['end_offset']} in {summary['seconds']:.2f} s")
+
+    return 1 if summary["errors"] else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,78 @@
+import argparse, tracemalloc
+
+import numpy as np
+
+from open_cv_library.buffers import BufferPool
+from open_cv_library.cascades import load_cascade, FACE_CASCADE, EYE_CASCADE
+from open_cv_library.images import (
+    rotate_180_action, negative_action, gray_action, mirror_action, invert_vertical_action, invert_horizontal_action,
+    get_face_and_eyes_from_webcam
+)
+from open_cv_library.video import synthetic_frames, gray_frame
+from resources.resources import resources_in_dir
+
+# Bytes allocated (traced by tracemalloc, numpy buffers included) at the peak of a single call
+def allocated(function):
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    function()
+    return tracemalloc.get_traced_memory()[1] - before
+
+def mb(size):
+    return f"{size / 1e6:8.2f} MB"
+
+def actions(image):
+    gray = np.empty(image.shape[:2], np.uint8)
+    other = np.empty_like(image)
+
+    return {
+        "rotate_180": (lambda: rotate_180_action(image), lambda: rotate_180_action(image, other), lambda: rotate_180_action(image, image)),
+        "negative": (lambda: negative_action(image), lambda: negative_action(image, other), lambda: negative_action(image, image)),
+        "gray": (lambda: gray_action(image), lambda: gray_action(image, gray), None),
+        "mirror": (lambda: mirror_action(image), lambda: mirror_action(image, other), lambda: mirror_action(image, image)),
+        "invert vertical": (lambda: invert_vertical_action(image.copy()), lambda: invert_vertical_action(image, other),
+                            lambda: invert_vertical_action(image)),
+        "invert horizontal": (lambda: invert_horizontal_action(image.copy()), lambda: invert_horizontal_action(image, other),
+                              lambda: invert_horizontal_action(image)),
+    }
+
+# Video loop: a new frame and gray conversions per frame vs frames from a BufferPool and a reused gray buffer
+def video_loop(frames, pooled):
+    face_cascade, eye_cascade = load_cascade(FACE_CASCADE), load_cascade(EYE_CASCADE)
+    pool = BufferPool()
+    per_frame = []
+
+    for source in frames:
+        def step():
+            frame = pool.acquire(source.shape) if pooled else np.empty_like(source)
+            frame[:] = source  # Stands for the decode of the frame by the capture
+            get_face_and_eyes_from_webcam(frame, face_cascade, eye_cascade, gray=gray_frame(frame) if pooled else None)
+            if pooled:
+                pool.release(frame)
+
+        per_frame.append(allocated(step))
+
+    return np.mean(per_frame[1:])
+
+def main():
+    parser = argparse.ArgumentParser(description="Allocations per call with and without dst buffers (tracemalloc)")
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--frames', type=int, default=20)
+    args = parser.parse_args()
+
+    image = np.random.default_rng(0).integers(0, 256, (args.height, args.width, 3), np.uint8)
+    tracemalloc.start()
+
+    print(f"{args.width}x{args.height} image ({image.nbytes / 1e6:.0f} MB), bytes allocated per call\n")
+    print(f"{'action':<20}{'new array':>14}{'dst buffer':>14}{'in place':>14}")
+    for name, (new, dst, in_place) in actions(image).items():
+        print(f"{name:<20}{mb(allocated(new)):>14}{mb(allocated(dst)):>14}{mb(allocated(in_place)) if in_place else 'n/a':>14}")
+
+    frames = list(synthetic_frames(f"{resources_in_dir}/grupo.png", args.frames))
+    print(f"\nface_and_eyes video loop, 640x480, bytes allocated per frame")
+    print(f"{'allocating':<20}{mb(video_loop(frames, False)):>14}")
+    print(f"{'pool + shared gray':<20}{mb(video_loop(frames, True)):>14}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+import argparse
+
+import cv2
+import numpy as np
+
+from benchmarks.common import time_call, percentile
+from open_cv_library.anonymize import METHODS, kernel_size
+
+# Fixed-kernel blurs used before the anonymization module
+LEGACY = {
+    "legacy gaussian 99": lambda region: cv2.GaussianBlur(region, (99, 99), 0),
+    "legacy median 99": lambda region: cv2.medianBlur(region, 99),
+    "legacy gaussian 51": lambda region: cv2.GaussianBlur(region, (51, 51), 30),
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost per megapixel of every anonymization method")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--sides', type=int, nargs='*', default=[128, 256, 512, 1024])
+    parser.add_argument('--skip-median', action='store_true', help="medianBlur(99) is very slow on large regions")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    candidates = {name: (lambda method: lambda region: method(region, kernel_size(*region.shape[1::-1])))(method)
+                  for name, method in METHODS.items()}
+    candidates.update({name: action for name, action in LEGACY.items() if not (args.skip_median and 'median' in name)})
+
+    print(f"{'method':<22}" + "".join(f"{f'{side}x{side}':>14}" for side in args.sides) + "   (ms per megapixel)")
+
+    for name, action in candidates.items():
+        row = f"{name:<22}"
+        for side in args.sides:
+            region = rng.integers(0, 256, (side, side, 3), np.uint8)
+            seconds = percentile(time_call(lambda: action(region), args.repeat), 50)
+            row += f"{seconds * 1000 / (side * side / 1e6):>11.1f} ms"
+        print(row)
+
+if __name__ == '__main__':
+    main()
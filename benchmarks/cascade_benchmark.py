@@ -0,0 +1,44 @@
+import argparse, os, tempfile, time
+
+from benchmarks.common import resource_images, time_call, percentile, ms
+from open_cv_library.cascades import load_cascade, get_cascade, clear_cascades, FACE_CASCADE
+from open_cv_library.images import detect_and_mark_faces
+
+# Startup and per-call cost of the face cascade, parsing the XML on every call (as before) vs the registry
+def main():
+    parser = argparse.ArgumentParser(description="Face cascade: parse per call vs per-thread registry")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--images', nargs='*', default=None, help="Images to detect on (default: the small samples)")
+    args = parser.parse_args()
+
+    parse = time_call(lambda: load_cascade(FACE_CASCADE), args.repeat, warmup=0)
+    clear_cascades()
+    start = time.perf_counter()
+    get_cascade(FACE_CASCADE)
+    first_lookup = time.perf_counter() - start
+    lookup = time_call(lambda: get_cascade(FACE_CASCADE), args.repeat)
+
+    print(f"Parse XML into a new classifier   p50 {ms(percentile(parse, 50))}")
+    print(f"Registry first lookup (startup)       {ms(first_lookup)}")
+    print(f"Registry warm lookup              p50 {ms(percentile(lookup, 50))}\n")
+
+    images = args.images or [path for path in resource_images() if os.path.getsize(path) < 600_000]
+
+    print(f"{'image':<14}{'before p50':>14}{'after p50':>14}{'saved':>9}")
+    with tempfile.TemporaryDirectory() as workdir:
+        image_route_out = os.path.join(workdir, 'detected.jpg')
+
+        for image_route in images:
+            call = lambda: detect_and_mark_faces(image_route, image_route_out, (0, 255, 0), None)
+
+            def before():
+                clear_cascades()
+                call()
+
+            before_p50 = percentile(time_call(before, args.repeat), 50)
+            after_p50 = percentile(time_call(call, args.repeat), 50)
+            print(f"{os.path.basename(image_route):<14}{ms(before_p50):>14}{ms(after_p50):>14}"
+                  f"{(before_p50 - after_p50) / before_p50:>8.0%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+import glob, os, time
+
+from resources.resources import resources_in_dir
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# Returns the sample images bundled in 'resources/resources_in'
+def resource_images(directory=resources_in_dir):
+    return sorted(path for path in glob.glob(os.path.join(directory, '*')) if path.lower().endswith(IMAGE_EXTENSIONS))
+
+# Runs a function several times and returns the wall time of each run in seconds
+def time_call(function, repeat=5, warmup=1):
+    for _ in range(warmup):
+        function()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+
+    return samples
+
+# Returns the p-th percentile (0-100) of a list of samples using linear interpolation
+def percentile(samples, p):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+
+    position = (len(ordered) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+# Formats seconds as milliseconds for the benchmark reports
+def ms(seconds):
+    return f"{seconds * 1000:8.2f} ms"
+
+# Intersection over union of two (x, y, w, h) boxes
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    w = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    h = max(0, min(ay + ah, by + bh) - max(ay, by))
+    union = aw * ah + bw * bh - w * h
+    return w * h / union if union else 0.0
@@ -0,0 +1,73 @@
+import argparse, mmap, os, tempfile
+
+import cv2
+
+from benchmarks.common import resource_images, time_call, percentile, ms
+from open_cv_library.images import load_image, load_thumbnail_source, image_size, save_image
+from resources.resources import resources_in_dir
+
+def p50(function, repeat):
+    return percentile(time_call(function, repeat), 50)
+
+# Synthetic JPEG of about 'megapixels' MP, the bundled f3.jpg photo scaled to that size
+def synthetic_jpeg(megapixels, work_dir):
+    image = cv2.imread(os.path.join(resources_in_dir, "f3.jpg"))
+    factor = (megapixels * 1e6 / (image.shape[0] * image.shape[1])) ** 0.5
+    route = os.path.join(work_dir, f"synthetic_{megapixels}mp.jpg")
+    cv2.imwrite(route, cv2.resize(image, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA))
+    return route
+
+def main():
+    parser = argparse.ArgumentParser(description="Reduced-resolution and in-memory decoding against a full decode")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--sizes', type=int, nargs='*', default=[12, 48])
+    parser.add_argument('--thumbnail-width', type=int, default=400)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        routes = [route for route in resource_images() if route.lower().endswith(('.jpg', '.jpeg'))]
+        routes += [synthetic_jpeg(megapixels, work_dir) for megapixels in args.sizes]
+
+        print(f"{'image':<22}{'size':>12}{'full':>12}{'1/2':>12}{'1/4':>12}{'1/8':>12}{'1/4 gray':>12}   speedup 1/4")
+        for route in routes:
+            full = p50(lambda: load_image(route), args.repeat)
+            reduced = {scale: p50(lambda: load_image(route, scale), args.repeat) for scale in (0.5, 0.25, 0.125)}
+            gray = p50(lambda: load_image(route, 0.25, gray=True), args.repeat)
+            width, height = image_size(route)
+
+            print(f"{os.path.basename(route):<22}{f'{width}x{height}':>12}{ms(full):>12}"
+                  + "".join(f"{ms(seconds):>12}" for seconds in reduced.values())
+                  + f"{ms(gray):>12}   {full / reduced[0.25]:.1f}x")
+
+        route = routes[-1]
+        with open(route, 'rb') as file:
+            data = file.read()
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            print(f"\nSources of {os.path.basename(route)} (full decode)")
+            print(f"  path (cv2.imread)     {ms(p50(lambda: load_image(route), args.repeat))}")
+            print(f"  bytes (cv2.imdecode)  {ms(p50(lambda: load_image(data), args.repeat))}")
+            print(f"  mmap (cv2.imdecode)   {ms(p50(lambda: load_image(mapped), args.repeat))}")
+            mapped.close()
+
+        def thumbnail(image):
+            height = round(image.shape[0] * args.thumbnail_width / image.shape[1])
+            return cv2.resize(image, (args.thumbnail_width, height), interpolation=cv2.INTER_AREA)
+
+        print(f"\nThumbnail of {args.thumbnail_width} px wide (decode + resize)")
+        for route in routes:
+            full = p50(lambda: thumbnail(load_image(route)), args.repeat)
+            reduced = p50(lambda: thumbnail(load_thumbnail_source(route, args.thumbnail_width)), args.repeat)
+            print(f"  {os.path.basename(route):<22} full decode {ms(full)}   reduced decode {ms(reduced)}"
+                  f"   {full / reduced:.1f}x")
+
+        image = load_image(routes[-1], 0.25)
+        print(f"\nEncode parameters ({image.shape[1]}x{image.shape[0]})")
+        for extension, name, values in (('.jpg', 'quality', (95, 75, 50)), ('.png', 'compression', (1, 3, 9))):
+            for value in values:
+                route_out = os.path.join(work_dir, f"out{extension}")
+                seconds = p50(lambda: save_image(image, route_out, **{name: value}), args.repeat)
+                print(f"  {extension} {name}={value:<4}{ms(seconds)}{os.path.getsize(route_out) / 1e3:>10.0f} kB")
+
+if __name__ == '__main__':
+    main()
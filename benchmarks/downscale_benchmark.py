@@ -0,0 +1,43 @@
+import argparse, os
+
+import cv2
+
+from benchmarks.common import resource_images, time_call, percentile, ms, iou
+from open_cv_library.cascades import get_cascade, FACE_CASCADE
+from open_cv_library.images import detect_faces
+
+# Share of the full-resolution faces found again (IoU >= threshold) by a downscaled detection
+def recall(reference, faces, threshold=0.5):
+    if len(reference) == 0:
+        return 1.0
+
+    found = sum(any(iou(box, other) >= threshold for other in faces) for box in reference)
+    return found / len(reference)
+
+def main():
+    parser = argparse.ArgumentParser(description="Face detection latency and recall: full resolution vs downscaled")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-sides', type=int, nargs='*', default=[1600, 1024, 640])
+    args = parser.parse_args()
+
+    face_cascade = get_cascade(FACE_CASCADE)
+    print(f"{'image':<14}{'mode':<14}{'p50 latency':>14}{'faces':>7}{'recall':>8}")
+
+    for image_route in resource_images():
+        gray_image = cv2.cvtColor(cv2.imread(image_route), cv2.COLOR_BGR2GRAY)
+        name = os.path.basename(image_route)
+
+        reference = detect_faces(gray_image, face_cascade)
+        full = percentile(time_call(lambda: detect_faces(gray_image, face_cascade), args.repeat), 50)
+        print(f"{name:<14}{'full':<14}{ms(full):>14}{len(reference):>7}{1:>8.0%}")
+
+        for max_side in args.max_sides:
+            if max_side >= max(gray_image.shape):
+                continue
+
+            faces = detect_faces(gray_image, face_cascade, max_side=max_side)
+            latency = percentile(time_call(lambda: detect_faces(gray_image, face_cascade, max_side=max_side), args.repeat), 50)
+            print(f"{'':<14}{f'max_side={max_side}':<14}{ms(latency):>14}{len(faces):>7}{recall(reference, faces):>8.0%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+import argparse, os, tempfile
+
+from benchmarks.common import resource_images, time_call, percentile, ms
+from open_cv_library.images import get_mirror_image, get_inverted_image, generate_html_images
+
+# Previous path of generate_html_file: one decode and one encode per image, one after another
+def separate(image_route, outputs):
+    get_mirror_image(image_route, outputs[0])
+    get_inverted_image(image_route, outputs[1], 'vertical')
+    get_inverted_image(image_route, outputs[2], 'horizontal')
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML images: separate calls vs fused generation")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--thumbnail-width', type=int, default=400)
+    args = parser.parse_args()
+
+    print(f"{'image':<14}{'separate':>14}{'fused':>14}{'thumbnails':>14}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        outputs = [os.path.join(workdir, f"{name}.jpg") for name in ("mirror", "vertical", "horizontal")]
+
+        for image_route in resource_images():
+            old = percentile(time_call(lambda: separate(image_route, outputs), args.repeat), 50)
+            fused = percentile(time_call(lambda: generate_html_images(image_route, *outputs), args.repeat), 50)
+            thumbnails = percentile(time_call(lambda: generate_html_images(image_route, *outputs, None, args.thumbnail_width),
+                                              args.repeat), 50)
+            print(f"{os.path.basename(image_route):<14}{ms(old):>14}{ms(fused):>14}{ms(thumbnails):>14}")
+
+if __name__ == '__main__':
+    main()
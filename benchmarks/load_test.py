@@ -0,0 +1,109 @@
+import argparse, asyncio, os, subprocess, sys, time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from benchmarks.common import percentile, ms
+from resources.resources import resources_in_dir
+
+# Function that sends one POST over an open keep-alive connection and returns the status of the response
+async def post(reader, writer, host, target, body):
+    writer.write(f"POST {target} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/octet-stream\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        key, _, value = line.decode('latin-1').partition(':')
+        headers[key.strip().lower()] = value.strip()
+
+    await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers.get("connection", "").lower() != "close"
+
+# One client: sends its requests one after another, reconnecting when the server closes the connection
+async def client(url, body, count, latencies, statuses):
+    parts = urlsplit(url)
+    target = parts.path + (f"?{parts.query}" if parts.query else "")
+    connection = None
+
+    for _ in range(count):
+        if connection is None:
+            connection = await asyncio.open_connection(parts.hostname, parts.port)
+
+        start = time.perf_counter()
+        try:
+            status, keep_alive = await post(*connection, parts.netloc, target, body)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            status, keep_alive = "connection error", False
+
+        latencies.append((status, time.perf_counter() - start))
+        statuses[status] += 1
+
+        if not keep_alive:
+            connection[1].close()
+            connection = None
+
+    if connection is not None:
+        connection[1].close()
+
+async def load(url, body, concurrency, requests):
+    latencies, statuses = [], Counter()
+    per_client = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(url, body, count, latencies, statuses) for count in per_client if count))
+    return latencies, statuses, time.perf_counter() - start
+
+# Function that starts the service in a child process and waits until it accepts connections
+def start_server(port, workers, queue_size):
+    command = [sys.executable, "-m", "service.server", "--port", str(port)]
+    if workers:
+        command += ["--workers", str(workers)]
+    if queue_size:
+        command += ["--queue-size", str(queue_size)]
+
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = server.stdout.readline()
+    if not line.startswith("Serving"):
+        server.kill()
+        raise RuntimeError("The service did not start")
+
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the HTTP service: p50/p99 latency and throughput")
+    parser.add_argument('--url', default=None, help="Endpoint of a running service. By default one is started here")
+    parser.add_argument('--endpoint', default="/images/negative")
+    parser.add_argument('--image', default=os.path.join(resources_in_dir, "A.jpg"))
+    parser.add_argument('--concurrency', type=int, nargs='*', default=[1, 4, 16, 64])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--queue-size', type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.image, 'rb') as file:
+        body = file.read()
+
+    server = None if args.url else start_server(args.port, args.workers, args.queue_size)
+    url = args.url or f"http://127.0.0.1:{args.port}{args.endpoint}"
+
+    try:
+        print(f"{url} with {os.path.basename(args.image)} ({len(body) / 1e3:.0f} kB), {args.requests} requests\n")
+        print(f"{'clients':>8}{'req/s':>9}{'p50 ok':>13}{'p99 ok':>13}{'p50 all':>13}{'p99 all':>13}   statuses")
+
+        for concurrency in args.concurrency:
+            latencies, statuses, seconds = asyncio.run(load(url, body, concurrency, args.requests))
+            ok = [latency for status, latency in latencies if status == 200] or [0]
+            every = [latency for _, latency in latencies]
+
+            print(f"{concurrency:>8}{len(latencies) / seconds:>9.1f}"
+                  f"{ms(percentile(ok, 50)):>13}{ms(percentile(ok, 99)):>13}"
+                  f"{ms(percentile(every, 50)):>13}{ms(percentile(every, 99)):>13}   {dict(statuses)}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import argparse, json, os, tempfile
+
+from benchmarks.common import time_call, percentile, ms, iou
+from aws_rekognition_library.faces import FaceTable
+from aws_rekognition_library.local_detector import detect_response, detect_to_json, init_worker
+from open_cv_library.cache import ResultCache
+from resources.resources import resources_in_dir, images_aws_json_dir
+
+# Bundled images with their stored Rekognition response (family.json and final.json belong to images not bundled)
+PAIRS = (("B.jpg", "group.json"),)
+
+def p50(function, repeat):
+    return percentile(time_call(function, repeat), 50)
+
+def read_stored(json_route):
+    with open(json_route, 'r') as file:
+        return FaceTable(json.load(file))
+
+# Faces of the stored response that the local detector also finds (best IoU of at least 'threshold')
+def matched_faces(stored, local, threshold):
+    return sum(max((iou(box, other) for other in local.boxes.tolist()), default=0) >= threshold
+               for box in stored.boxes.tolist())
+
+def main():
+    parser = argparse.ArgumentParser(description="Local cascade detector against reading stored Rekognition JSONs")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-side', type=int, default=640)
+    parser.add_argument('--iou', type=float, default=0.3)
+    args = parser.parse_args()
+
+    init_worker()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        cache = ResultCache(os.path.join(work_dir, "cache"))
+        json_route = os.path.join(work_dir, "response.json")
+
+        print(f"{'image':<14}{'stored JSON':>14}{'cached':>14}{'local':>14}{f'local {args.max_side}':>14}"
+              f"   faces stored/local   matched (IoU >= {args.iou})")
+
+        for image_name, json_name in PAIRS:
+            image_route = os.path.join(resources_in_dir, image_name)
+            stored_route = os.path.join(images_aws_json_dir, json_name)
+
+            detect_to_json(image_route, json_route, cache)
+
+            stored = p50(lambda: read_stored(stored_route), args.repeat)
+            cached = p50(lambda: detect_to_json(image_route, json_route, cache) and read_stored(json_route),
+                         args.repeat)
+            full = p50(lambda: detect_response(image_route), args.repeat)
+            reduced = p50(lambda: detect_response(image_route, args.max_side), args.repeat)
+
+            table = read_stored(stored_route)
+            local = FaceTable(detect_response(image_route))
+            print(f"{image_name:<14}{ms(stored):>14}{ms(cached):>14}{ms(full):>14}{ms(reduced):>14}"
+                  f"   {len(table):>5}/{len(local):<5}          {matched_faces(table, local, args.iou)}/{len(table)}")
+
+        print(f"\nThroughput (images/s, one process): stored JSON {1 / stored:.0f}, cached {1 / cached:.0f}, "
+              f"local {1 / full:.1f}, local {args.max_side} {1 / reduced:.1f} ({PAIRS[-1][0]})")
+
+if __name__ == '__main__':
+    main()
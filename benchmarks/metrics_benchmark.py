@@ -0,0 +1,49 @@
+import argparse, os, tempfile, time
+
+from benchmarks.common import time_call, percentile, ms
+from open_cv_library import metrics
+from open_cv_library.images import get_negative_colors, detect_and_mark_faces
+from resources.resources import resources_in_dir
+
+# Nanoseconds per 'with metrics.stage(...)' block, with and without a sink
+def stage_cost(loops):
+    start = time.perf_counter()
+    for _ in range(loops):
+        with metrics.stage("noop"):
+            pass
+    return (time.perf_counter() - start) / loops * 1e9
+
+def main():
+    parser = argparse.ArgumentParser(description="Overhead of the metrics hooks and stage breakdown of the detection")
+    parser.add_argument('--image', default=os.path.join(resources_in_dir, "f2.jpg"))
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--loops', type=int, default=200000)
+    args = parser.parse_args()
+
+    print(f"stage() disabled:            {stage_cost(args.loops):8.0f} ns per block")
+    with metrics.collect(metrics.HistogramSink()):
+        print(f"stage() with HistogramSink:  {stage_cost(args.loops):8.0f} ns per block")
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        route_out = os.path.join(out_dir, "out.jpg")
+        negative = lambda: get_negative_colors(args.image, route_out)
+
+        disabled = percentile(time_call(negative, args.repeat), 50)
+        with metrics.collect(metrics.HistogramSink()):
+            enabled = percentile(time_call(negative, args.repeat), 50)
+        print(f"\nget_negative_colors({os.path.basename(args.image)}): disabled {ms(disabled)}, "
+              f"enabled {ms(enabled)} ({enabled / disabled - 1:+.1%})")
+
+        sink = metrics.HistogramSink()
+        with metrics.collect(sink):
+            for _ in range(3):
+                detect_and_mark_faces(args.image, route_out, (0, 0, 255), "", blur_faces=True, max_side=1280)
+
+    summary = sink.summary()
+    print(f"\ndetect_and_mark_faces stages (max_side=1280, blur), 3 runs")
+    for stage, values in summary["stages"].items():
+        print(f"  {stage:<10}{values['count']:>5} x{ms(values['mean'])} mean{ms(values['total'] / 3)} per run")
+    print(f"  counters: {summary['counters']}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import argparse, os, tempfile
+
+import cv2
+
+from benchmarks.common import resource_images, time_call, percentile, ms
+from open_cv_library.images import (
+    load_image, rotate_180_image, get_gray_scale, get_image_blurred, get_image_with_text
+)
+from open_cv_library.pipeline import ImagePipeline
+
+# Coordinates for the blur and annotation stages, relative to the image size
+def stage_arguments(image_route):
+    height, width = load_image(image_route).shape[:2]
+    blur = ((width // 4, width // 2), (height // 4, height // 2))
+    box = ((width // 4, height // 4), (width // 2, height // 2))
+    return blur, box
+
+# Current path: every step decodes the previous JPEG from disk and encodes a new one
+def chained_files(image_route, image_route_out, workdir, blur, box):
+    rotated = os.path.join(workdir, 'rotated.jpg')
+    gray = os.path.join(workdir, 'gray.jpg')
+    blurred = os.path.join(workdir, 'blurred.jpg')
+
+    rotate_180_image(image_route, rotated)
+    get_gray_scale(rotated, gray)
+    get_image_blurred(gray, blurred, *blur)
+    get_image_with_text(blurred, image_route_out, *box, (255, 255, 255), "Benchmark")
+
+def build_pipeline(blur, box):
+    return ImagePipeline().rotate_180().gray().blur(*blur).text(*box, (255, 255, 255), "Benchmark")
+
+def main():
+    parser = argparse.ArgumentParser(description="Chained-file path vs in-memory ImagePipeline")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'image':<14}{'chained p50':>14}{'pipeline p50':>14}{'speedup':>10}{'PSNR chained':>15}{'PSNR pipeline':>15}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for image_route in resource_images():
+            blur, box = stage_arguments(image_route)
+            pipeline = build_pipeline(blur, box)
+            chained_out = os.path.join(workdir, 'chained.jpg')
+            pipeline_out = os.path.join(workdir, 'pipeline.jpg')
+
+            chained = time_call(lambda: chained_files(image_route, chained_out, workdir, blur, box), args.repeat)
+            fused = time_call(lambda: pipeline.run(image_route, pipeline_out), args.repeat)
+
+            # Quality against the lossless in-memory result of the same stages
+            reference = pipeline.apply(load_image(image_route))
+            chained_psnr = cv2.PSNR(reference, cv2.imread(chained_out, cv2.IMREAD_GRAYSCALE))
+            pipeline_psnr = cv2.PSNR(reference, cv2.imread(pipeline_out, cv2.IMREAD_GRAYSCALE))
+
+            chained_p50, fused_p50 = percentile(chained, 50), percentile(fused, 50)
+            print(f"{os.path.basename(image_route):<14}{ms(chained_p50):>14}{ms(fused_p50):>14}"
+                  f"{chained_p50 / fused_p50:>9.2f}x{chained_psnr:>12.2f} dB{pipeline_psnr:>12.2f} dB")
+
+if __name__ == '__main__':
+    main()
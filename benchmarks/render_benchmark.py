@@ -0,0 +1,85 @@
+import argparse
+
+import cv2
+import numpy as np
+
+from aws_rekognition_library.aws_images import get_square_on_faces
+from aws_rekognition_library.faces import FaceTable, GENDERS
+from benchmarks.common import time_call, percentile, ms
+
+EMOTIONS = ("HAPPY", "CALM", "SAD", "ANGRY", "SURPRISED", "CONFUSED", "DISGUSTED", "FEAR")
+
+# Synthetic DetectFaces response with 'count' small faces, as in a crowd photo
+def crowd_response(count, seed=0):
+    rng = np.random.default_rng(seed)
+    faces = []
+
+    for _ in range(count):
+        width, height = rng.uniform(0.01, 0.05, 2)
+        low = int(rng.integers(1, 70))
+        faces.append({
+            "BoundingBox": {"Left": float(rng.uniform(0, 1 - width)), "Top": float(rng.uniform(0, 1 - height)),
+                            "Width": float(width), "Height": float(height)},
+            "AgeRange": {"Low": low, "High": low + int(rng.integers(2, 12))},
+            "Gender": {"Value": GENDERS[int(rng.integers(1, 3))]},
+            "Emotions": [{"Type": emotion, "Confidence": float(confidence)}
+                         for emotion, confidence in zip(EMOTIONS, rng.dirichlet(np.ones(len(EMOTIONS))) * 100)],
+        })
+
+    return {"FaceDetails": faces}
+
+# Per-face rendering used before the rendering module: colors, sorted emotions and labels computed in the loop
+def legacy_square_on_faces(image, table):
+    image_height, image_width, _ = image.shape
+    boxes = table.pixel_boxes(image_width, image_height)
+
+    for row, (x, y, width, height) in enumerate(boxes):
+        face = table.records[row]
+        gender = GENDERS[table.gender[row]]
+
+        if table.age_low[row] < 18:
+            color = (0, 255, 255)
+        elif gender == "Male":
+            color = (0, 0, 255)
+        elif gender == "Female":
+            color = (0, 255, 0)
+        else:
+            color = (255, 255, 255)
+
+        cv2.rectangle(image, (x, y), (x + width, y + height), color, 2)
+
+        emotions = sorted(face.get("Emotions", []), key=lambda emotion: emotion["Confidence"], reverse=True)[:2]
+        text = ", ".join(f"{emotion['Type']} ({emotion['Confidence']:.1f}%)" for emotion in emotions)
+        label_position = (x, y - 10 if y > 20 else y + height + 20)
+        cv2.putText(image, text, label_position, cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1, cv2.LINE_AA)
+
+    return image
+
+def main():
+    parser = argparse.ArgumentParser(description="Rendering of boxes and labels for 10 to 1000 faces")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--faces', type=int, nargs='*', default=[10, 100, 1000])
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    args = parser.parse_args()
+
+    image = np.full((args.height, args.width, 3), 90, np.uint8)
+
+    print(f"{'faces':>6}{'legacy':>12}{'vectorized':>12}{'speedup':>10}{'top-2 sort':>13}{'argpartition':>14}  identical")
+    for count in args.faces:
+        table = FaceTable(crowd_response(count))
+        canvas = image.copy()
+
+        legacy = percentile(time_call(lambda: legacy_square_on_faces(canvas, table), args.repeat), 50)
+        vectorized = percentile(time_call(lambda: get_square_on_faces(canvas, table), args.repeat), 50)
+
+        # Emotion selection alone: a full sort per row against argpartition of the top 2
+        full_sort = percentile(time_call(lambda: np.argsort(-table.emotions, axis=1, kind='stable')[:, :2], args.repeat), 50)
+        partition = percentile(time_call(lambda: table.top_emotion_columns(2), args.repeat), 50)
+
+        identical = np.array_equal(legacy_square_on_faces(image.copy(), table), get_square_on_faces(image.copy(), table))
+        print(f"{count:>6}{ms(legacy):>12}{ms(vectorized):>12}{legacy / vectorized:>9.2f}x{ms(full_sort):>13}"
+              f"{ms(partition):>14}  {identical}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+import argparse, contextlib, inspect, io, json, os, platform, re, sys, tempfile, time, tracemalloc
+
+import cv2
+import numpy as np
+
+from aws_rekognition_library import aws_images
+from benchmarks.common import resource_images, time_call, percentile, ms
+from open_cv_library import images
+from open_cv_library.cascades import get_cascade, FACE_CASCADE, EYE_CASCADE
+from resources.resources import resources_in_dir, images_aws_json_dir
+
+SIZES = (1, 12, 48)
+JSON_ROUTE = os.path.join(images_aws_json_dir, "family.json")
+RED = (0, 0, 255)
+
+# Public functions that cannot run unattended, with the reason they are left out of the suite
+SKIPPED = {
+    "images.capture_video": "needs a camera",
+    "images.process_webcam": "needs a camera and a display",
+    "aws_images.user_options": "interactive menu",
+    "aws_images.invalid_option": "interactive menu",
+    "aws_images.save_new_image": "interactive (asks for the paths)",
+}
+
+# Coordinates relative to the size of the image, so every case works at every resolution
+def box(fixture, left=0.2, top=0.2, right=0.6, bottom=0.6):
+    height, width = fixture["image"].shape[:2]
+    return (int(width * left), int(height * top)), (int(width * right), int(height * bottom))
+
+# The same box in the ((x1, x2), (y1, y2)) form of the blur functions
+def blur_box(fixture):
+    (x1, y1), (x2, y2) = box(fixture)
+    return (x1, x2), (y1, y2)
+
+def output(fixture, name, extension=".jpg"):
+    return os.path.join(fixture["out_dir"], f"{name}{extension}")
+
+# First 64 KiB of the input, where the size of the image is read from
+def header(fixture):
+    with open(fixture["route"], 'rb') as file:
+        return file.read(1 << 16)
+
+# Silences the messages that some functions print on every call
+def quiet(function):
+    def run(*args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return function(*args)
+    return run
+
+# Case of an in-memory function: it works on a copy of the image made once, since repeating these actions on their own
+# output is valid. 'action' receives the copy and the fixture
+def on_copy(action):
+    def case(fixture):
+        image = fixture["image"].copy()
+        return lambda: action(image, fixture)
+    return case
+
+# Every case receives a fixture (input route, decoded image, gray image and a folder for the outputs) and returns the
+# call to measure
+CASES = {
+    "images.load_image": lambda f: lambda: images.load_image(f["route"]),
+    "images.load_image (scale 1/4)": lambda f: lambda: images.load_image(f["route"], 0.25),
+    "images.decode_reduction": lambda f: lambda: images.decode_reduction(0.3),
+    "images.is_route": lambda f: lambda: images.is_route(f["route"]),
+    "images.input_bytes": lambda f: lambda: images.input_bytes(f["route"]),
+    "images.image_size": lambda f: lambda: images.image_size(f["route"]),
+    "images.header_size": lambda f: (lambda data: lambda: images.header_size(data, lambda: b''))(header(f)),
+    "images.load_thumbnail_source": lambda f: lambda: images.load_thumbnail_source(f["route"], 400),
+    "images.encode_params": lambda f: lambda: images.encode_params(output(f, "encoded"), quality=80),
+    "images.save_image": lambda f: lambda: images.save_image(f["image"], output(f, "saved"), quality=80),
+    "images.encoded_key": lambda f: lambda: images.encoded_key(("get_negative_colors", ()), 80),
+    "images.process_image": lambda f: lambda: images.process_image(f["route"], output(f, "identity"), lambda i: i),
+    "images.rotate_180_action": on_copy(lambda image, f: images.rotate_180_action(image, image)),
+    "images.rotate_180_image": lambda f: lambda: images.rotate_180_image(f["route"], output(f, "rotated")),
+    "images.negative_action": on_copy(lambda image, f: images.negative_action(image, image)),
+    "images.get_negative_colors": lambda f: lambda: images.get_negative_colors(f["route"], output(f, "negative")),
+    "images.gray_action": lambda f: lambda: images.gray_action(f["image"]),
+    "images.get_gray_scale": lambda f: lambda: images.get_gray_scale(f["route"], output(f, "gray")),
+    "images.rectangle_action": on_copy(lambda image, f: images.rectangle_action(image, *box(f), RED)),
+    "images.get_rectangle_with_coordinates":
+        lambda f: lambda: images.get_rectangle_with_coordinates(f["route"], output(f, "rectangle"), *box(f), RED),
+    "images.get_invert_color_inside_square":
+        lambda f: lambda: images.get_invert_color_inside_square(f["route"], output(f, "inverted_square"), *box(f)),
+    "images.get_image_without_odd_values":
+        lambda f: lambda: images.get_image_without_odd_values(f["route"], output(f, "even")),
+    "images.mirror_action": on_copy(lambda image, f: images.mirror_action(image, image)),
+    "images.get_mirror_image": lambda f: lambda: images.get_mirror_image(f["route"], output(f, "mirror")),
+    "images.invert_vertical_action": on_copy(lambda image, f: images.invert_vertical_action(image)),
+    "images.invert_horizontal_action": on_copy(lambda image, f: images.invert_horizontal_action(image)),
+    "images.get_inverted_image":
+        lambda f: lambda: images.get_inverted_image(f["route"], output(f, "inverted"), 'vertical'),
+    "images.get_html_variants": lambda f: lambda: images.get_html_variants(f["image"]),
+    "images.generate_html_images": lambda f: lambda: images.generate_html_images(
+        f["route"], output(f, "mirror"), output(f, "vertical"), output(f, "horizontal")),
+    "images.generate_html_file": lambda f: lambda: images.generate_html_file(
+        f["route"], output(f, "mirror"), output(f, "vertical"), output(f, "horizontal"), output(f, "html", ".html")),
+    "images.text_action": on_copy(lambda image, f: images.text_action(image, *box(f), RED, "Ana")),
+    "images.get_image_with_text":
+        lambda f: lambda: images.get_image_with_text(f["route"], output(f, "text"), *box(f), RED, "Ana"),
+    "images.blur_action": on_copy(lambda image, f: images.blur_action(image, *blur_box(f))),
+    "images.get_image_blurred":
+        lambda f: lambda: images.get_image_blurred(f["route"], output(f, "blurred"), *blur_box(f)),
+    "images.detect_faces": lambda f: lambda: images.detect_faces(f["gray"], get_cascade(FACE_CASCADE)),
+    "images.detect_and_mark_faces":
+        lambda f: lambda: images.detect_and_mark_faces(f["route"], output(f, "detected"), RED, "", blur_faces=True),
+    "images.get_classifier": lambda f: lambda: images.get_classifier(FACE_CASCADE),
+    "images.get_faces_from_frame":
+        on_copy(lambda frame, f: images.get_faces_from_frame(frame, get_cascade(FACE_CASCADE))),
+    "images.get_face_and_eyes_from_webcam": on_copy(lambda frame, f: images.get_face_and_eyes_from_webcam(
+        frame, get_cascade(FACE_CASCADE), get_cascade(EYE_CASCADE))),
+    "images.get_blur_face_from_webcam":
+        on_copy(lambda frame, f: images.get_blur_face_from_webcam(frame, get_cascade(FACE_CASCADE))),
+    "aws_images.apply_blur_to_faces": on_copy(lambda image, f: aws_images.apply_blur_to_faces(image, JSON_ROUTE)),
+    "aws_images.blur_faces": on_copy(lambda image, f: aws_images.blur_faces(image, JSON_ROUTE)),
+    "aws_images.blur_under_18_faces": on_copy(lambda image, f: aws_images.blur_under_18_faces(image, JSON_ROUTE)),
+    "aws_images.get_square_on_faces": on_copy(lambda image, f: aws_images.get_square_on_faces(image, JSON_ROUTE)),
+    "aws_images.apply_labels_to_image": on_copy(quiet(lambda image, f: aws_images.apply_labels_to_image(
+        image, JSON_ROUTE, output(f, "labels", ".json"), labels=[]))),
+}
+
+# Public functions of the benchmarked modules that have neither a case nor a reason to be skipped
+def uncovered():
+    names = [f"{module.__name__.split('.')[-1]}.{name}" for module in (images, aws_images)
+             for name, function in inspect.getmembers(module, inspect.isfunction)
+             if function.__module__ == module.__name__ and not name.startswith('_')]
+
+    return [name for name in names if name not in CASES and name not in SKIPPED]
+
+# Synthetic input of about 'megapixels' MP: the bundled group photo (it has faces to detect) scaled to that size
+def synthetic_image(megapixels):
+    image = cv2.imread(os.path.join(resources_in_dir, "grupo.png"))
+    factor = (megapixels * 1e6 / (image.shape[0] * image.shape[1])) ** 0.5
+
+    return cv2.resize(image, None, fx=factor, fy=factor, interpolation=cv2.INTER_CUBIC)
+
+def make_fixture(name, route, work_dir):
+    image = images.load_image(route)
+    out_dir = os.path.join(work_dir, re.sub(r'\W+', '_', name))
+    os.makedirs(out_dir, exist_ok=True)
+
+    return {"name": name, "route": route, "image": image, "gray": cv2.cvtColor(image, cv2.COLOR_BGR2GRAY),
+            "out_dir": out_dir, "megapixels": image.shape[0] * image.shape[1] / 1e6}
+
+def fixtures(sizes, use_resources, work_dir):
+    for megapixels in sizes:
+        route = os.path.join(work_dir, f"synthetic_{megapixels}mp.jpg")
+        cv2.imwrite(route, synthetic_image(megapixels), [cv2.IMWRITE_JPEG_QUALITY, 95])
+        yield make_fixture(f"synthetic {megapixels} MP", route, work_dir)
+
+    if use_resources:
+        for route in resource_images():
+            yield make_fixture(f"resources/{os.path.basename(route)}", route, work_dir)
+
+# Peak of the memory allocated during one call (Python objects and numpy arrays, which include the cv2 outputs)
+def peak_memory(function):
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def measure(name, fixture, repeat, warmup):
+    result = {"function": name, "fixture": fixture["name"], "megapixels": round(fixture["megapixels"], 3)}
+
+    try:
+        function = CASES[name](fixture)
+        samples = time_call(function, repeat, warmup)
+        peak = peak_memory(function)
+    except Exception as e:
+        return dict(result, error=f"{type(e).__name__}: {str(e).strip()}")
+
+    p50 = percentile(samples, 50)
+    return dict(result, samples=samples, p50=p50, p90=percentile(samples, 90), p99=percentile(samples, 99),
+                mean=sum(samples) / len(samples), calls_per_second=len(samples) / sum(samples),
+                megapixels_per_second=fixture["megapixels"] / p50 if p50 else None, peak_bytes=peak)
+
+def environment():
+    return {"python": platform.python_version(), "opencv": cv2.__version__, "numpy": np.__version__,
+            "platform": platform.platform(), "cpus": os.cpu_count(), "date": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+def run(args):
+    selected = [name for name in CASES if not args.filter or re.search(args.filter, name)]
+    missing = uncovered()
+    if missing:
+        print(f"Warning: public functions without a benchmark case: {', '.join(missing)}", file=sys.stderr)
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for fixture in fixtures(args.sizes, not args.no_resources, work_dir):
+            print(f"\n{fixture['name']} ({fixture['image'].shape[1]}x{fixture['image'].shape[0]})")
+
+            for name in selected:
+                result = measure(name, fixture, args.repeat, args.warmup)
+                results.append(result)
+
+                if "error" in result:
+                    print(f"  {name:<42} ERROR {result['error']}")
+                else:
+                    print(f"  {name:<42}{ms(result['p50'])} p50{ms(result['p99'])} p99"
+                          f"{result['megapixels_per_second']:>12.1f} MP/s{result['peak_bytes'] / 1e6:>9.1f} MB peak")
+
+    report = {"environment": environment(), "repeat": args.repeat, "skipped": SKIPPED, "uncovered": missing,
+              "results": results}
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"\nResults saved in --> {args.output}")
+
+    return 0
+
+# Compares two result files: a case regresses when its p50 (or its peak memory) grows more than the threshold
+# Times below 'min_ms' in both files are ignored, since their noise is larger than any threshold
+def compare(args):
+    with open(args.baseline) as file:
+        baseline = {(result["function"], result["fixture"]): result for result in json.load(file)["results"]}
+    with open(args.candidate) as file:
+        candidate = {(result["function"], result["fixture"]): result for result in json.load(file)["results"]}
+
+    regressions = []
+    print(f"{'function':<42}{'fixture':<26}{'baseline':>12}{'candidate':>12}{'change':>9}{'memory':>9}")
+
+    for key in sorted(baseline.keys() & candidate.keys()):
+        old, new = baseline[key], candidate[key]
+        if "error" in old or "error" in new:
+            print(f"{key[0]:<42}{key[1]:<26}{'error' if 'error' in old else ms(old['p50']):>12}"
+                  f"{'error' if 'error' in new else ms(new['p50']):>12}")
+            if "error" in new and "error" not in old:
+                regressions.append((key, "now fails"))
+            continue
+
+        time_change = new["p50"] / old["p50"] - 1 if old["p50"] else 0.0
+        memory_change = new["peak_bytes"] / old["peak_bytes"] - 1 if old["peak_bytes"] else 0.0
+        flags = []
+
+        if time_change > args.threshold and max(old["p50"], new["p50"]) * 1000 >= args.min_ms:
+            flags.append("SLOWER")
+        if memory_change > args.memory_threshold and new["peak_bytes"] - old["peak_bytes"] >= args.min_bytes:
+            flags.append("MEMORY")
+        if flags:
+            regressions.append((key, " ".join(flags)))
+
+        print(f"{key[0]:<42}{key[1]:<26}{ms(old['p50']):>12}{ms(new['p50']):>12}{time_change:>+9.1%}"
+              f"{memory_change:>+9.1%}  {' '.join(flags)}")
+
+    missing = baseline.keys() - candidate.keys()
+    if missing:
+        print(f"\n{len(missing)} cases of the baseline are not in the candidate, e.g. {' on '.join(min(missing))}")
+
+    print(f"\n{len(regressions)} regressions beyond {args.threshold:.0%} (time) / {args.memory_threshold:.0%} (memory)")
+    for (function, fixture), reason in regressions:
+        print(f"  {reason:<14} {function} on {fixture}")
+
+    return 1 if regressions else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of every public function of open_cv_library.images and "
+                                                 "aws_rekognition_library.aws_images")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the suite and store the results as JSON")
+    run_parser.add_argument('--output', '-o', default=None, help="JSON file for the results")
+    run_parser.add_argument('--sizes', type=int, nargs='*', default=list(SIZES), help="Synthetic images, in MP")
+    run_parser.add_argument('--no-resources', action='store_true', help="Skip the images of resources/resources_in")
+    run_parser.add_argument('--filter', default=None, help="Regular expression on the function names")
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--warmup', type=int, default=1)
+
+    compare_parser = commands.add_parser("compare", help="Flag the regressions of a run against a baseline")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--threshold', type=float, default=0.10, help="Allowed p50 slowdown (0.10 = 10%%)")
+    compare_parser.add_argument('--memory-threshold', type=float, default=0.10, help="Allowed peak memory growth")
+    compare_parser.add_argument('--min-ms', type=float, default=1.0, help="Ignore cases faster than this")
+    compare_parser.add_argument('--min-bytes', type=int, default=1 << 20, help="Ignore smaller memory growths")
+
+    args = parser.parse_args(argv)
+    return run(args) if args.command == "run" else compare(args)
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,64 @@
+import argparse, json, os, resource, subprocess, sys, tempfile, time
+
+import numpy as np
+
+from open_cv_library.tiled import process_tiled, TILED_OPERATIONS
+
+# Whole-image mode: the input is loaded into RAM, processed at once and saved
+def whole(image_route_in, image_route_out, operation):
+    action = TILED_OPERATIONS[operation][0]
+    np.save(image_route_out, action(np.load(image_route_in)))
+
+# Runs one mode in this process and prints its time and peak RSS as JSON. Every mode runs in a fresh process, since
+# the peak RSS never goes down (and Linux keeps it across fork + exec, so the parent never touches the image)
+def child(mode, operation, image_route_in, image_route_out, tile_size):
+    start = time.perf_counter()
+
+    if mode == "generate":
+        side = int(operation)
+        image = np.lib.format.open_memmap(image_route_in, mode='w+', dtype=np.uint8, shape=(side, side, 3))
+        for y in range(0, side, 1024):
+            image[y:y + 1024] = np.random.default_rng(y).integers(0, 256, image[y:y + 1024].shape, np.uint8)
+        image.flush()
+    elif mode == "whole":
+        whole(image_route_in, image_route_out, operation)
+    elif mode == "tiled":
+        process_tiled(image_route_in, image_route_out, operation, tile_size)
+
+    print(json.dumps({"seconds": time.perf_counter() - start,
+                      "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak RSS and throughput: whole-image vs tiled mode")
+    parser.add_argument('--side', type=int, default=8000, help="Side of the synthetic square image")
+    parser.add_argument('--tile-size', type=int, default=1024)
+    parser.add_argument('--operations', nargs='*', default=list(TILED_OPERATIONS))
+    parser.add_argument('--child', nargs=4, metavar=('MODE', 'OPERATION', 'IN', 'OUT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(*args.child, args.tile_size)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        image_route_in = os.path.join(workdir, "input.npy")
+        megapixels = args.side * args.side / 1e6
+
+        def run(mode, operation):
+            output = subprocess.run([sys.executable, '-m', 'benchmarks.tiled_benchmark', '--tile-size',
+                                     str(args.tile_size), '--child', mode, operation, image_route_in,
+                                     os.path.join(workdir, "output.npy")], capture_output=True, text=True, check=True)
+            return json.loads(output.stdout)
+
+        run('generate', str(args.side))
+
+        print(f"{args.side}x{args.side} ({megapixels:.0f} MP, {megapixels * 3:.0f} MB), tiles of {args.tile_size}px")
+        print(f"Peak RSS of the interpreter with the imports only: {run('idle', 'negative')['peak_rss_mb']:.0f} MB\n")
+        print(f"{'operation':<12}{'mode':<8}{'peak RSS':>12}{'throughput':>14}")
+
+        for operation in args.operations:
+            for mode in ("whole", "tiled"):
+                result = run(mode, operation)
+                print(f"{operation:<12}{mode:<8}{result['peak_rss_mb']:>9.0f} MB{megapixels / result['seconds']:>9.1f} MP/s")
+
+if __name__ == '__main__':
+    main()
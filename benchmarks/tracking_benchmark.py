@@ -0,0 +1,58 @@
+import argparse, os, time
+
+import numpy as np
+
+from benchmarks.common import iou
+from open_cv_library.cascades import get_cascade, FACE_CASCADE
+from open_cv_library.tracking import FaceTracker, TRACKERS
+from open_cv_library.video import read_frames, synthetic_frames
+from resources.resources import resources_in_dir
+
+# Drift of the tracked boxes against detecting on every frame: mean IoU and mean center distance of the best match
+# of every reference box, and the share of reference faces without any overlapping tracked box
+def drift(reference, tracked):
+    ious, distances, missed = [], [], 0
+
+    for reference_boxes, tracked_boxes in zip(reference, tracked):
+        for box in reference_boxes:
+            best = max(tracked_boxes, key=lambda other: iou(box, other), default=None)
+            if best is None or iou(box, best) == 0:
+                missed += 1
+                continue
+
+            ious.append(iou(box, best))
+            distances.append(np.hypot(box[0] + box[2] / 2 - best[0] - best[2] / 2, box[1] + box[3] / 2 - best[1] - best[3] / 2))
+
+    total = sum(len(boxes) for boxes in reference)
+    return np.mean(ious) if ious else 0.0, np.mean(distances) if distances else 0.0, missed / total if total else 0.0
+
+def run(frames, keyframe_interval, tracker):
+    face_tracker = FaceTracker(get_cascade(FACE_CASCADE), keyframe_interval, tracker)
+    start = time.perf_counter()
+    boxes = [face_tracker.update(frame) for frame in frames]
+    return boxes, len(frames) / (time.perf_counter() - start), face_tracker.detections
+
+def main():
+    parser = argparse.ArgumentParser(description="Keyframe detection + tracking vs detecting on every frame")
+    parser.add_argument('--video', help="Recorded clip (default: synthetic pan over a sample image)")
+    parser.add_argument('--image', default='grupo.png')
+    parser.add_argument('--frames', type=int, default=120)
+    parser.add_argument('--intervals', type=int, nargs='*', default=[3, 5, 10])
+    args = parser.parse_args()
+
+    source = read_frames(args.video) if args.video else \
+        synthetic_frames(os.path.join(resources_in_dir, args.image), args.frames, (640, 480))
+    frames = [frame for frame, _ in zip(source, range(args.frames))]
+
+    reference, reference_fps, _ = run(frames, 1, "static")
+    print(f"{'mode':<22}{'fps':>8}{'detections':>12}{'mean IoU':>10}{'center drift':>14}{'missed':>8}")
+    print(f"{'every frame':<22}{reference_fps:>8.1f}{len(frames):>12}{1:>10.3f}{0:>11.1f} px{0:>8.1%}")
+
+    for tracker in TRACKERS:
+        for interval in args.intervals:
+            boxes, fps, detections = run(frames, interval, tracker)
+            mean_iou, distance, missed = drift(reference, boxes)
+            print(f"{f'{tracker}, N={interval}':<22}{fps:>8.1f}{detections:>12}{mean_iou:>10.3f}{distance:>11.1f} px{missed:>8.1%}")
+
+if __name__ == '__main__':
+    main()
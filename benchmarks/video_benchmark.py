@@ -0,0 +1,55 @@
+import argparse, os, time
+
+from benchmarks.common import percentile, ms
+from open_cv_library.cascades import load_cascade, FACE_CASCADE, EYE_CASCADE
+from open_cv_library.video import VideoPipeline, read_frames, synthetic_frames, resolve_frame_operation
+from resources.resources import resources_in_dir
+
+# Frame source of the benchmark: a video file when given, otherwise a synthetic pan over a sample image
+def frame_source(args):
+    if args.video:
+        return read_frames(args.video)
+
+    return synthetic_frames(os.path.join(resources_in_dir, args.image), args.frames, (args.width, args.height), args.fps)
+
+# Previous single-loop behaviour: read, detect and output one frame after another
+def sequential(args):
+    operation = resolve_frame_operation(args.operation)
+    cascades = {FACE_CASCADE: load_cascade(FACE_CASCADE), EYE_CASCADE: load_cascade(EYE_CASCADE)}
+    latencies, start = [], time.perf_counter()
+
+    for frame in frame_source(args):
+        captured_at = time.perf_counter()
+        operation(frame, cascades)
+        latencies.append(time.perf_counter() - captured_at)
+
+    seconds = time.perf_counter() - start
+    return {"processed": len(latencies), "dropped": 0, "fps": len(latencies) / seconds, "latencies": latencies}
+
+def report(name, stats):
+    latencies = stats["latencies"]
+    print(f"{name:<14}{stats['fps']:>8.1f}{ms(percentile(latencies, 50)):>14}{ms(percentile(latencies, 99)):>14}"
+          f"{stats['processed']:>11}{stats['dropped']:>9}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless FPS and end-to-end latency of the video pipeline")
+    parser.add_argument('--video', help="Video file to read instead of the synthetic source")
+    parser.add_argument('--image', default='grupo.png', help="Sample image panned by the synthetic source")
+    parser.add_argument('--frames', type=int, default=150)
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--fps', type=float, default=30, help="Pace of the synthetic source (0 = as fast as possible)")
+    parser.add_argument('--operation', default='face_and_eyes')
+    parser.add_argument('--workers', type=int, nargs='*', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    print(f"{'mode':<14}{'fps':>8}{'p50 latency':>14}{'p99 latency':>14}{'processed':>11}{'dropped':>9}")
+    report("sequential", sequential(args))
+
+    # The paced synthetic source stands for a camera, so it drops frames like one; a video file keeps every frame
+    drop = not args.video and bool(args.fps)
+    for workers in args.workers:
+        report(f"{workers} workers", VideoPipeline(frame_source(args), args.operation, workers=workers, drop=drop).run())
+
+if __name__ == '__main__':
+    main()
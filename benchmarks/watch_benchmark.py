@@ -0,0 +1,70 @@
+import argparse, os, tempfile, time
+
+import cv2
+import numpy as np
+
+from benchmarks.common import ms
+from open_cv_library.watch import DirectoryWatcher, file_hash, scan_directory
+
+# Writes 'count' small distinct PNGs spread over folders of 1000 files
+def make_tree(source, count, side):
+    rng = np.random.default_rng(0)
+
+    for i in range(count):
+        directory = os.path.join(source, f"{i // 1000:04d}")
+        if i % 1000 == 0:
+            os.makedirs(directory)
+        cv2.imwrite(os.path.join(directory, f"{i:07d}.png"), rng.integers(0, 256, (side, side, 3), dtype=np.uint8))
+
+def timed_scan(watcher, label):
+    report = watcher.scan()
+    print(f"  {label:<32}{ms(report['seconds'])}   hashed {report['hashed']:>7}   processed {report['processed']:>7}"
+          f"   removed {report['removed']:>5}")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan time of the watch mode on a large tree of images")
+    parser.add_argument('--files', type=int, default=20000)
+    parser.add_argument('--changed', type=float, default=0.01, help="Fraction of files touched or modified")
+    parser.add_argument('--side', type=int, default=16, help="Side of the synthetic images in pixels")
+    parser.add_argument('--operation', default="get_negative_colors")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        source = os.path.join(work_dir, "in")
+        start = time.perf_counter()
+        make_tree(source, args.files, args.side)
+        print(f"{args.files} images of {args.side}x{args.side} written in {time.perf_counter() - start:.1f} s\n")
+
+        routes = sorted(scan_directory(source))
+        step = max(1, round(1 / args.changed))
+
+        start = time.perf_counter()
+        for route in routes:
+            file_hash(route)
+        print(f"  {'hash of every file (baseline)':<32}{ms(time.perf_counter() - start)}\n")
+
+        watcher = DirectoryWatcher(source, args.operation, os.path.join(work_dir, "out"), workers=args.workers,
+                                   settle=0)
+        try:
+            timed_scan(watcher, "first scan (everything new)")
+            timed_scan(watcher, "no changes")
+
+            for route in routes[::step]:
+                os.utime(route)
+            timed_scan(watcher, f"{len(routes[::step])} touched, same content")
+
+            for route in routes[1::step]:
+                cv2.imwrite(route, np.zeros((args.side, args.side, 3), np.uint8))
+            timed_scan(watcher, f"{len(routes[1::step])} modified")
+
+            for route in routes[2::step]:
+                os.remove(route)
+            timed_scan(watcher, f"{len(routes[2::step])} removed")
+            timed_scan(watcher, "no changes")
+        finally:
+            watcher.close()
+
+if __name__ == '__main__':
+    main()
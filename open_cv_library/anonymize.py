@@ -0,0 +1,70 @@
+import cv2
+
+# The effect of every method scales with the region: the kernel is this fraction of its shortest side
+KERNEL_FRACTION = 0.4
+
+# Regions are blurred at a reduced resolution whose shortest side is at most this many pixels
+REDUCED_SIDE = 48
+
+# Function that returns an odd kernel size proportional to the size of a region
+def kernel_size(width, height, fraction=KERNEL_FRACTION):
+    return max(3, int(min(width, height) * fraction) | 1)
+
+def odd(value):
+    return max(3, int(value) | 1)
+
+# Gaussian blur computed on a reduced copy of the region and upsampled back: the cost no longer depends on the kernel
+# and barely on the size of the region
+def gaussian_method(region, kernel):
+    height, width = region.shape[:2]
+    factor = min(1.0, REDUCED_SIDE / min(height, width))
+
+    if factor == 1.0:
+        return cv2.GaussianBlur(region, (kernel, kernel), 0)
+
+    small = cv2.resize(region, (max(1, round(width * factor)), max(1, round(height * factor))), interpolation=cv2.INTER_AREA)
+    small = cv2.GaussianBlur(small, (odd(kernel * factor), odd(kernel * factor)), 0)
+
+    return cv2.resize(small, (width, height), interpolation=cv2.INTER_LINEAR)
+
+# Three stacked box filters (cv2.blur is separable and uses running sums, so its cost does not grow with the kernel)
+# approximate a Gaussian blur of the same kernel at full resolution
+def box_method(region, kernel):
+    kernel = odd(kernel / 2)
+
+    for _ in range(3):
+        region = cv2.blur(region, (kernel, kernel))
+
+    return region
+
+# Mosaic: every block is replaced by its mean color (INTER_AREA averages the block, INTER_NEAREST paints it back)
+def pixelate_method(region, kernel):
+    height, width = region.shape[:2]
+    block = max(2, kernel // 4)
+    small = cv2.resize(region, (max(1, width // block), max(1, height // block)), interpolation=cv2.INTER_AREA)
+
+    return cv2.resize(small, (width, height), interpolation=cv2.INTER_NEAREST)
+
+METHODS = {
+    "gaussian": gaussian_method,
+    "box": box_method,
+    "pixelate": pixelate_method,
+}
+
+# Function that anonymizes the region (x, y, w, h) of an image in place with the selected method
+# The region is clipped to the image bounds and the kernel is scaled with its size unless one is given
+def anonymize_region(image, x, y, width, height, method="gaussian", kernel=None):
+    if method not in METHODS:
+        raise ValueError(f"Invalid method: {method}. Choose between {', '.join(METHODS)}")
+
+    image_height, image_width = image.shape[:2]
+    x0, y0 = max(int(x), 0), max(int(y), 0)
+    x1, y1 = min(int(x + width), image_width), min(int(y + height), image_height)
+
+    if x1 <= x0 or y1 <= y0:
+        return image
+
+    region = image[y0:y1, x0:x1]
+    image[y0:y1, x0:x1] = METHODS[method](region, kernel or kernel_size(x1 - x0, y1 - y0))
+
+    return image
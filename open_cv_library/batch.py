@@ -0,0 +1,150 @@
+import argparse, ast, glob, os, time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from open_cv_library import images
+from open_cv_library.cascades import get_cascade, FACE_CASCADE
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# Function that lists the images of a directory, or the files matching a glob pattern
+def list_images(source):
+    if os.path.isdir(source):
+        source = os.path.join(source, '*')
+
+    return sorted(path for path in glob.glob(source, recursive=True) if path.lower().endswith(IMAGE_EXTENSIONS))
+
+# Function that returns the folder the paths of a source are relative to: the directory itself, or the part of a glob
+# pattern before its first wildcard (e.g. 'photos' for 'photos/**/*.jpg')
+def source_root(source):
+    if os.path.isdir(source):
+        return source
+
+    parts = []
+    for part in os.path.normpath(source).split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+
+    return os.sep.join(parts) or '.'
+
+# Function that returns the output of an input: its path relative to the source, mirrored under 'output_dir', so
+# images with the same name in different folders of a recursive glob do not overwrite each other
+def output_route(path, root, output_dir):
+    return os.path.join(output_dir, os.path.relpath(path, root))
+
+# Function that returns the name of an operation from 'open_cv_library.images', so it can be sent to the workers
+def resolve_operation(operation):
+    name = operation if isinstance(operation, str) else getattr(operation, '__name__', None)
+
+    if not name or name.startswith('_') or not callable(getattr(images, name, None)):
+        raise ValueError(f"Invalid operation: {operation}. It must be a function from open_cv_library.images")
+
+    return name
+
+# Function that runs once in every worker: loads the heavy state (cascades) before the first task arrives
+def init_worker(operation_name):
+    if operation_name == 'detect_and_mark_faces':
+        get_cascade(FACE_CASCADE)
+
+# Function that processes a chunk of images inside a worker and reports the result of each one
+# With a ResultCache in 'kwargs', every result also says whether it was a cache hit ('cached': True/False, None when the
+# cache was not looked up), since the counters of the copy of the cache in the worker do not reach the parent
+def process_chunk(operation_name, tasks, kwargs):
+    operation = getattr(images, operation_name)
+    cache = kwargs.get("cache")
+    results = []
+
+    for image_route_in, image_route_out in tasks:
+        start = time.perf_counter()
+        hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+
+        try:
+            operation(image_route_in, image_route_out, **kwargs)
+            result = {"input": image_route_in, "output": image_route_out, "ok": True, "error": None}
+        except Exception as e:
+            result = {"input": image_route_in, "output": None, "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+        result["seconds"] = time.perf_counter() - start
+        if cache is not None:
+            result["cached"] = True if cache.hits > hits else False if cache.misses > misses else None
+        results.append(result)
+
+    return results
+
+# Function that applies an operation to every image of a directory (or glob) using a pool of processes
+# Images are sent in chunks and only 'max_in_flight' chunks are queued at a time, so memory does not grow with the
+# number of files. Errors in one file do not stop the batch: they are returned in the report
+def process_batch(source, operation, output_dir, workers=None, chunksize=16, max_in_flight=None, **kwargs):
+    operation_name = resolve_operation(operation)
+    os.makedirs(output_dir, exist_ok=True)
+
+    root = source_root(source)
+    tasks = [(path, output_route(path, root, output_dir)) for path in list_images(source)]
+    for directory in {os.path.dirname(image_route_out) for _, image_route_out in tasks}:
+        os.makedirs(directory, exist_ok=True)
+    chunks = [tasks[i:i + chunksize] for i in range(0, len(tasks), chunksize)]
+
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 2
+    report = []
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(operation_name,)) as executor:
+        pending = set()
+        chunks = iter(chunks)
+
+        for chunk in chunks:
+            pending.add(executor.submit(process_chunk, operation_name, chunk, kwargs))
+
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    report.extend(future.result())
+
+        for future in wait(pending).done:
+            report.extend(future.result())
+
+    # The workers only added entries to the cache: the parent counts their hits and misses and evicts once
+    cache = kwargs.get("cache")
+    if cache is not None:
+        cache.hits += sum(result.get("cached") is True for result in report)
+        cache.misses += sum(result.get("cached") is False for result in report)
+        cache.refresh()
+
+    report.sort(key=lambda result: result["input"])
+    return report
+
+# Parses the extra 'key=value' arguments of the command line as Python literals, e.g. color=(0,255,0)
+def parse_kwargs(values):
+    kwargs = {}
+
+    for value in values or []:
+        key, _, literal = value.partition('=')
+        kwargs[key] = ast.literal_eval(literal)
+
+    return kwargs
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply an operation from open_cv_library.images to many images")
+    parser.add_argument('source', help="Directory or glob pattern with the input images")
+    parser.add_argument('operation', help="Function name, e.g. get_gray_scale")
+    parser.add_argument('output_dir')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunksize', type=int, default=16)
+    parser.add_argument('--max-in-flight', type=int, default=None)
+    parser.add_argument('--arg', action='append', help="Extra argument of the operation as key=value")
+    args = parser.parse_args(argv)
+
+    report = process_batch(args.source, args.operation, args.output_dir, args.workers, args.chunksize,
+                           args.max_in_flight, **parse_kwargs(args.arg))
+
+    for result in report:
+        status = "OK   " if result["ok"] else "ERROR"
+        print(f"{status} {result['input']} ({result['seconds'] * 1000:.1f} ms){' ' + result['error'] if result['error'] else ''}")
+
+    errors = sum(not result["ok"] for result in report)
+    print(f"\n{len(report) - errors} processed, {errors} errors")
+
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,43 @@
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+# Pool of reusable ndarrays grouped by shape and dtype, so loops that need a new buffer on every iteration (e.g. one
+# per video frame) reuse the ones released by previous iterations instead of allocating them again
+class BufferPool:
+
+    def __init__(self, max_per_shape=8):
+        self.max_per_shape = max_per_shape
+        self.buffers = defaultdict(list)
+        self.lock = threading.Lock()
+        self.allocated = 0
+        self.reused = 0
+
+    # Returns a buffer of the given shape and dtype; its content is undefined
+    def acquire(self, shape, dtype=np.uint8):
+        key = (tuple(shape), np.dtype(dtype))
+
+        with self.lock:
+            if self.buffers[key]:
+                self.reused += 1
+                return self.buffers[key].pop()
+
+            self.allocated += 1
+
+        return np.empty(shape, dtype=dtype)
+
+    # Gives a buffer back to the pool. The caller must not use it afterwards
+    def release(self, buffer):
+        key = (buffer.shape, buffer.dtype)
+
+        with self.lock:
+            if len(self.buffers[key]) < self.max_per_shape:
+                self.buffers[key].append(buffer)
+
+# Function that returns 'buffer' when it can hold an array of the given shape and dtype, or a new one otherwise
+def reuse(buffer, shape, dtype=np.uint8):
+    if buffer is not None and buffer.shape == tuple(shape) and buffer.dtype == dtype:
+        return buffer
+
+    return np.empty(shape, dtype=dtype)
@@ -0,0 +1,154 @@
+import hashlib, os, shutil, tempfile, threading
+from collections import OrderedDict
+
+# Content hashes remembered by a cache (see ResultCache.content_hash): the least recently used ones are dropped
+HASH_CACHE_SIZE = 4096
+
+# On-disk cache of the images generated by the operations, keyed by the content of the input, the operation, its
+# parameters and the output format. A hit copies the stored file to the output, skipping decode, processing and
+# encode. Entries are written atomically and the least recently used ones are evicted above 'max_bytes', down to
+# 'low_water' (a fraction of it), so a full cache does not evict on every insert
+# The recency order is kept in memory ({entry route: size}, built from the modification times by 'refresh'). Copies
+# sent to other processes (e.g. the workers of process_batch) travel without it and never evict, not even their own
+# entries: process_batch refreshes the cache of the parent once at the end, which evicts what the workers added, and
+# adds back the hits and misses the workers counted
+class ResultCache:
+
+    def __init__(self, directory, max_bytes=1 << 30, low_water=0.9):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.hashes = OrderedDict()
+        self.evicts = True
+
+        os.makedirs(directory, exist_ok=True)
+        self.refresh()
+
+    # The lock and the index are not sent to other processes (e.g. when the cache is an argument of process_batch), and
+    # the copies do not evict
+    def __getstate__(self):
+        state = dict(self.__dict__, index=OrderedDict(), size=0, evicts=False)
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, lock=threading.Lock())
+
+    # Rebuilds the index from the directory (least recently used first) and evicts if the cache is over 'max_bytes'
+    def refresh(self):
+        entries = []
+        for route in self.entries():
+            try:
+                stat = os.stat(route)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, route, stat.st_size))
+
+        with self.lock:
+            self.index = OrderedDict((route, size) for _, route, size in sorted(entries))
+            self.size = sum(self.index.values())
+            if self.size > self.max_bytes:
+                self.evict()
+
+    def entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.tmp'):
+                    yield os.path.join(root, name)
+
+    # Hash of the content of a file, remembered while its size and modification time do not change (for the last
+    # HASH_CACHE_SIZE files). An encoded image in memory (bytes, memoryview, mmap...) is hashed and not remembered
+    def content_hash(self, route):
+        if not isinstance(route, (str, os.PathLike)):
+            return hashlib.sha256(memoryview(route).cast('B')).hexdigest()
+
+        stat = os.stat(route)
+        version = (os.path.abspath(route), stat.st_size, stat.st_mtime_ns)
+
+        with self.lock:
+            if version in self.hashes:
+                self.hashes.move_to_end(version)
+                return self.hashes[version]
+
+        digest = hashlib.sha256()
+        with open(route, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+
+        with self.lock:
+            self.hashes[version] = digest.hexdigest()
+            while len(self.hashes) > HASH_CACHE_SIZE:
+                self.hashes.popitem(last=False)
+
+        return digest.hexdigest()
+
+    def key(self, image_route_in, operation, params, extension):
+        text = f"{self.content_hash(image_route_in)}|{operation}|{params!r}|{extension.lower()}"
+        return hashlib.sha256(text.encode()).hexdigest() + extension.lower()
+
+    def entry_route(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    # Copies the cached result to 'image_route_out'. Returns False on a miss
+    def get(self, key, image_route_out):
+        entry_route = self.entry_route(key)
+
+        try:
+            shutil.copyfile(entry_route, image_route_out)
+            os.utime(entry_route)  # Marks the entry as recently used
+        except FileNotFoundError:
+            with self.lock:
+                self.misses += 1
+                self.size -= self.index.pop(entry_route, 0)
+            return False
+
+        with self.lock:
+            self.hits += 1
+            if entry_route in self.index:
+                self.index.move_to_end(entry_route)
+            else:
+                # Written by another process sharing the directory
+                self.index[entry_route] = os.path.getsize(entry_route)
+                self.size += self.index[entry_route]
+        return True
+
+    # Stores a generated file: it is copied to a temporary file and renamed, so readers never see partial entries
+    def put(self, key, image_route_out):
+        entry_route = self.entry_route(key)
+        os.makedirs(os.path.dirname(entry_route), exist_ok=True)
+
+        descriptor, temporary_route = tempfile.mkstemp(dir=os.path.dirname(entry_route), suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as target, open(image_route_out, 'rb') as source:
+                shutil.copyfileobj(source, target)
+            size = os.path.getsize(temporary_route)
+            os.replace(temporary_route, entry_route)
+        except BaseException:
+            os.remove(temporary_route)
+            raise
+
+        with self.lock:
+            self.size += size - self.index.pop(entry_route, 0)
+            self.index[entry_route] = size
+            if self.evicts and self.size > self.max_bytes:
+                self.evict()
+
+    # Removes the least recently used entries until the cache fits in 'low_water' * 'max_bytes'
+    # Runs with the lock held and never walks the directory
+    def evict(self):
+        while self.index and self.size > self.max_bytes * self.low_water:
+            route, size = self.index.popitem(last=False)
+            self.size -= size
+
+            try:
+                os.remove(route)
+            except FileNotFoundError:
+                pass  # Already evicted by another process
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0,
+                "bytes": self.size, "max_bytes": self.max_bytes}
@@ -0,0 +1,58 @@
+import os, threading
+
+import cv2
+
+FACE_CASCADE = 'haarcascade_frontalface_default.xml'
+EYE_CASCADE = 'haarcascade_eye.xml'
+
+# Folder with the cascades bundled with the library (this same folder)
+CASCADES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Classifiers of every thread: {cascade name: classifier}. A CascadeClassifier is not safe to share between threads
+# running detectMultiScale, so each thread gets its own instance. 'clear_cascades' bumps the generation, which makes
+# every thread parse its classifiers again
+_local = threading.local()
+_generation = 0
+
+# Function that finds a cascade: absolute or existing paths are used as they are, plain names are looked up in the
+# copies bundled in 'open_cv_library/' and then in the OpenCV data folder, so it does not depend on the CWD
+def resolve_cascade(cascade_name):
+    if os.path.isfile(cascade_name):
+        return os.path.abspath(cascade_name)
+
+    for directory in (CASCADES_DIR, cv2.data.haarcascades):
+        cascade_route = os.path.join(directory, os.path.basename(cascade_name))
+        if os.path.isfile(cascade_route):
+            return cascade_route
+
+    raise FileNotFoundError(f"Cascade {cascade_name} not found!")
+
+# Function that parses a cascade XML into a new classifier
+def load_cascade(cascade_name):
+    cascade_route = resolve_cascade(cascade_name)
+    cascade = cv2.CascadeClassifier(cascade_route)
+
+    if cascade.empty():
+        raise Exception (f"Error loading classifier from {cascade_route}!")
+
+    return cascade
+
+# Function that returns the classifier of a cascade for the calling thread, parsing its XML only the first time the
+# thread requests it. Processes with a single thread (e.g. the batch workers) parse every cascade once
+def get_cascade(cascade_name):
+    cascades = getattr(_local, "cascades", None)
+
+    if cascades is None or _local.generation != _generation:
+        cascades = _local.cascades = {}
+        _local.generation = _generation
+
+    cascade = cascades.get(cascade_name)
+    if cascade is None:
+        cascade = cascades[cascade_name] = load_cascade(cascade_name)
+
+    return cascade
+
+# Function that forgets the loaded classifiers of every thread (mainly for benchmarks)
+def clear_cascades():
+    global _generation
+    _generation += 1
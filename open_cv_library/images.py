@@ -1,48 +1,207 @@
-import cv2
+import cv2, os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from open_cv_library import metrics
+from open_cv_library.anonymize import anonymize_region
+from open_cv_library.cascades import get_cascade, FACE_CASCADE
+
+# Decode flags for every reduction of the decoder (1, 2, 4 or 8): (color, gray)
+DECODE_FLAGS = {
+    1: (cv2.IMREAD_COLOR, cv2.IMREAD_GRAYSCALE),
+    2: (cv2.IMREAD_REDUCED_COLOR_2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+    4: (cv2.IMREAD_REDUCED_COLOR_4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+    8: (cv2.IMREAD_REDUCED_COLOR_8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+}
+
+# Function that returns the largest reduction of the decoder (1, 2, 4 or 8) that keeps at least 'scale' of every side
+def decode_reduction(scale):
+    if not scale or scale >= 1:
+        return 1
+
+    return max(reduction for reduction in DECODE_FLAGS if 1 / reduction >= scale)
+
+# Function that tells whether an input is a path or an encoded image in memory
+def is_route(image_in):
+    return isinstance(image_in, (str, os.PathLike))
 
 # Function to load an image
-def load_image(image_route_in):
-    image = cv2.imread(image_route_in)
+# 'image_route_in' is a path or the encoded image in memory (bytes, bytearray, memoryview, mmap or a uint8 numpy
+# array), which is decoded with cv2.imdecode, e.g. images from archives or sockets, without a temporary file
+# With a 'scale' below 1 the image is decoded at 1/2, 1/4 or 1/8 of its size (the smallest that keeps at least that
+# scale): JPEG decodes directly at those sizes, which is much faster than a full decode. With 'gray' the image is
+# decoded straight to a single channel
+def load_image(image_route_in, scale=None, gray=False):
+    flags = DECODE_FLAGS[decode_reduction(scale)][bool(gray)]
+
+    if is_route(image_route_in):
+        image = cv2.imread(os.fspath(image_route_in), flags)
+    else:
+        image = cv2.imdecode(np.frombuffer(image_route_in, np.uint8), flags)
 
     if image is None:
         raise ValueError("Image not found!")
 
     return image
 
+# Size in bytes of an input: the file of a route, or the encoded buffer itself
+def input_bytes(image_route_in):
+    return os.path.getsize(image_route_in) if is_route(image_route_in) else memoryview(image_route_in).nbytes
+
+# Function that reads the size (width, height) of a JPEG or PNG from its header, without decoding it
+# Returns None for other formats. The size is the stored one: cv2.imread may rotate it following the EXIF orientation
+def image_size(image_route_in):
+    if not is_route(image_route_in):
+        return header_size(memoryview(image_route_in).cast('B'), lambda: b'')
+
+    # The header is walked while the file is open: large EXIF/ICC/XMP segments push the start of frame further
+    with open(image_route_in, 'rb') as file:
+        return header_size(file.read(1 << 16), lambda: file.read(1 << 16))
+
+# Function that finds the size in the first bytes of a PNG or JPEG, calling 'read_more' when it needs more of them
+def header_size(data, read_more):
+    if bytes(data[:8]) == b"\x89PNG\r\n\x1a\n" and bytes(data[12:16]) == b"IHDR":
+        return int.from_bytes(data[16:20], 'big'), int.from_bytes(data[20:24], 'big')
+
+    if bytes(data[:2]) != b"\xff\xd8":
+        return None
+
+    # JPEG: walk the segments until the start of frame (SOF0-SOF15, except DHT, JPG and DAC)
+    position = 2
+    while True:
+        while len(data) < position + 9:
+            more = read_more()
+            if not more:
+                return None
+            data = bytes(data) + more
+
+        if data[position] != 0xFF:
+            return None
+
+        marker = data[position + 1]
+        if marker == 0xFF:
+            position += 1
+        elif marker in (0x01, *range(0xD0, 0xD9)):
+            position += 2
+        elif 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            return (int.from_bytes(data[position + 7:position + 9], 'big'),
+                    int.from_bytes(data[position + 5:position + 7], 'big'))
+        else:
+            position += 2 + int.from_bytes(data[position + 2:position + 4], 'big')
+
+# Function that returns the cv2.imwrite/cv2.imencode parameters of an output (a route or an extension such as '.jpg'):
+# 'quality' (0-100) for JPEG and WebP and 'compression' (0-9) for PNG. Parameters that do not apply are ignored
+def encode_params(image_route_out, quality=None, compression=None):
+    extension = (os.path.splitext(image_route_out)[1] or image_route_out).lower()
+    params = []
+
+    if quality is not None and extension in ('.jpg', '.jpeg', '.jpe'):
+        params += [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+    elif quality is not None and extension == '.webp':
+        params += [cv2.IMWRITE_WEBP_QUALITY, int(quality)]
+    elif compression is not None and extension == '.png':
+        params += [cv2.IMWRITE_PNG_COMPRESSION, int(compression)]
+
+    return params
+
+# Function to save an image with the encode parameters of its format (see encode_params)
+def save_image(image, image_route_out, quality=None, compression=None):
+    return cv2.imwrite(image_route_out, image, encode_params(image_route_out, quality, compression))
+
+# Function that adds the encode parameters to the cache key of an operation, only when they are given, so the keys of
+# the default encoding do not change
+def encoded_key(key, quality=None, compression=None):
+    if key is None or (quality is None and compression is None):
+        return key
+
+    name, params = key
+    return name, params + (("quality", quality), ("compression", compression))
+
 # Function to process an image
-def process_image(image_route_in, image_route_out, action):
-    image = load_image(image_route_in)
+# The decode, process and encode stages are reported to the metrics sinks, if any (see open_cv_library/metrics.py)
+# With a ResultCache (see open_cv_library/cache.py) and a 'key' = (operation name, parameters), an unchanged input is
+# served from the cache without decoding, processing or encoding it again (an input in memory is keyed by its bytes)
+# 'quality' and 'compression' are the encode parameters of the output (see encode_params): every operation below that
+# writes a file takes them too, so they also work through process_batch and the watch mode
+def process_image(image_route_in, image_route_out, action, cache=None, key=None, quality=None, compression=None):
+    key = encoded_key(key, quality, compression)
+
+    if cache is not None and key is not None:
+        cache_key = cache.key(image_route_in, *key, os.path.splitext(image_route_out)[1])
+
+        if cache.get(cache_key, image_route_out):
+            metrics.count("cache_hits")
+            return image_route_out
+
+    with metrics.stage("decode"):
+        image = load_image(image_route_in)
 
     if image is None:
         raise ValueError("Image not found!")
 
-    image_processed = action(image)
-    cv2.imwrite(image_route_out, image_processed)
+    with metrics.stage("process"):
+        image_processed = action(image)
+
+    with metrics.stage("encode"):
+        save_image(image_processed, image_route_out, quality, compression)
+
+    if metrics.enabled():
+        metrics.count("bytes_read", input_bytes(image_route_in))
+        metrics.count("bytes_written", os.path.getsize(image_route_out))
+
+    if cache is not None and key is not None:
+        cache.put(cache_key, image_route_out)
 
     return image_route_out
 
+# The in-memory actions write their result into 'dst' when one is given (a preallocated buffer of the right shape, or
+# the image itself for the actions that can run in place) instead of allocating a new array
+
+# Function that rotates an image 180º in memory (it can run in place)
+def rotate_180_action(image, dst=None):
+    return cv2.rotate(image, cv2.ROTATE_180, dst=dst)
+
 # Function to rotate an image 180º and generate a new one
-def rotate_180_image(image_route_in, image_route_out):
-    return process_image(image_route_in, image_route_out, lambda image: cv2.rotate(image, cv2.ROTATE_180))
+def rotate_180_image(image_route_in, image_route_out, cache=None, quality=None, compression=None):
+    return process_image(image_route_in, image_route_out, lambda image: rotate_180_action(image, image), cache,
+                         ("rotate_180_image", ()), quality, compression)
+
+# Function that inverts the colors of an image in memory (it can run in place)
+def negative_action(image, dst=None):
+    return cv2.bitwise_not(image, dst=dst)
 
 # Function to generate a negative color image
-def get_negative_colors(image_route_in, image_route_out):
-    return process_image(image_route_in, image_route_out, cv2.bitwise_not)
+def get_negative_colors(image_route_in, image_route_out, cache=None, quality=None, compression=None):
+    return process_image(image_route_in, image_route_out, lambda image: negative_action(image, image), cache,
+                         ("get_negative_colors", ()), quality, compression)
+
+# Function that converts an image to gray scale in memory ('dst' must be a single-channel buffer)
+def gray_action(image, dst=None):
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=dst)
 
 # Function to generate a gray scale image
-def get_gray_scale(image_route_in, image_route_out):
-    return process_image(image_route_in, image_route_out, lambda image: cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
+def get_gray_scale(image_route_in, image_route_out, cache=None, quality=None, compression=None):
+    return process_image(image_route_in, image_route_out, gray_action, cache, ("get_gray_scale", ()), quality,
+                         compression)
+
+# Function that draws a square from two coordinates in memory
+def rectangle_action(image, first_coordinate, second_coordinate, color):
+    return cv2.rectangle(image, first_coordinate, second_coordinate, color, 2)
 
 # Function to generate a square from two coordinates
-def get_rectangle_with_coordinates(image_route_in, image_route_out, first_coordinate, second_coordinate, color):
-    return process_image(image_route_in, image_route_out, lambda image: cv2.rectangle(image, first_coordinate, second_coordinate, color, 2))
+def get_rectangle_with_coordinates(image_route_in, image_route_out, first_coordinate, second_coordinate, color,
+                                   cache=None, quality=None, compression=None):
+    return process_image(image_route_in, image_route_out,
+                         lambda image: rectangle_action(image, first_coordinate, second_coordinate, color), cache,
+                         ("get_rectangle_with_coordinates", (first_coordinate, second_coordinate, color)), quality,
+                         compression)
 
 # Function to generate a new image that invert the colors inside the square box
 def get_invert_color_inside_square(image_route_in, image_route_out, first_coordinate, second_coordinate):
     return process_image(image_route_in, image_route_out, lambda image: cv2.bitwise_not(image, first_coordinate, second_coordinate))  # Fix error
 
 # Function to generate a new image to avoid dimensions with odd values
-def get_image_without_odd_values(image_route_in, image_route_out):
+def get_image_without_odd_values(image_route_in, image_route_out, cache=None, quality=None, compression=None):
 
     def dimensions(image):
         height, weight = image.shape[:2]
@@ -51,56 +210,135 @@ def get_image_without_odd_values(image_route_in, image_route_out):
 
         return image[:new_height, :new_weight]
 
-    return process_image(image_route_in, image_route_out, dimensions)
+    return process_image(image_route_in, image_route_out, dimensions, cache, ("get_image_without_odd_values", ()),
+                         quality, compression)
+
+# Function that mirrors an image in memory (it can run in place)
+def mirror_action(image, dst=None):
+    return cv2.flip(image, 1, dst=dst)
 
 # Function to generate a new mirror-image
-def get_mirror_image(image_route_in, image_route_out):
-    return process_image(image_route_in, image_route_out, lambda image: cv2.flip(image, 1))
+def get_mirror_image(image_route_in, image_route_out, cache=None, quality=None, compression=None):
+    return process_image(image_route_in, image_route_out, lambda image: mirror_action(image, image), cache,
+                         ("get_mirror_image", ()), quality, compression)
 
-# Function to generate an invert the left half and copy it to the right
-def get_inverted_image(image_route_in, image_route_out, type):
+# Function that inverts the left half of an image and copies it to the right, in memory
+# It runs in place unless a different 'dst' is given. With an odd width the middle column is kept
+def invert_vertical_action(image, dst=None):
+    height, width = image.shape[:2]
+    half = width // 2
 
-    inverted_path = image_route_out.replace(".jpg", f"_{type}.jpg")
+    if dst is None:
+        dst = image
+    elif dst is not image:
+        dst[:, :width - half] = image[:, :width - half]
 
-    def invert_vertical_image(image):
-        height, width, _ = image.shape
-        half = width // 2
-        image_inverted = cv2.flip(image[:, :half], 1)
-        image[:, half:] = image_inverted
+    cv2.flip(image[:, :half], 1, dst=dst[:, width - half:])
 
-        return image
+    return dst
 
-    def invert_horizontal_image(image):
-        height, width, _ = image.shape
-        half = height // 2
+# Function that inverts the top half of an image and copies it to the bottom, in memory
+# It runs in place unless a different 'dst' is given. With an odd height the middle row is kept
+def invert_horizontal_action(image, dst=None):
+    height, width = image.shape[:2]
+    half = height // 2
 
-        if height % 2 == 0:
-            image_inverted = cv2.flip(image[:half, :], 0)
-        else:
-            image_inverted = cv2.flip(image[:half + 1, :], 0)
+    if dst is None:
+        dst = image
+    elif dst is not image:
+        dst[:height - half] = image[:height - half]
 
+    cv2.flip(image[:half], 0, dst=dst[height - half:])
 
-        image[half:, :] = image_inverted[:height - half, :]
+    return dst
 
-        return image
+# Function to generate an invert the left half and copy it to the right
+def get_inverted_image(image_route_in, image_route_out, type, cache=None, quality=None, compression=None):
+
+    inverted_path = image_route_out.replace(".jpg", f"_{type}.jpg")
 
     if type == 'vertical':
-        result = process_image(image_route_in, image_route_out, invert_vertical_image)
+        result = process_image(image_route_in, image_route_out, invert_vertical_action, cache,
+                               ("get_inverted_image", (type,)), quality, compression)
     elif type == 'horizontal':
-        result =  process_image(image_route_in, image_route_out, invert_horizontal_image)
+        result =  process_image(image_route_in, image_route_out, invert_horizontal_action, cache,
+                                ("get_inverted_image", (type,)), quality, compression)
     else:
         raise ValueError(f"Invalid type: {type}. Choose between 'vertical' or 'horizontal'")
 
     return inverted_path if result else None
 
 
+# Function that computes the mirror, vertical and horizontal images of 'generate_html_file' from one decoded image
+# Every variant is written straight into its own array, without intermediate copies
+def get_html_variants(image):
+    mirror = mirror_action(image)
+    vertical = invert_vertical_action(image, np.empty_like(image))
+    horizontal = invert_horizontal_action(image, np.empty_like(image))
+
+    return mirror, vertical, horizontal
+
+
+# Function that decodes an image that is going to be scaled down to 'thumbnail_width': the decoder skips the pixels
+# that the thumbnail does not need (see load_image), using the size in the header of the file
+def load_thumbnail_source(image_route_in, thumbnail_width=None):
+    size = image_size(image_route_in) if thumbnail_width else None
+    if not size:
+        return load_image(image_route_in)
+
+    image = load_image(image_route_in, thumbnail_width / size[0])
+
+    # An EXIF rotation swaps the sides of the header: decode again at full size if the image became too narrow
+    return image if image.shape[1] >= thumbnail_width else load_image(image_route_in)
+
+# Function that generates the three images of 'generate_html_file' decoding the original only once and encoding the
+# outputs concurrently (cv2.imwrite releases the GIL). With 'thumbnail_width' the images are generated at that width
+# instead of full size, from a reduced decode. With a ResultCache only the missing images are generated
+# 'quality' and 'compression' are the encode parameters of the images (see encode_params)
+def generate_html_images(image_route_in, mirror_image_out, vertical_image_out, horizontal_image_out, cache=None,
+                         thumbnail_width=None, quality=None, compression=None):
+    outputs = [mirror_image_out, vertical_image_out, horizontal_image_out]
+    keys = [("get_mirror_image", ()), ("get_inverted_image", ('vertical',)), ("get_inverted_image", ('horizontal',))]
+
+    if thumbnail_width:
+        keys = [(name, params + (("thumbnail_width", thumbnail_width),)) for name, params in keys]
+    keys = [encoded_key(key, quality, compression) for key in keys]
+
+    if cache is not None:
+        keys = [cache.key(image_route_in, *key, os.path.splitext(output)[1]) for key, output in zip(keys, outputs)]
+        missing = [i for i, (key, output) in enumerate(zip(keys, outputs)) if not cache.get(key, output)]
+    else:
+        missing = [0, 1, 2]
+
+    if missing:
+        image = load_thumbnail_source(image_route_in, thumbnail_width)
+
+        if thumbnail_width and image.shape[1] > thumbnail_width:
+            thumbnail_height = max(1, round(image.shape[0] * thumbnail_width / image.shape[1]))
+            image = cv2.resize(image, (thumbnail_width, thumbnail_height), interpolation=cv2.INTER_AREA)
+
+        variants = get_html_variants(image)
+
+        with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+            list(executor.map(lambda i: save_image(variants[i], outputs[i], quality, compression), missing))
+
+        if cache is not None:
+            for i in missing:
+                cache.put(keys[i], outputs[i])
+
+    return outputs
+
+
 # Function to generate an HTML document where it shows the original image and the ones which where generated in
-# 'get_inverted_image' and 'get_mirror_image'
-def generate_html_file(image_route_in, mirror_image_out, vertical_image_out, horizontal_image_out, html_out):
+# 'get_inverted_image' and 'get_mirror_image'. The three images are generated together (see generate_html_images):
+# with a ResultCache they are only rebuilt when the original image changed, and with 'thumbnail_width' they are
+# written at the width of the table
+def generate_html_file(image_route_in, mirror_image_out, vertical_image_out, horizontal_image_out, html_out,
+                       cache=None, thumbnail_width=None, quality=None, compression=None):
     with open(html_out, 'w') as file:
-        mirror_image = get_mirror_image(image_route_in, mirror_image_out)
-        vertical_image = get_inverted_image(image_route_in, vertical_image_out, 'vertical')
-        horizontal_image = get_inverted_image(image_route_in, horizontal_image_out, 'horizontal')
+        mirror_image, vertical_image, horizontal_image = generate_html_images(
+            image_route_in, mirror_image_out, vertical_image_out, horizontal_image_out, cache, thumbnail_width, quality,
+            compression)
 
         file.write(f"""
         <!DOCTYPE html>
@@ -125,66 +363,113 @@ def generate_html_file(image_route_in, mirror_image_out, vertical_image_out, hor
         """)
 
 
-# Function to generate a box in the image with a text
-def get_image_with_text(image_route_in, image_route_out, x_coordinates, y_coordinates, color, text):
-    def image_with_text(image):
-        cv2.rectangle(image, x_coordinates, y_coordinates, color, 2)
-        x, y = y_coordinates
-        cv2.putText(image, text, (x - 475, y - 30), cv2.FONT_ITALIC, 3, color, 2)
+# Function that draws a box with a text in memory
+def text_action(image, x_coordinates, y_coordinates, color, text):
+    cv2.rectangle(image, x_coordinates, y_coordinates, color, 2)
+    x, y = y_coordinates
+    cv2.putText(image, text, (x - 475, y - 30), cv2.FONT_ITALIC, 3, color, 2)
 
-        return image
+    return image
 
-    return process_image(image_route_in, image_route_out, image_with_text)
+# Function to generate a box in the image with a text
+def get_image_with_text(image_route_in, image_route_out, x_coordinates, y_coordinates, color, text, cache=None,
+                        quality=None, compression=None):
+    return process_image(image_route_in, image_route_out,
+                         lambda image: text_action(image, x_coordinates, y_coordinates, color, text), cache,
+                         ("get_image_with_text", (x_coordinates, y_coordinates, color, text)), quality, compression)
 
 
 # Function to generate an image with a specific area blurred
-def blur_action(image, first_coordinate, second_coordinate):
+# 'method' is one of the anonymization methods of open_cv_library/anonymize.py
+def blur_action(image, first_coordinate, second_coordinate, method="gaussian"):
 
     x1, x2 = first_coordinate
     y1, y2 = second_coordinate
 
-    image[y1:y2, x1:x2] = cv2.GaussianBlur(image[y1:y2, x1:x2], (99, 99), 0)
-
-    return image
+    return anonymize_region(image, x1, y1, x2 - x1, y2 - y1, method)
 
 
 # Function that applies a blur to a specific region of the image
-def get_image_blurred(image_route_in, image_route_out, x_coordinates, y_coordinates):
-    return process_image(image_route_in, image_route_out, lambda image: blur_action(image, x_coordinates, y_coordinates))
+def get_image_blurred(image_route_in, image_route_out, x_coordinates, y_coordinates, method="gaussian", cache=None,
+                      quality=None, compression=None):
+    return process_image(image_route_in, image_route_out,
+                         lambda image: blur_action(image, x_coordinates, y_coordinates, method), cache,
+                         ("get_image_blurred", (x_coordinates, y_coordinates, method)), quality, compression)
+
+
+# Function that detects faces in a gray image and returns their boxes (x, y, w, h) in full-resolution coordinates
+# The detection can run on a smaller copy: 'max_side' limits its longest side and 'pyramid_level' halves it that many
+# times (cv2.pyrDown). 'min_size'/'max_size' are (w, h) face sizes in full-resolution pixels
+def detect_faces(gray_image, face_cascade, max_side=None, pyramid_level=None, min_size=None, max_size=None):
+    height, width = gray_image.shape[:2]
+    small_image = gray_image
+
+    with metrics.stage("downscale"):
+        for _ in range(pyramid_level or 0):
+            small_image = cv2.pyrDown(small_image)
+
+        if max_side and max(small_image.shape[:2]) > max_side:
+            factor = max_side / max(small_image.shape[:2])
+            small_image = cv2.resize(small_image, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+
+    scale_x, scale_y = width / small_image.shape[1], height / small_image.shape[0]
+
+    def to_small(size):
+        return (max(int(size[0] / scale_x), 1), max(int(size[1] / scale_y), 1)) if size else None
+
+    with metrics.stage("detect"):
+        faces = face_cascade.detectMultiScale(small_image, 1.3, 5, minSize=to_small(min_size),
+                                              maxSize=to_small(max_size))
+    metrics.count("faces_detected", len(faces))
+
+    if len(faces) == 0 or small_image is gray_image:
+        return faces
+
+    return np.round(np.asarray(faces, dtype=np.float64) * (scale_x, scale_y, scale_x, scale_y)).astype(np.int32)
 
 
 # Function that detects faces in an image, marks them with a rectangle and optionally blurs them
-def detect_and_mark_faces(image_route_in, image_route_out, color,  text, blur_faces=False):
-    image = load_image(image_route_in)
+# 'max_side', 'pyramid_level', 'min_size' and 'max_size' control the detection (see detect_faces) and 'blur_method'
+# selects the anonymization method (see open_cv_library/anonymize.py). 'quality' and 'compression' go to save_image
+# Every stage (decode, convert, downscale, detect, draw, blur, encode) is reported to the metrics sinks, if any
+def detect_and_mark_faces(image_route_in, image_route_out, color,  text, blur_faces=False, max_side=None,
+                          pyramid_level=None, min_size=None, max_size=None, blur_method="gaussian", quality=None,
+                          compression=None):
+    with metrics.stage("decode"):
+        image = load_image(image_route_in)
 
-    gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    with metrics.stage("convert"):
+        gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
 
-    face = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    face = get_cascade(FACE_CASCADE)
 
-    faces = face.detectMultiScale(gray_image, 1.3, 5)
+    faces = detect_faces(gray_image, face, max_side, pyramid_level, min_size, max_size)
 
-    for (x, y, w, h) in faces:
-        cv2.rectangle(image, (x, y), (x + w, y + h), color, 2)
+    # The 'draw' stage includes the 'blur' stage of every face
+    with metrics.stage("draw"):
+        for (x, y, w, h) in faces:
+            cv2.rectangle(image, (x, y), (x + w, y + h), color, 2)
 
-        if blur_faces:
-            face = image[y:y+h, x:x+w]
-            face_blurred = cv2.medianBlur(face, 99)
-            image[y:y+h, x:x+w] = face_blurred
+            if blur_faces:
+                with metrics.stage("blur"):
+                    anonymize_region(image, x, y, w, h, blur_method)
 
-        if text:
-            cv2.putText(image, text, (x - 475, y - 30), cv2.FONT_ITALIC, 0.9, color, 2, cv2.LINE_AA)
+            if text:
+                cv2.putText(image, text, (x - 475, y - 30), cv2.FONT_ITALIC, 0.9, color, 2, cv2.LINE_AA)
 
-    return cv2.imwrite(image_route_out, image)
+    with metrics.stage("encode"):
+        written = save_image(image, image_route_out, quality, compression)
 
+    if metrics.enabled():
+        metrics.count("bytes_read", input_bytes(image_route_in))
+        metrics.count("bytes_written", os.path.getsize(image_route_out) if written else 0)
 
-# Load the cascade classifier to detect faces and eyes
-def get_classifier(cascade_route):
-    cascade = cv2.CascadeClassifier(cascade_route)
+    return written
 
-    if cascade.empty():
-        raise Exception (f"Error loading classifier from {cascade_route}!")
 
-    return cascade
+# Load the cascade classifier to detect faces and eyes
+def get_classifier(cascade_route):
+    return get_cascade(cascade_route)
 
 
 # Function that starts capturing video from the webcam
@@ -197,19 +482,43 @@ def capture_video():
     return video
 
 
+# Function that returns the faces of a frame: from the tracker when one is given (see open_cv_library/tracking.py),
+# otherwise running the full cascade detection
+# 'gray' is the gray version of the frame when it has already been computed
+def get_faces_from_frame(frame, face_cascade, tracker=None, gray=None):
+    if gray is None:
+        with metrics.stage("convert"):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    if tracker is not None:
+        with metrics.stage("track"):
+            faces = tracker.update(frame, gray)
+    else:
+        with metrics.stage("detect"):
+            faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+
+    metrics.count("faces_detected", len(faces))
+    return faces
+
+
 # Function that detects faces and eyes in a frame and draws rectangles around them
-def get_face_and_eyes_from_webcam(frame, face_cascade, eye_cascade):
+# The gray frame is computed once (or received in 'gray') and shared by the face and the eye detection
+def get_face_and_eyes_from_webcam(frame, face_cascade, eye_cascade, tracker=None, gray=None):
+    if gray is None:
+        with metrics.stage("convert"):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
-    faces = face_cascade.detectMultiScale(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), 1.3, 5)
+    faces = get_faces_from_frame(frame, face_cascade, tracker, gray)
 
     for (x, y, w, h) in faces:
         # Rectangle around the face
         cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
 
         # Detect eyes
-        roi_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)[y:y + h, x:x + w]
+        roi_gray = gray[y:y + h, x:x + w]
         roi_color = frame[y:y + h, x:x + w]
-        eyes = eye_cascade.detectMultiScale(roi_gray)
+        with metrics.stage("eyes"):
+            eyes = eye_cascade.detectMultiScale(roi_gray)
 
         for (ex, ey, ew, eh) in eyes:
             cv2.rectangle(roi_color, (ex, ey), (ex + ew, ey + eh), (0, 255, 0), 2)
@@ -218,38 +527,39 @@ def get_face_and_eyes_from_webcam(frame, face_cascade, eye_cascade):
 
 
 # Function that detects faces and blur them
-def get_blur_face_from_webcam(frame, face_cascade):
-    faces = face_cascade.detectMultiScale(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), 1.3, 5)
+def get_blur_face_from_webcam(frame, face_cascade, tracker=None, gray=None):
+    faces = get_faces_from_frame(frame, face_cascade, tracker, gray)
 
-    for (x, y, w, h) in faces:
-        face = frame[y:y + h, x:x + w]
-        face_blurred = cv2.GaussianBlur(face, (99,99), 30)
-        frame[y:y + h, x:x + w] = face_blurred
+    with metrics.stage("blur"):
+        for (x, y, w, h) in faces:
+            anonymize_region(frame, x, y, w, h)
 
     return frame
 
 
 # Processes the live video from the camera according to the selected operation
-def process_webcam(operation):
-    face_cascade = get_classifier('haarcascade_frontalface_default.xml')
-    eye_cascade = get_classifier('haarcascade_eye.xml')
+# Capture, detection and display run as separate stages, so the frame rate is not capped by the detection
+# With 'keyframe_interval' the faces are only detected on keyframes and tracked in between (one worker, since the
+# tracker needs consecutive frames)
+# With a 'metrics_sink' (see open_cv_library/metrics.py) the cost of every stage of every frame is reported to it
+# while the loop runs
+def process_webcam(operation, workers=2, keyframe_interval=None, tracker="template", metrics_sink=None):
+    # Imported here because the video pipeline is built on the frame functions of this module
+    from open_cv_library.buffers import BufferPool
+    from open_cv_library.video import VideoPipeline, display_sink, tracked_operation
 
     video = capture_video()
 
-    while video.isOpened():
-        ret, frame = video.read()
-        if not ret:
-            break
-
-        if operation == "face_and_eyes":
-            frame = get_face_and_eyes_from_webcam(frame, face_cascade, eye_cascade)
-        elif operation == "blur_faces":
-            frame = get_blur_face_from_webcam(frame, face_cascade)
-
-        cv2.imshow("Video", frame)
+    if keyframe_interval:
+        operation, workers = tracked_operation(operation, keyframe_interval, tracker), 1
 
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            break
+    if metrics_sink is not None:
+        metrics.add_sink(metrics_sink)
 
-    video.release()
-    cv2.destroyAllWindows()
\ No newline at end of file
+    try:
+        VideoPipeline(video, operation, workers=workers, pool=BufferPool()).run(display_sink)
+    finally:
+        if metrics_sink is not None:
+            metrics.remove_sink(metrics_sink)
+        video.release()
+        cv2.destroyAllWindows()
@@ -0,0 +1,180 @@
+import bisect, contextlib, logging, os, threading, time
+
+# Upper bounds (seconds) of the histogram buckets of the stage timers
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# A sink is any object with 'observe(stage, seconds)' and 'increment(counter, value)'. The stages and counters reach
+# every registered sink; with no sinks registered nothing is measured
+_sinks = ()
+_lock = threading.Lock()
+_disabled = contextlib.nullcontext()
+
+def add_sink(sink):
+    global _sinks
+    with _lock:
+        _sinks = _sinks + (sink,)
+    return sink
+
+def remove_sink(sink):
+    global _sinks
+    with _lock:
+        _sinks = tuple(registered for registered in _sinks if registered is not sink)
+
+# Function that registers a sink only for the duration of a 'with' block
+@contextlib.contextmanager
+def collect(sink):
+    add_sink(sink)
+    try:
+        yield sink
+    finally:
+        remove_sink(sink)
+
+def enabled():
+    return bool(_sinks)
+
+# Timer of one stage: measures the wall time of the 'with' block and reports it to the sinks
+class _Stage:
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+# Function that times a stage: 'with stage("decode"): ...'. When no sink is registered it returns a shared no-op
+# context manager, so the instrumented code costs a function call and nothing else
+def stage(name):
+    return _Stage(name) if _sinks else _disabled
+
+def observe(name, seconds):
+    for sink in _sinks:
+        sink.observe(name, seconds)
+
+# Function that adds 'value' to a counter (faces detected, bytes read/written, frames...)
+def count(name, value=1):
+    for sink in _sinks:
+        sink.increment(name, value)
+
+# Sink that writes every measure to a logger (DEBUG level by default)
+class LoggingSink:
+
+    def __init__(self, logger=None, level=logging.DEBUG):
+        self.logger = logger or logging.getLogger("open_cv_library.metrics")
+        self.level = level
+
+    def observe(self, stage, seconds):
+        self.logger.log(self.level, "stage %s: %.3f ms", stage, seconds * 1000)
+
+    def increment(self, counter, value):
+        self.logger.log(self.level, "counter %s: +%s", counter, value)
+
+# Sink that keeps, in memory, a histogram of the time of every stage and the totals of the counters
+# It is thread safe, so the same sink can receive the stages of all the threads of the video pipeline
+class HistogramSink:
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.histograms = {}  # stage -> [bucket counts (the last one is +Inf), count, sum, max]
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = [[0] * (len(self.buckets) + 1), 0, 0.0, 0.0]
+
+            histogram[0][bisect.bisect_left(self.buckets, seconds)] += 1
+            histogram[1] += 1
+            histogram[2] += seconds
+            histogram[3] = max(histogram[3], seconds)
+
+    def increment(self, counter, value):
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    # Estimates the p-th percentile (0-100) of a stage from its buckets, interpolating inside the bucket
+    def percentile(self, stage, p):
+        counts, total, _, maximum = self.histograms[stage]
+        target = total * p / 100
+        seen, lower = 0, 0.0
+
+        for bound, bucket in zip(self.buckets + (maximum,), counts):
+            if bucket and seen + bucket >= target:
+                return lower + (min(bound, maximum) - lower) * (target - seen) / bucket
+            seen += bucket
+            lower = bound
+
+        return maximum
+
+    # Returns {stage: {count, total, mean, p50, p99, max}} (seconds) and the counters
+    def summary(self):
+        with self.lock:
+            stages = {stage: {"count": count, "total": total, "mean": total / count, "p50": self.percentile(stage, 50),
+                              "p99": self.percentile(stage, 99), "max": maximum}
+                      for stage, (_, count, total, maximum) in self.histograms.items()}
+            return {"stages": stages, "counters": dict(self.counters)}
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+# Histogram sink that also writes its values to a file in the Prometheus text format, e.g. for the textfile collector
+# of node_exporter. The file is rewritten atomically at most every 'interval' seconds, and on 'flush'
+class PrometheusSink(HistogramSink):
+
+    def __init__(self, route, prefix="open_cv", interval=10.0, buckets=DEFAULT_BUCKETS):
+        super().__init__(buckets)
+        self.route = route
+        self.prefix = prefix
+        self.interval = interval
+        self.written_at = float("-inf")  # The first measure writes the file
+
+    def observe(self, stage, seconds):
+        super().observe(stage, seconds)
+        self.maybe_flush()
+
+    def increment(self, counter, value):
+        super().increment(counter, value)
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        if time.monotonic() - self.written_at >= self.interval:
+            self.flush()
+
+    def render(self):
+        name = f"{self.prefix}_stage_seconds"
+        lines = [f"# HELP {name} Time spent in each processing stage", f"# TYPE {name} histogram"]
+
+        with self.lock:
+            for stage, (counts, count, total, _) in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {total!r}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+
+            for counter, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {self.prefix}_{counter}_total counter")
+                lines.append(f"{self.prefix}_{counter}_total {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        self.written_at = time.monotonic()
+        temporary_route = f"{self.route}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        with open(temporary_route, 'w') as file:
+            file.write(self.render())
+
+        os.replace(temporary_route, self.route)
@@ -0,0 +1,61 @@
+from open_cv_library.images import (
+    load_image, save_image, rotate_180_action, negative_action, gray_action, mirror_action, invert_vertical_action,
+    invert_horizontal_action, blur_action, rectangle_action, text_action
+)
+
+# Chain of in-memory transforms: the image is decoded once, every stage runs over the same ndarray and the
+# result is encoded once at the end, so chaining steps does not lose JPEG quality on each of them
+class ImagePipeline:
+
+    def __init__(self, stages=None):
+        self.stages = list(stages or [])
+
+    # Adds a stage: an action that receives an ndarray (plus its extra arguments) and returns an ndarray
+    def add(self, action, *args, **kwargs):
+        self.stages.append((action, args, kwargs))
+        return self
+
+    # Stages that can run in place write over the decoded image instead of allocating a new one
+    def rotate_180(self):
+        return self.add(lambda image: rotate_180_action(image, image))
+
+    def negative(self):
+        return self.add(lambda image: negative_action(image, image))
+
+    def gray(self):
+        return self.add(gray_action)
+
+    def mirror(self):
+        return self.add(lambda image: mirror_action(image, image))
+
+    def inverted(self, type):
+        if type == 'vertical':
+            return self.add(invert_vertical_action)
+        elif type == 'horizontal':
+            return self.add(invert_horizontal_action)
+
+        raise ValueError(f"Invalid type: {type}. Choose between 'vertical' or 'horizontal'")
+
+    def blur(self, first_coordinate, second_coordinate):
+        return self.add(blur_action, first_coordinate, second_coordinate)
+
+    def rectangle(self, first_coordinate, second_coordinate, color):
+        return self.add(rectangle_action, first_coordinate, second_coordinate, color)
+
+    def text(self, x_coordinates, y_coordinates, color, text):
+        return self.add(text_action, x_coordinates, y_coordinates, color, text)
+
+    # Runs every stage over an image that is already in memory
+    def apply(self, image):
+        for action, args, kwargs in self.stages:
+            image = action(image, *args, **kwargs)
+
+        return image
+
+    # Decodes the input once, runs every stage in memory and encodes the result once, with the JPEG/WebP 'quality'
+    # or the PNG 'compression' given (see encode_params)
+    def run(self, image_route_in, image_route_out, quality=None, compression=None):
+        image = self.apply(load_image(image_route_in))
+        save_image(image, image_route_out, quality, compression)
+
+        return image_route_out
@@ -0,0 +1,177 @@
+import os, threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import cv2
+import numpy as np
+
+from open_cv_library.images import load_image, negative_action, gray_action, rotate_180_action
+
+# Operations of the tiled mode: the function applied to every tile, the radius of its kernel (the overlap every tile
+# needs from its neighbours so the result matches whole-image mode), the number of output channels (None = same) and
+# where the processed tile goes in the output
+def blur_tile(tile, kernel=99):
+    return cv2.GaussianBlur(tile, (kernel, kernel), 0)
+
+def same_place(y0, y1, x0, x1, height, width):
+    return y0, y1, x0, x1
+
+def opposite_place(y0, y1, x0, x1, height, width):
+    return height - y1, height - y0, width - x1, width - x0
+
+TILED_OPERATIONS = {
+    "negative": (negative_action, lambda params: 0, None, same_place),
+    "gray": (gray_action, lambda params: 0, 1, same_place),
+    "blur": (blur_tile, lambda params: params.get("kernel", 99) // 2, None, same_place),
+    "rotate_180": (rotate_180_action, lambda params: 0, None, opposite_place),
+}
+
+# os.preadv/os.pwrite do not exist on Windows: there every row is read and written with seek + readinto/write under a
+# lock, since the threads share the position of the file
+POSITIONED_IO = hasattr(os, 'preadv') and hasattr(os, 'pwrite')
+
+# Tiles of a .npy file read and written with positioned I/O (os.preadv/os.pwrite) one row at a time: unlike a memory
+# map, the pages of the file do not stay in the memory of the process, so its peak RSS depends on the tiles in flight
+class NpyTiles:
+
+    def __init__(self, route, shape=None, dtype=None):
+        if shape is not None:
+            # Creates the file with its header; the data pages are never touched through this map
+            np.lib.format.open_memmap(route, mode='w+', dtype=dtype, shape=shape)
+            self.file = open(route, 'r+b', buffering=0)
+        else:
+            self.file = open(route, 'rb', buffering=0)
+
+        self.lock = threading.Lock()
+
+        with open(route, 'rb') as file:
+            if np.lib.format.read_magic(file) == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+            self.offset = file.tell()
+
+        if fortran_order:
+            raise ValueError("Fortran-ordered .npy files are not supported")
+
+        self.shape, self.dtype = shape, np.dtype(dtype)
+        self.pixel_bytes = self.dtype.itemsize * int(np.prod(shape[2:], dtype=np.int64))
+
+    def position(self, y, x):
+        return self.offset + (y * self.shape[1] + x) * self.pixel_bytes
+
+    def read(self, y0, y1, x0, x1):
+        tile = np.empty((y1 - y0, x1 - x0) + tuple(self.shape[2:]), dtype=self.dtype)
+
+        for row, y in enumerate(range(y0, y1)):
+            view = memoryview(tile[row]).cast('B')
+
+            if POSITIONED_IO:
+                os.preadv(self.file.fileno(), [view], self.position(y, x0))
+            else:
+                with self.lock:
+                    self.file.seek(self.position(y, x0))
+                    self.file.readinto(view)
+
+        return tile
+
+    def write(self, y0, x0, tile):
+        tile = np.ascontiguousarray(tile)
+
+        for row in range(tile.shape[0]):
+            view = memoryview(tile[row]).cast('B')
+
+            if POSITIONED_IO:
+                os.pwrite(self.file.fileno(), view, self.position(y0 + row, x0))
+            else:
+                with self.lock:
+                    self.file.seek(self.position(y0 + row, x0))
+                    self.file.write(view)
+
+    def close(self):
+        self.file.close()
+
+# Tiles of an image already in memory (JPEG/PNG inputs and outputs: OpenCV can only decode and encode them whole)
+class ArrayTiles:
+
+    def __init__(self, array):
+        self.array = array
+        self.shape, self.dtype = array.shape, array.dtype
+
+    def read(self, y0, y1, x0, x1):
+        return np.ascontiguousarray(self.array[y0:y1, x0:x1])
+
+    def write(self, y0, x0, tile):
+        self.array[y0:y0 + tile.shape[0], x0:x0 + tile.shape[1]] = tile
+
+    def close(self):
+        pass
+
+# Function that opens the input of the tiled mode: .npy files are read tile by tile, other formats are decoded whole
+def open_source(image_route_in):
+    if image_route_in.lower().endswith('.npy'):
+        return NpyTiles(image_route_in)
+
+    return ArrayTiles(load_image(image_route_in))
+
+# Function that creates the output: tiles of a .npy output are written to the file as soon as they are processed;
+# for other formats they are collected in memory and encoded at the end
+def create_target(image_route_out, shape, dtype):
+    if image_route_out.lower().endswith('.npy'):
+        return NpyTiles(image_route_out, shape, dtype)
+
+    return ArrayTiles(np.empty(shape, dtype=dtype))
+
+# Function that splits an image of height x width into tiles: (y0, y1, x0, x1) of every tile without the overlap
+def tile_grid(height, width, tile_size):
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            yield y0, min(y0 + tile_size, height), x0, min(x0 + tile_size, width)
+
+# Function that applies an operation tile by tile: every tile is read with an overlap equal to the kernel radius of the
+# operation, processed and its core written to the output. Tiles run in parallel on a thread pool (OpenCV releases the
+# GIL) with at most 'workers' * 2 tiles in memory, so the peak memory depends on the tile size, not on the image
+def process_tiled(image_route_in, image_route_out, operation, tile_size=1024, workers=None, **params):
+    if operation not in TILED_OPERATIONS:
+        raise ValueError(f"Invalid operation: {operation}. Choose between {', '.join(TILED_OPERATIONS)}")
+
+    action, radius, channels, place = TILED_OPERATIONS[operation]
+    overlap = radius(params)
+
+    source = open_source(image_route_in)
+    height, width = source.shape[:2]
+    shape = (height, width) if channels == 1 else (height, width) + source.shape[2:]
+    target = create_target(image_route_out, shape, source.dtype)
+
+    def run(tile):
+        y0, y1, x0, x1 = tile
+        ya, yb = max(y0 - overlap, 0), min(y1 + overlap, height)
+        xa, xb = max(x0 - overlap, 0), min(x1 + overlap, width)
+
+        result = action(source.read(ya, yb, xa, xb), **params)
+        ty0, _, tx0, _ = place(y0, y1, x0, x1, height, width)
+
+        target.write(ty0, tx0, result[y0 - ya:y1 - ya, x0 - xa:x1 - xa])
+
+    workers = workers or os.cpu_count() or 1
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+
+            for tile in tile_grid(height, width, tile_size):
+                pending.add(executor.submit(run, tile))
+
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+
+            for future in wait(pending).done:
+                future.result()
+    finally:
+        source.close()
+        target.close()
+
+    if isinstance(target, ArrayTiles):
+        cv2.imwrite(image_route_out, target.array)
+
+    return image_route_out
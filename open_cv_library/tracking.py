@@ -0,0 +1,100 @@
+import cv2
+import numpy as np
+
+# Tracker that keeps the boxes of the last keyframe where they were (cheapest option, for static cameras)
+class StaticTracker:
+
+    def init(self, gray, boxes):
+        self.boxes = [tuple(box) for box in boxes]
+
+    def update(self, gray):
+        return self.boxes
+
+# Tracker that looks for the keyframe patch of every face inside a search window around its previous box, using
+# normalized cross-correlation. Returns None (face lost) when a match is weaker than 'min_score'
+class TemplateTracker:
+
+    def __init__(self, search_margin=0.5, min_score=0.5):
+        self.search_margin = search_margin
+        self.min_score = min_score
+
+    def init(self, gray, boxes):
+        self.boxes = [tuple(box) for box in boxes]
+        self.templates = [gray[y:y + h, x:x + w].copy() for (x, y, w, h) in self.boxes]
+
+    def update(self, gray):
+        height, width = gray.shape[:2]
+        boxes = []
+
+        for (x, y, w, h), template in zip(self.boxes, self.templates):
+            margin_x, margin_y = int(w * self.search_margin), int(h * self.search_margin)
+            x0, y0 = max(x - margin_x, 0), max(y - margin_y, 0)
+            x1, y1 = min(x + w + margin_x, width), min(y + h + margin_y, height)
+            window = gray[y0:y1, x0:x1]
+
+            if window.shape[0] < template.shape[0] or window.shape[1] < template.shape[1]:
+                return None
+
+            _, score, _, (best_x, best_y) = cv2.minMaxLoc(cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED))
+            if score < self.min_score:
+                return None
+
+            boxes.append((x0 + best_x, y0 + best_y, w, h))
+
+        self.boxes = boxes
+        return boxes
+
+TRACKERS = {
+    "template": TemplateTracker,
+    "static": StaticTracker,
+}
+
+# Face boxes for a video: the full multi-scale cascade detection only runs on keyframes (every 'keyframe_interval'
+# frames, when the scene changes or when the tracker loses a face) and the tracker carries the boxes in between
+class FaceTracker:
+
+    def __init__(self, face_cascade, keyframe_interval=5, tracker="template", scene_change_threshold=25.0):
+        if tracker not in TRACKERS:
+            raise ValueError(f"Invalid tracker: {tracker}. Choose between {', '.join(TRACKERS)}")
+
+        self.face_cascade = face_cascade
+        self.keyframe_interval = keyframe_interval
+        self.tracker = TRACKERS[tracker]()
+        self.scene_change_threshold = scene_change_threshold
+        self.frames_since_keyframe = None
+        self.keyframe_thumbnail = None
+        self.detections = 0
+
+    # Small thumbnail used to detect scene changes with a mean absolute difference
+    def thumbnail(self, gray):
+        return cv2.resize(gray, (64, 48), interpolation=cv2.INTER_AREA)
+
+    def scene_changed(self, gray):
+        difference = cv2.absdiff(self.thumbnail(gray), self.keyframe_thumbnail)
+        return float(np.mean(difference)) > self.scene_change_threshold
+
+    def detect(self, gray):
+        boxes = [tuple(int(value) for value in box) for box in self.face_cascade.detectMultiScale(gray, 1.3, 5)]
+
+        self.tracker.init(gray, boxes)
+        self.keyframe_thumbnail = self.thumbnail(gray)
+        self.frames_since_keyframe = 0
+        self.detections += 1
+
+        return boxes
+
+    # Returns the face boxes (x, y, w, h) of a frame
+    def update(self, frame, gray=None):
+        if gray is None:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        if self.frames_since_keyframe is None or self.frames_since_keyframe + 1 >= self.keyframe_interval \
+                or self.scene_changed(gray):
+            return self.detect(gray)
+
+        boxes = self.tracker.update(gray)
+        if boxes is None:
+            return self.detect(gray)
+
+        self.frames_since_keyframe += 1
+        return boxes
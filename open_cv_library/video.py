@@ -0,0 +1,314 @@
+import collections, heapq, queue, threading, time
+
+import cv2
+import numpy as np
+
+from open_cv_library import metrics
+from open_cv_library.buffers import reuse
+from open_cv_library.cascades import load_cascade, FACE_CASCADE, EYE_CASCADE
+from open_cv_library.images import get_face_and_eyes_from_webcam, get_blur_face_from_webcam
+from open_cv_library.tracking import FaceTracker
+
+_END = object()
+_local = threading.local()
+
+# Function that converts a frame to gray into a buffer owned by the current thread, reused from frame to frame
+def gray_frame(frame):
+    with metrics.stage("convert"):
+        _local.gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=reuse(getattr(_local, 'gray', None), frame.shape[:2]))
+    return _local.gray
+
+# Frame operations of the pipeline: they receive the frame and the cascades owned by the worker
+def face_and_eyes_operation(frame, cascades, tracker=None):
+    return get_face_and_eyes_from_webcam(frame, cascades[FACE_CASCADE], cascades[EYE_CASCADE], tracker,
+                                         gray_frame(frame))
+
+def blur_faces_operation(frame, cascades, tracker=None):
+    return get_blur_face_from_webcam(frame, cascades[FACE_CASCADE], tracker, gray_frame(frame))
+
+OPERATIONS = {
+    "face_and_eyes": face_and_eyes_operation,
+    "blur_faces": blur_faces_operation,
+}
+
+# Function that returns the frame operation for a name, a callable(frame, cascades) or None (frames pass unchanged)
+def resolve_frame_operation(operation):
+    if operation is None:
+        return lambda frame, cascades, tracker=None: frame
+    if callable(operation):
+        return operation
+    if operation in OPERATIONS:
+        return OPERATIONS[operation]
+
+    raise ValueError(f"Invalid operation: {operation}. Choose between {', '.join(OPERATIONS)}")
+
+# Function that wraps a named operation so faces are detected only on keyframes and tracked in between
+# Every worker thread keeps its own FaceTracker, created with the classifier of that worker
+def tracked_operation(operation, keyframe_interval=5, tracker="template"):
+    operation = resolve_frame_operation(operation)
+    local = threading.local()
+
+    def run(frame, cascades):
+        if not hasattr(local, 'tracker'):
+            local.tracker = FaceTracker(cascades[FACE_CASCADE], keyframe_interval, tracker)
+
+        return operation(frame, cascades, local.tracker)
+
+    return run
+
+# Function that turns a camera index, a video file, an opened cv2.VideoCapture or any iterable of frames into an
+# iterator of frames, so the pipeline can run without a camera. With a BufferPool the frames are decoded into buffers
+# of the pool (the consumer gives them back with pool.release)
+def read_frames(source, pool=None):
+    if isinstance(source, (int, str)):
+        video = cv2.VideoCapture(source)
+        if not video.isOpened():
+            raise Exception(f"The video source {source} cannot be opened! :/")
+        owned = True
+    elif hasattr(source, 'read'):
+        video, owned = source, False
+    else:
+        yield from source
+        return
+
+    shape = None
+
+    try:
+        while video.isOpened():
+            buffer = pool.acquire(shape) if pool is not None and shape is not None else None
+            with metrics.stage("capture"):
+                ret, frame = video.read(buffer)
+            if not ret:
+                break
+            shape = frame.shape
+            yield frame
+    finally:
+        if owned:
+            video.release()
+
+# Synthetic frame source: a window that pans over an image (or over noise), optionally paced at a given frame rate
+def synthetic_frames(image_route=None, count=300, size=(640, 480), fps=None):
+    width, height = size
+
+    if image_route:
+        image = cv2.imread(image_route)
+        if image is None:
+            raise ValueError("Image not found!")
+        scale = max(width * 1.25 / image.shape[1], height * 1.25 / image.shape[0], 0)
+        image = cv2.resize(image, None, fx=scale, fy=scale) if scale > 1 else image
+    else:
+        image = np.random.default_rng(0).integers(0, 256, (int(height * 1.25), int(width * 1.25), 3), np.uint8)
+
+    range_x, range_y = image.shape[1] - width, image.shape[0] - height
+    start = time.perf_counter()
+
+    for i in range(count):
+        phase = np.sin(2 * np.pi * i / 120)
+        x, y = int(range_x * (0.5 + 0.5 * phase)), int(range_y * (0.5 - 0.5 * phase))
+
+        if fps:
+            delay = start + i / fps - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        yield image[y:y + height, x:x + width].copy()
+
+# Bounded queue that, when it is full, discards the oldest item instead of blocking the producer
+class DropOldestQueue:
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.items = collections.deque()
+        self.condition = threading.Condition()
+
+    # Adds an item and returns the item discarded to make room for it (None if nothing was discarded)
+    # With drop=False it waits for room instead (end-of-stream markers and sources that must not lose frames). If the
+    # 'stopped' event is set while waiting, the item itself is returned as discarded
+    def put(self, item, drop=True, stopped=None):
+        dropped = None
+
+        with self.condition:
+            if drop and len(self.items) >= self.maxsize:
+                dropped = self.items.popleft()
+
+            while len(self.items) >= self.maxsize:
+                if stopped is not None and stopped.is_set():
+                    return item
+                self.condition.wait(0.1 if stopped is not None else None)
+
+            self.items.append(item)
+            self.condition.notify_all()
+
+        return dropped
+
+    def get(self):
+        with self.condition:
+            while not self.items:
+                self.condition.wait()
+
+            item = self.items.popleft()
+            self.condition.notify_all()
+
+        return item
+
+# Function that tells whether a source is live (a camera or a network stream), where frames that cannot be processed in
+# time are better dropped, or recorded (a video file or an iterable of frames), where every frame must be processed
+def is_live_source(source):
+    if isinstance(source, int):
+        return True
+    if isinstance(source, str):
+        return "://" in source
+    if hasattr(source, 'read'):
+        return not (hasattr(source, 'get') and source.get(cv2.CAP_PROP_FRAME_COUNT) > 0)
+
+    return False
+
+# Staged video pipeline: one capture thread, a pool of detection workers and an ordered output stage, connected by
+# bounded queues. With a live source (drop=True, the default for cameras and streams), when detection cannot keep up
+# the capture stage drops the oldest pending frame, so latency stays bounded instead of growing with a backlog. With a
+# recorded source (drop=False, the default for files and iterables) the capture waits instead, so no frame is lost
+# The output stage runs in the calling thread (cv2.imshow needs it)
+# With a BufferPool, frames are recycled once the sink returns (or when they are dropped), so the loop does not
+# allocate a frame per iteration; the sink must then copy any frame it keeps
+# The capture, frame (operation) and display stages, the capture-to-display latency and the captured/dropped frames
+# are reported to the metrics sinks, if any (see open_cv_library/metrics.py)
+class VideoPipeline:
+
+    def __init__(self, source, operation=None, workers=2, queue_size=None, pool=None, drop=None):
+        self.source = source
+        self.pool = pool
+        self.drop = is_live_source(source) if drop is None else drop
+        self.operation = resolve_frame_operation(operation)
+        self.workers = workers
+        self.input = DropOldestQueue(queue_size or workers)
+        self.output = queue.Queue(maxsize=queue_size or workers)
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+        self.dropped = set()
+        self.errors = []
+        self.stats = {}
+
+    def stop(self):
+        self.stopped.set()
+
+    def capture(self, max_frames):
+        captured = 0
+
+        try:
+            for seq, frame in enumerate(read_frames(self.source, self.pool)):
+                if self.stopped.is_set() or (max_frames is not None and seq >= max_frames):
+                    break
+
+                dropped = self.input.put((seq, time.perf_counter(), frame), self.drop, self.stopped)
+                captured += 1
+                metrics.count("frames_captured")
+
+                if dropped is not None:
+                    metrics.count("frames_dropped")
+                    with self.lock:
+                        self.dropped.add(dropped[0])
+                    if self.pool is not None:
+                        self.pool.release(dropped[2])
+        except Exception as e:
+            self.errors.append(e)
+        finally:
+            self.stats["captured"] = captured
+            for _ in range(self.workers):
+                self.input.put(_END, drop=False)
+
+    # Each worker owns its classifiers: a CascadeClassifier is not safe to share between threads running
+    # detectMultiScale at the same time
+    def work(self):
+        try:
+            cascades = {FACE_CASCADE: load_cascade(FACE_CASCADE), EYE_CASCADE: load_cascade(EYE_CASCADE)}
+
+            while True:
+                item = self.input.get()
+                if item is _END:
+                    break
+
+                seq, captured_at, frame = item
+                with metrics.stage("frame"):
+                    frame = self.operation(frame, cascades)
+                self.output.put((seq, captured_at, frame))
+        except Exception as e:
+            self.errors.append(e)
+            self.stop()
+
+            # Keeps taking frames until the end marker, so the capture stage is never left waiting for room
+            while self.input.get() is not _END:
+                pass
+        finally:
+            self.output.put(_END)
+
+    # Runs the pipeline until the source ends, the sink returns False or max_frames are captured
+    # 'sink' receives every processed frame in capture order; without it the pipeline runs headless
+    def run(self, sink=None, max_frames=None):
+        threads = [threading.Thread(target=self.capture, args=(max_frames,), daemon=True)]
+        threads += [threading.Thread(target=self.work, daemon=True) for _ in range(self.workers)]
+
+        latencies, pending, next_seq, ended = [], [], 0, 0
+        start = time.perf_counter()
+
+        for thread in threads:
+            thread.start()
+
+        def emit(item):
+            seq, captured_at, frame = item
+            latencies.append(time.perf_counter() - captured_at)
+            metrics.observe("latency", latencies[-1])
+
+            if sink is not None and not self.stopped.is_set():
+                with metrics.stage("display"):
+                    if sink(frame) is False:
+                        self.stop()
+
+            if self.pool is not None:
+                self.pool.release(frame)
+
+            return seq + 1
+
+        while ended < self.workers:
+            item = self.output.get()
+            if item is _END:
+                ended += 1
+                continue
+
+            heapq.heappush(pending, item)
+
+            # Frames are released in capture order, skipping the ones dropped by the capture stage
+            while pending:
+                with self.lock:
+                    while next_seq in self.dropped:
+                        self.dropped.discard(next_seq)
+                        next_seq += 1
+
+                if pending[0][0] != next_seq:
+                    break
+
+                next_seq = emit(heapq.heappop(pending))
+
+        while pending:
+            emit(heapq.heappop(pending))
+
+        for thread in threads:
+            thread.join()
+
+        if self.errors:
+            raise self.errors[0]
+
+        seconds = time.perf_counter() - start
+        self.stats.update({
+            "processed": len(latencies),
+            "dropped": self.stats.get("captured", 0) - len(latencies),
+            "seconds": seconds,
+            "fps": len(latencies) / seconds if seconds else 0.0,
+            "latencies": latencies,
+        })
+
+        return self.stats
+
+# Sink that shows the frames in a window and stops when 'q' is pressed
+def display_sink(frame):
+    cv2.imshow("Video", frame)
+    return not (cv2.waitKey(1) & 0xFF == ord("q"))
@@ -0,0 +1,314 @@
+import argparse, hashlib, json, os, sqlite3, time
+from concurrent.futures import ProcessPoolExecutor
+
+from open_cv_library import images
+from open_cv_library.batch import IMAGE_EXTENSIONS, resolve_operation, init_worker, parse_kwargs
+
+REKOGNITION_PREFIX = "rekognition:"
+COMMIT_EVERY = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    sidecar TEXT,
+    signature TEXT NOT NULL,
+    output TEXT,
+    ok INTEGER NOT NULL,
+    error TEXT,
+    processed_at REAL NOT NULL
+)
+"""
+
+# Persistent index of the processed inputs: path, size, modification time and content hash of every input, the
+# operation that processed it and the output it produced. Stored in SQLite, so it survives restarts
+class WatchIndex:
+
+    def __init__(self, index_route):
+        self.connection = sqlite3.connect(index_route)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(SCHEMA)
+        self.connection.commit()
+
+    # Returns every row as {path: (size, mtime_ns, hash, sidecar, signature, output, ok)}
+    def rows(self):
+        cursor = self.connection.execute(
+            "SELECT path, size, mtime_ns, hash, sidecar, signature, output, ok FROM files")
+        return {row[0]: row[1:] for row in cursor}
+
+    def upsert(self, records):
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, hash, sidecar, signature, output, ok, error, "
+            "processed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", records)
+        self.connection.commit()
+
+    # Updates the size and modification time of inputs whose content did not change (e.g. copied or touched again)
+    def touch(self, records):
+        self.connection.executemany("UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?", records)
+        self.connection.commit()
+
+    def remove(self, paths):
+        self.connection.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in paths])
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+# Function that hashes the content of a file in chunks
+def file_hash(route):
+    digest = hashlib.sha256()
+
+    with open(route, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+# Function that lists the images under a directory with their size and modification time: {path: (size, mtime_ns)}
+# os.scandir reuses the information of the directory listing, so no file is opened. 'exclude' skips a subdirectory,
+# e.g. the output folder when it is inside the watched one
+def scan_directory(source, exclude=None):
+    found = {}
+    pending = [source]
+
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path != exclude:
+                        pending.append(entry.path)
+                elif entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file():
+                    stat = entry.stat()
+                    found[entry.path] = (stat.st_size, stat.st_mtime_ns)
+
+    return found
+
+# Function that returns the Rekognition JSON of an image: '<stem>.json' next to the image, or in 'json_dir' under the
+# path of the image relative to 'root' (the same layout local_detector.detect_batch writes)
+def sidecar_route(image_route, json_dir=None, root=None):
+    stem = os.path.splitext(image_route)[0]
+
+    if not json_dir:
+        return f"{stem}.json"
+
+    return os.path.join(json_dir, f"{os.path.relpath(stem, root) if root else os.path.basename(stem)}.json")
+
+# Version of the sidecar JSON ('size:mtime_ns'), so a new Rekognition response also refreshes the output
+def sidecar_version(json_route):
+    try:
+        stat = os.stat(json_route)
+    except FileNotFoundError:
+        return None
+
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+# Function that processes one input inside a worker and returns (path, output, error)
+# 'operation' is the name of a function of open_cv_library.images, or 'rekognition:<operation>' with the JSON route
+def run_task(operation, image_route_in, image_route_out, json_route, kwargs):
+    try:
+        os.makedirs(os.path.dirname(image_route_out), exist_ok=True)
+
+        if operation.startswith(REKOGNITION_PREFIX):
+            # Imported here because the Rekognition library is built on this one
+            from aws_rekognition_library.stream import OPERATIONS as REKOGNITION_OPERATIONS
+
+            with open(json_route, 'r') as file:
+                response = json.load(file)
+
+            image = REKOGNITION_OPERATIONS[operation[len(REKOGNITION_PREFIX):]](images.load_image(image_route_in),
+                                                                               response)
+            if not images.save_image(image, image_route_out, **kwargs):
+                raise ValueError(f"The image could not be saved in {image_route_out}")
+        else:
+            getattr(images, operation)(image_route_in, image_route_out, **kwargs)
+
+        return image_route_in, image_route_out, None
+    except Exception as e:
+        return image_route_in, None, f"{type(e).__name__}: {e}"
+
+def remove_output(output_route):
+    if output_route and os.path.exists(output_route):
+        os.remove(output_route)
+
+# Incremental processor of a drop folder: every scan sends only the new or changed images through the operation,
+# refreshes the outputs of the changed ones and deletes the outputs of the removed ones
+# An input is unchanged when its size and modification time match the index (it is not read at all); only when they
+# differ its content is hashed, so a file that was touched or copied without changes is not processed again
+# Files modified less than 'settle' seconds ago may still be being written and wait for the next scan
+class DirectoryWatcher:
+
+    def __init__(self, source, operation, output_dir, index_route=None, json_dir=None, workers=None, settle=1.0,
+                 retry_errors=False, **kwargs):
+        self.rekognition = operation.startswith(REKOGNITION_PREFIX)
+        if self.rekognition:
+            from aws_rekognition_library.stream import OPERATIONS as REKOGNITION_OPERATIONS
+
+            if operation[len(REKOGNITION_PREFIX):] not in REKOGNITION_OPERATIONS:
+                raise ValueError(f"Invalid operation: {operation}. Choose between "
+                                 f"{', '.join(REKOGNITION_PREFIX + name for name in REKOGNITION_OPERATIONS)}")
+            self.operation = operation
+        else:
+            self.operation = resolve_operation(operation)
+
+        self.source = os.path.abspath(source)
+        self.output_dir = os.path.abspath(output_dir)
+        self.json_dir = json_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.settle = settle
+        self.retry_errors = retry_errors
+        self.kwargs = kwargs
+
+        # Any change in the operation or its arguments processes everything again
+        self.signature = f"{self.operation}|{sorted(kwargs.items())!r}"
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.index = WatchIndex(index_route or os.path.join(self.output_dir, ".watch-index.sqlite"))
+        self.executor = None
+
+    def output_route(self, image_route):
+        return os.path.join(self.output_dir, os.path.relpath(image_route, self.source))
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+        self.index.close()
+
+    # Yields the results as they are ready, in the order of the tasks
+    def run_tasks(self, tasks):
+        if self.workers == 1 or len(tasks) == 1:
+            return (run_task(*task) for task in tasks)
+
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                                initargs=(self.operation,))
+
+        chunksize = max(1, min(64, len(tasks) // (self.workers * 4)))
+        return self.executor.map(run_task, *zip(*tasks), chunksize=chunksize)
+
+    # Runs one scan and returns its report: counts of seen, unchanged, touched, processed, failed, removed and
+    # pending (still settling) inputs, the errors and the time it took
+    def scan(self):
+        start = time.perf_counter()
+        found = scan_directory(self.source, self.output_dir)
+        rows = self.index.rows()
+        now = time.time_ns()
+
+        report = {"seen": len(found), "unchanged": 0, "touched": 0, "processed": 0, "failed": 0, "removed": 0,
+                  "pending": 0, "hashed": 0, "errors": []}
+        tasks, versions, touched = [], {}, []
+
+        for path, (size, mtime_ns) in found.items():
+            # Files dated in the future (e.g. copied from a camera with a wrong clock) are not waited for
+            if 0 <= now - mtime_ns < self.settle * 1e9:
+                report["pending"] += 1
+                continue
+
+            row = rows.get(path)
+            sidecar = sidecar_version(sidecar_route(path, self.json_dir, self.source)) if self.rekognition else None
+            same_job = row is not None and row[3] == sidecar and row[4] == self.signature and (row[6] or
+                                                                                               not self.retry_errors)
+
+            if same_job and row[0] == size and row[1] == mtime_ns:
+                report["unchanged"] += 1
+                continue
+
+            content_hash = file_hash(path)
+            report["hashed"] += 1
+
+            if same_job and row[2] == content_hash:
+                touched.append((size, mtime_ns, path))
+                continue
+
+            output_route = self.output_route(path)
+            if row is not None and row[5] != output_route:
+                remove_output(row[5])
+
+            json_route = sidecar_route(path, self.json_dir, self.source) if self.rekognition else None
+            tasks.append((self.operation, path, output_route, json_route, self.kwargs))
+            versions[path] = (size, mtime_ns, content_hash, sidecar)
+
+        self.index.touch(touched)
+        report["touched"] = len(touched)
+
+        # The index is committed every COMMIT_EVERY results, so an interrupted scan keeps what it already processed
+        records = []
+        for path, output_route, error in self.run_tasks(tasks):
+            size, mtime_ns, content_hash, sidecar = versions[path]
+
+            if error is None:
+                report["processed"] += 1
+            else:
+                # The output of the previous version no longer matches its input
+                remove_output(self.output_route(path))
+                report["failed"] += 1
+                report["errors"].append((path, error))
+
+            records.append((path, size, mtime_ns, content_hash, sidecar, self.signature, output_route,
+                            int(error is None), error, time.time()))
+            if len(records) >= COMMIT_EVERY:
+                self.index.upsert(records)
+                records = []
+        self.index.upsert(records)
+
+        # Inputs that disappeared: their outputs are deleted too
+        removed = [path for path in rows if path not in found]
+        for path in removed:
+            remove_output(rows[path][5])
+        self.index.remove(removed)
+        report["removed"] = len(removed)
+
+        report["seconds"] = time.perf_counter() - start
+        return report
+
+    # Scans the folder every 'interval' seconds until interrupted (or once, with once=True)
+    def watch(self, interval=2.0, once=False, on_report=None):
+        try:
+            while True:
+                report = self.scan()
+                if on_report is not None:
+                    on_report(report)
+                if once:
+                    return report
+                time.sleep(interval)
+        finally:
+            self.close()
+
+def print_report(report):
+    changes = {key: report[key] for key in ("processed", "failed", "removed", "touched", "pending") if report[key]}
+    print(f"{time.strftime('%H:%M:%S')} {report['seen']} inputs, {report['unchanged']} unchanged, "
+          f"{report['hashed']} hashed {changes or ''} ({report['seconds'] * 1000:.0f} ms)", flush=True)
+
+    for path, error in report["errors"]:
+        print(f"  ERROR {path}: {error}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process the new or changed images of a folder, scan after scan")
+    parser.add_argument('source', help="Folder to watch, e.g. resources/resources_in")
+    parser.add_argument('operation', help="Function of open_cv_library.images, e.g. get_gray_scale, or "
+                                          "rekognition:<blur|blur_under_18|square_face>")
+    parser.add_argument('output_dir')
+    parser.add_argument('--index', default=None, help="SQLite index (default: <output_dir>/.watch-index.sqlite)")
+    parser.add_argument('--json-dir', default=None,
+                        help="Rekognition JSONs, named <image stem>.json under the folders of the images")
+    parser.add_argument('--interval', type=float, default=2.0)
+    parser.add_argument('--settle', type=float, default=1.0, help="Seconds a file must stay unmodified")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--retry-errors', action='store_true', help="Process again the inputs that failed")
+    parser.add_argument('--once', action='store_true', help="Run a single scan and exit")
+    parser.add_argument('--arg', action='append', help="Extra argument of the operation as key=value")
+    args = parser.parse_args(argv)
+
+    watcher = DirectoryWatcher(args.source, args.operation, args.output_dir, args.index, args.json_dir, args.workers,
+                               args.settle, args.retry_errors, **parse_kwargs(args.arg))
+    try:
+        report = watcher.watch(args.interval, args.once, print_report)
+    except KeyboardInterrupt:
+        return 0
+
+    return 1 if report["failed"] else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
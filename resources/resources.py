@@ -1,3 +1,5 @@
+import os
+
 A = "C:/Users/enriq/Desktop/OpenCV + AWS/resources/resources_in/A.jpg"
 A_final = "C:/Users/enriq/Desktop/OpenCV + AWS/resources/resources_out/A_final.jpg"
 A_mirror = "C:/Users/enriq/Desktop/OpenCV + AWS/resources/resources_out/A_mirror.jpg"
@@ -14,4 +16,10 @@ f2_final = "C:/Users/enriq/Desktop/OpenCV + AWS/resources/resources_out/f2_final
 
 
 family_json = "C:/Users/enriq/Desktop/OpenCV + AWS/resources/images_aws_json/family.json"
-final_json = "C:/Users/enriq/Desktop/OpenCV + AWS/resources/images_aws_json/final.json"
\ No newline at end of file
+final_json = "C:/Users/enriq/Desktop/OpenCV + AWS/resources/images_aws_json/final.json"
+
+# Folders of the bundled resources, resolved from this file so that scripts and benchmarks work from any CWD
+resources_dir = os.path.dirname(os.path.abspath(__file__))
+resources_in_dir = os.path.join(resources_dir, "resources_in")
+resources_out_dir = os.path.join(resources_dir, "resources_out")
+images_aws_json_dir = os.path.join(resources_dir, "images_aws_json")
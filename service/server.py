@@ -0,0 +1,368 @@
+import argparse, ast, asyncio, json, os, signal, time
+from concurrent.futures import ProcessPoolExecutor
+from email.parser import BytesParser
+from urllib.parse import urlsplit, parse_qsl
+
+import cv2
+import numpy as np
+
+from aws_rekognition_library.stream import OPERATIONS as REKOGNITION_OPERATIONS
+from open_cv_library import images
+from open_cv_library.anonymize import anonymize_region
+from open_cv_library.cascades import get_cascade, FACE_CASCADE, EYE_CASCADE
+
+MAX_BODY = 64 << 20
+CHUNK_SIZE = 64 << 10
+FORMATS = ('.jpg', '.png', '.bmp', '.webp')
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 411: "Length Required",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+# Transforms of open_cv_library/images.py exposed as POST /images/<name>, with the query parameters as arguments
+IMAGE_OPERATIONS = {
+    "rotate_180": lambda image: images.rotate_180_action(image, image),
+    "negative": lambda image: images.negative_action(image, image),
+    "gray": images.gray_action,
+    "mirror": lambda image: images.mirror_action(image, image),
+    "invert_vertical": images.invert_vertical_action,
+    "invert_horizontal": images.invert_horizontal_action,
+    "rectangle": lambda image, first, second, color=(0, 0, 255): images.rectangle_action(image, first, second, color),
+    "text": lambda image, first, second, color=(0, 0, 255), text="": images.text_action(image, first, second, color,
+                                                                                          text),
+    "blur": lambda image, first, second, method="gaussian": images.blur_action(image, first, second, method),
+}
+
+# Function that runs once in every worker process: the cascades are loaded before the first request arrives and
+# stay warm for the life of the process
+def init_worker():
+    get_cascade(FACE_CASCADE)
+    get_cascade(EYE_CASCADE)
+
+# Function that converts the query string into keyword arguments: values are Python literals, e.g.
+# first=(10,10)&color=(0,255,0), and anything else (e.g. text=Ana) is taken as a string
+def parse_params(query):
+    params = {}
+
+    for key, value in parse_qsl(query, keep_blank_values=True):
+        try:
+            params[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            params[key] = value
+
+    return params
+
+def decode_image(body, scale=None, gray=False):
+    try:
+        return images.load_image(body, scale, gray)
+    except ValueError:
+        raise ValueError("The body is not an image")
+
+# Function that encodes the result in the requested format ('.jpg' by default), with its 'quality' (JPEG, WebP) or
+# 'compression' (PNG)
+def encode_image(image, extension, quality=None, compression=None):
+    extension = extension if extension.startswith('.') else f".{extension}"
+
+    if extension not in FORMATS:
+        raise ValueError(f"Invalid format: {extension}. Choose between {', '.join(FORMATS)}")
+
+    ok, encoded = cv2.imencode(extension, image, images.encode_params(extension, quality, compression))
+    if not ok:
+        raise ValueError(f"The image could not be encoded as {extension}")
+
+    return "image/" + ("jpeg" if extension == '.jpg' else extension[1:]), encoded.tobytes()
+
+# Function that splits a multipart/form-data body into its fields {name: bytes}
+def parse_multipart(content_type, body):
+    message = BytesParser().parsebytes(b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body)
+
+    if not message.is_multipart():
+        raise ValueError("Expected a multipart/form-data body with the fields 'image' and 'response'")
+
+    return {part.get_param('name', header='content-disposition'): part.get_payload(decode=True)
+            for part in message.get_payload()}
+
+def detect_faces_job(image, params):
+    gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return images.detect_faces(gray_image, get_cascade(FACE_CASCADE), params.get("max_side"),
+                               params.get("pyramid_level"), params.get("min_size"), params.get("max_size"))
+
+# Function that detects the faces of an encoded image. With 'max_side' only the boxes are needed, so the image is
+# decoded straight to gray at the smallest reduced size that keeps that side, and the boxes are scaled back
+def detect_encoded_faces(body, params):
+    size = images.image_size(body) if params.get("max_side") else None
+    if not size:
+        return detect_faces_job(decode_image(body), params)
+
+    gray_image = decode_image(body, params["max_side"] / max(size), gray=True)
+    factor = max(size) / max(gray_image.shape)
+
+    def to_small(key):
+        return (max(int(params[key][0] / factor), 1), max(int(params[key][1] / factor), 1)) if params.get(key) else None
+
+    faces = images.detect_faces(gray_image, get_cascade(FACE_CASCADE), params["max_side"], params.get("pyramid_level"),
+                                to_small("min_size"), to_small("max_size"))
+    return np.round(np.asarray(faces, dtype=np.float64).reshape(-1, 4) * factor).astype(np.int32)
+
+# Function that runs a request inside a worker process and returns (status, content type, body)
+# Everything CPU bound (decoding, processing and encoding) happens here, never in the event loop
+def run_job(path, params, content_type, body):
+    try:
+        extension = params.pop("format", ".jpg")
+        encoding = (params.pop("quality", None), params.pop("compression", None))
+        section, _, name = path.strip('/').partition('/')
+
+        if section == "images" and name in IMAGE_OPERATIONS:
+            image = IMAGE_OPERATIONS[name](decode_image(body), **params)
+            return (200, *encode_image(image, extension, *encoding))
+
+        if section == "faces" and name == "detect":
+            faces = detect_encoded_faces(body, params)
+            return 200, "application/json", json.dumps({"faces": np.asarray(faces).tolist()}).encode()
+
+        if section == "faces" and name == "blur":
+            image = decode_image(body)
+            for x, y, w, h in detect_faces_job(image, params):
+                anonymize_region(image, x, y, w, h, params.get("method", "gaussian"))
+            return (200, *encode_image(image, extension, *encoding))
+
+        if section == "rekognition":
+            if name not in REKOGNITION_OPERATIONS:
+                return 404, "text/plain", f"Unknown Rekognition operation: {name}".encode()
+
+            fields = parse_multipart(content_type, body)
+            if "image" not in fields or "response" not in fields:
+                raise ValueError("Expected the fields 'image' and 'response'")
+
+            image = REKOGNITION_OPERATIONS[name](decode_image(fields["image"]), json.loads(fields["response"]))
+            return (200, *encode_image(image, extension, *encoding))
+
+        return 404, "text/plain", f"Unknown endpoint: {path}".encode()
+    except (ValueError, TypeError, KeyError) as e:
+        return 400, "text/plain", f"{type(e).__name__}: {e}".encode()
+    except Exception as e:
+        return 500, "text/plain", f"{type(e).__name__}: {e}".encode()
+
+class HttpError(Exception):
+
+    def __init__(self, status, message=""):
+        super().__init__(message or REASONS.get(status, ""))
+        self.status = status
+
+# Asyncio HTTP/1.1 server that runs the image operations in a pool of processes
+# Requests wait in a bounded queue for a free worker: when the queue is full the server answers 503 right after
+# reading the headers, without reading the body, so a burst of clients cannot pile up memory or latency
+class ImageService:
+
+    def __init__(self, workers=None, queue_size=None, max_body=MAX_BODY):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue = asyncio.Queue(maxsize=queue_size or self.workers * 4)
+        self.max_body = max_body
+        self.executor = None
+        self.server = None
+        self.dispatchers = []
+        self.stats = {"requests": 0, "rejected": 0, "errors": 0}
+
+    async def start(self, host="127.0.0.1", port=8080):
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker)
+
+        # Start every worker now, so the cascades are loaded before the first request
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, time.sleep, 0) for _ in range(self.workers)))
+
+        self.dispatchers = [asyncio.create_task(self.dispatch()) for _ in range(self.workers)]
+        self.server = await asyncio.start_server(self.handle_connection, host, port, limit=CHUNK_SIZE)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+        for dispatcher in self.dispatchers:
+            dispatcher.cancel()
+        await asyncio.gather(*self.dispatchers, return_exceptions=True)
+
+        self.executor.shutdown()
+
+    # One dispatcher per worker takes the next request of the queue, so no more than 'workers' jobs are in the pool
+    async def dispatch(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            job, future = await self.queue.get()
+            try:
+                result = await loop.run_in_executor(self.executor, run_job, *job)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self.queue.task_done()
+
+    async def read_head(self, reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError:
+            raise HttpError(400, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip()
+
+        return method, target, version, headers
+
+    # Reads the body in chunks (Content-Length or chunked transfer encoding), stopping as soon as it exceeds the limit
+    async def read_body(self, reader, writer, headers):
+        body = bytearray()
+
+        # Clients that wait for permission before sending a large body (e.g. curl)
+        if headers.get("expect", "").lower() == "100-continue":
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            await writer.drain()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                line = await reader.readline()
+                try:
+                    size = int(line.split(b';')[0], 16)
+                except ValueError:
+                    raise HttpError(400, "Malformed chunk size")
+                if size == 0:
+                    await reader.readline()
+                    return bytes(body)
+                if len(body) + size > self.max_body:
+                    raise HttpError(413)
+                body += await reader.readexactly(size)
+                await reader.readline()
+
+        if "content-length" not in headers:
+            raise HttpError(411)
+
+        try:
+            length = int(headers["content-length"])
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise HttpError(400, "Malformed Content-Length")
+        if length > self.max_body:
+            raise HttpError(413)
+
+        while len(body) < length:
+            chunk = await reader.read(min(CHUNK_SIZE, length - len(body)))
+            if not chunk:
+                raise asyncio.IncompleteReadError(bytes(body), length)
+            body += chunk
+
+        return bytes(body)
+
+    async def handle_request(self, reader, writer, method, target, headers):
+        path, _, query = target.partition('?')
+        path = urlsplit(path).path
+
+        if path == "/health":
+            return 200, "application/json", json.dumps(dict(self.stats, queued=self.queue.qsize(),
+                                                            workers=self.workers)).encode()
+        if method != "POST":
+            raise HttpError(405)
+
+        # Backpressure: check for room in the queue before reading the body
+        if self.queue.full():
+            self.stats["rejected"] += 1
+            raise HttpError(503, "The server is busy, try again later")
+
+        body = await self.read_body(reader, writer, headers)
+        future = asyncio.get_running_loop().create_future()
+
+        try:
+            self.queue.put_nowait(((path, parse_params(query), headers.get("content-type", ""), body), future))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise HttpError(503, "The server is busy, try again later")
+
+        return await future
+
+    async def write_response(self, writer, status, content_type, payload, keep_alive):
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}",
+                f"Content-Length: {len(payload)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if status == 503:
+            head.append("Retry-After: 1")
+
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1'))
+        writer.write(payload)
+        await writer.drain()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await self.read_head(reader)
+                    if head is None:
+                        break
+
+                    method, target, version, headers = head
+                    self.stats["requests"] += 1
+                    status, content_type, payload = await self.handle_request(reader, writer, method, target, headers)
+                except Exception as e:
+                    if isinstance(e, (ConnectionError, asyncio.IncompleteReadError)):
+                        raise
+                    status = e.status if isinstance(e, HttpError) else 500
+                    content_type, payload = "text/plain", (str(e) or type(e).__name__).encode()
+                    # The body of a rejected request may not have been read, so the connection cannot be reused
+                    headers, version = {"connection": "close"}, "HTTP/1.1"
+
+                if status >= 400:
+                    self.stats["errors"] += 1
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                await self.write_response(writer, status, content_type, payload, keep_alive)
+
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+async def serve(host, port, workers=None, queue_size=None, max_body=MAX_BODY):
+    service = ImageService(workers, queue_size, max_body)
+    host, port = await service.start(host, port)
+    print(f"Serving on http://{host}:{port} with {service.workers} workers", flush=True)
+
+    # SIGTERM stops the service cleanly, shutting down the worker processes too. Event loops without signal handlers
+    # (Windows) get a plain signal.signal handler instead; Ctrl+C arrives there as KeyboardInterrupt
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, stopped.set)
+    except NotImplementedError:
+        signal.signal(signal.SIGTERM, lambda *_: loop.call_soon_threadsafe(stopped.set))
+
+    try:
+        await stopped.wait()
+    finally:
+        await service.stop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP service for the image operations")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--queue-size', type=int, default=None,
+                        help="Requests waiting for a worker (default 4 per worker)")
+    parser.add_argument('--max-body', type=int, default=MAX_BODY, help="Largest request body in bytes")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.queue_size, args.max_body))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from open_cv_library import anonymize
+from open_cv_library.anonymize import METHODS, anonymize_region, kernel_size
+
+def noise(shape):
+    return np.random.default_rng(0).integers(0, 256, shape, dtype=np.uint8)
+
+@pytest.mark.parametrize("method", sorted(METHODS))
+def test_only_the_region_inside_the_image_changes(method):
+    image = noise((100, 120, 3))
+    result = anonymize_region(image.copy(), 90, -20, 60, 70, method)
+
+    assert result.shape == image.shape
+    assert not (result[:50, 90:] == image[:50, 90:]).all()
+    np.testing.assert_array_equal(result[50:], image[50:])
+    np.testing.assert_array_equal(result[:, :90], image[:, :90])
+
+@pytest.mark.parametrize("region", [(10, 10, 0, 20), (10, 10, 20, -5), (200, 10, 30, 30), (-50, -50, 40, 40)])
+def test_empty_and_out_of_bounds_regions_leave_the_image_unchanged(region):
+    image = noise((60, 80, 3))
+
+    for method in METHODS:
+        np.testing.assert_array_equal(anonymize_region(image.copy(), *region, method), image)
+
+def test_an_invalid_method_is_rejected():
+    with pytest.raises(ValueError, match="gaussian"):
+        anonymize_region(noise((20, 20, 3)), 0, 0, 10, 10, "swirl")
+
+def test_the_kernel_scales_with_the_clipped_face(monkeypatch):
+    kernels = []
+    monkeypatch.setitem(METHODS, "spy", lambda region, kernel: kernels.append((region.shape[:2], kernel)) or region)
+    image = noise((400, 400, 3))
+
+    for side in (20, 100, 300):
+        anonymize_region(image, 0, 0, side, side, "spy")
+    anonymize_region(image, 350, 0, 300, 300, "spy")
+    anonymize_region(image, 0, 0, 300, 300, "spy", kernel=7)
+
+    assert kernels == [((20, 20), kernel_size(20, 20)), ((100, 100), kernel_size(100, 100)),
+                       ((300, 300), kernel_size(300, 300)), ((300, 50), kernel_size(50, 300)), ((300, 300), 7)]
+    assert [kernel_size(side, side) for side in (5, 20, 100, 300)] == [3, 9, 41, 121]
+    assert all(kernel % 2 == 1 for _, kernel in kernels)
+
+# A larger face gets a proportionally stronger blur: the same pattern scaled up is blurred the same, relatively
+def test_the_effect_is_relative_to_the_face_size():
+    def blurred_contrast(side):
+        tile = np.kron(np.indices((8, 8)).sum(axis=0) % 2 * 255, np.ones((side // 8, side // 8))).astype(np.uint8)
+        return anonymize_region(tile, 0, 0, side, side, "box").std() / tile.std()
+
+    assert blurred_contrast(64) == pytest.approx(blurred_contrast(512), abs=0.05)
+
+@pytest.mark.parametrize("method", sorted(METHODS))
+def test_gray_images_work_with_every_method(method):
+    image = noise((90, 110))
+
+    # Large enough to take the reduced path of the Gaussian method, and small enough not to
+    for side in (anonymize.REDUCED_SIDE + 32, anonymize.REDUCED_SIDE - 18):
+        result = anonymize_region(image.copy(), 5, 5, side, side, method)
+
+        assert result.shape == image.shape and result.dtype == np.uint8
+        assert result[5:5 + side, 5:5 + side].std() < image[5:5 + side, 5:5 + side].std()
+        np.testing.assert_array_equal(result[:, 5 + side:], image[:, 5 + side:])
@@ -0,0 +1,40 @@
+import os
+
+import cv2
+import numpy as np
+
+from open_cv_library.batch import process_batch, source_root
+
+def test_recursive_globs_mirror_the_folders_of_the_inputs(tmp_path):
+    for level, folder in enumerate(("a", "b", "b/c")):
+        (tmp_path / "in" / folder).mkdir(parents=True)
+        cv2.imwrite(str(tmp_path / "in" / folder / "same.png"), np.full((8, 8, 3), level * 50, np.uint8))
+    output_dir = tmp_path / "out"
+
+    report = process_batch(os.path.join(str(tmp_path / "in"), "**", "*.png"), "get_negative_colors", str(output_dir),
+                           workers=1)
+
+    assert all(result["ok"] for result in report)
+    for level, folder in enumerate(("a", "b", "b/c")):
+        assert cv2.imread(str(output_dir / folder / "same.png"))[0, 0, 0] == 255 - level * 50
+
+def test_source_root():
+    assert source_root(os.path.join("photos", "**", "*.jpg")) == "photos"
+    assert source_root("*.jpg") == "."
+
+def test_encode_parameters_reach_every_image_of_a_batch(tmp_path):
+    source = tmp_path / "in"
+    source.mkdir()
+    rng = np.random.default_rng(0)
+    for i in range(3):
+        cv2.imwrite(str(source / f"{i}.jpg"), rng.integers(0, 256, (120, 160, 3), dtype=np.uint8))
+
+    sizes = {}
+    for quality in (20, 95):
+        output_dir = tmp_path / f"out_{quality}"
+        report = process_batch(str(source), "get_gray_scale", str(output_dir), workers=2, chunksize=1, quality=quality)
+
+        assert all(result["ok"] for result in report), report
+        sizes[quality] = [os.path.getsize(output_dir / f"{i}.jpg") for i in range(3)]
+
+    assert all(low < high for low, high in zip(sizes[20], sizes[95]))
@@ -0,0 +1,46 @@
+import numpy as np
+
+from open_cv_library.buffers import BufferPool, reuse
+
+def test_released_buffers_are_reused_for_the_same_shape_and_dtype():
+    pool = BufferPool()
+    first = pool.acquire((48, 64, 3))
+    pool.release(first)
+
+    assert pool.acquire([48, 64, 3], np.uint8) is first
+    assert (pool.allocated, pool.reused) == (1, 1)
+
+def test_buffers_are_not_shared_between_shapes_or_dtypes():
+    pool = BufferPool()
+    buffer = pool.acquire((48, 64, 3))
+    pool.release(buffer)
+
+    others = [pool.acquire((64, 48, 3)), pool.acquire((48, 64)), pool.acquire((48, 64, 3), np.float32)]
+
+    assert all(other is not buffer for other in others)
+    assert [(other.shape, other.dtype) for other in others] == [((64, 48, 3), np.uint8), ((48, 64), np.uint8),
+                                                                ((48, 64, 3), np.float32)]
+    assert (pool.allocated, pool.reused) == (4, 0)
+    assert pool.acquire((48, 64, 3)) is buffer
+
+def test_the_pool_keeps_at_most_max_per_shape_buffers():
+    pool = BufferPool(max_per_shape=2)
+    buffers = [pool.acquire((8, 8)) for _ in range(4)]
+    for buffer in buffers:
+        pool.release(buffer)
+
+    kept = [pool.acquire((8, 8)) for _ in range(3)]
+
+    assert {id(buffer) for buffer in kept[:2]} == {id(buffer) for buffer in buffers[:2]}
+    assert all(kept[2] is not buffer for buffer in buffers)
+    assert (pool.allocated, pool.reused) == (5, 2)
+
+def test_reuse_returns_the_buffer_only_when_it_fits():
+    buffer = np.empty((10, 20, 3), np.uint8)
+
+    assert reuse(buffer, (10, 20, 3)) is buffer
+    assert reuse(buffer, [10, 20, 3], np.uint8) is buffer
+    for shape, dtype in (((20, 10, 3), np.uint8), ((10, 20), np.uint8), ((10, 20, 3), np.float32)):
+        other = reuse(buffer, shape, dtype)
+        assert other is not buffer and (other.shape, other.dtype) == (shape, dtype)
+    assert reuse(None, (4, 4)).shape == (4, 4)
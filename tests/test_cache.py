@@ -0,0 +1,80 @@
+import os, pickle
+
+import cv2
+import numpy as np
+
+from open_cv_library import cache as cache_module, images
+from open_cv_library.batch import process_batch
+from open_cv_library.cache import ResultCache
+
+def entry(tmp_path, name, size=1000):
+    route = tmp_path / name
+    route.write_bytes(os.urandom(size))
+    return str(route)
+
+def test_a_full_cache_evicts_the_least_recently_used_down_to_the_low_water_mark(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=10_000, low_water=0.5)
+    routes = [entry(tmp_path, f"{i}.bin") for i in range(10)]
+    for i, route in enumerate(routes):
+        cache.put(f"key{i}.bin", route)
+
+    assert cache.get("key0.bin", str(tmp_path / "out.bin"))
+
+    # Inserting does not walk the directory any more
+    monkeypatch.setattr(cache, "entries", lambda: (_ for _ in ()).throw(AssertionError("directory walk")))
+    cache.put("key10.bin", entry(tmp_path, "10.bin"))
+
+    assert cache.size <= 5_000
+    assert cache.get("key0.bin", str(tmp_path / "out.bin")) and cache.get("key10.bin", str(tmp_path / "out.bin"))
+    assert not cache.get("key1.bin", str(tmp_path / "out.bin"))
+
+def test_a_reopened_cache_keeps_its_size(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    cache.put("key.bin", entry(tmp_path, "a.bin", 1234))
+
+    assert ResultCache(str(tmp_path / "cache")).size == 1234
+
+def test_process_batch_adds_the_hits_and_misses_of_the_workers(tmp_path):
+    source = tmp_path / "in"
+    source.mkdir()
+    for i in range(4):
+        cv2.imwrite(str(source / f"{i}.png"), np.full((20, 20, 3), i * 40, np.uint8))
+    cache = ResultCache(str(tmp_path / "cache"))
+
+    process_batch(str(source), "get_negative_colors", str(tmp_path / "out"), workers=2, chunksize=1, cache=cache)
+    process_batch(str(source), "get_negative_colors", str(tmp_path / "out"), workers=2, chunksize=1, cache=cache)
+
+    assert (cache.hits, cache.misses) == (4, 4)
+    assert len(cache.index) == 4
+
+def test_an_input_in_memory_is_keyed_by_its_bytes(tmp_path):
+    data = cv2.imencode('.png', np.full((20, 30, 3), 60, np.uint8))[1].tobytes()
+    cache = ResultCache(str(tmp_path / "cache"))
+
+    for i, image_in in enumerate((data, memoryview(data), bytearray(data))):
+        images.get_gray_scale(image_in, str(tmp_path / f"gray_{i}.png"), cache=cache)
+
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert cv2.imread(str(tmp_path / "gray_2.png"), cv2.IMREAD_GRAYSCALE).shape == (20, 30)
+
+def test_the_remembered_hashes_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, "HASH_CACHE_SIZE", 3)
+    cache = ResultCache(str(tmp_path / "cache"))
+    routes = [entry(tmp_path, f"{i}.bin") for i in range(5)]
+
+    for route in routes:
+        cache.content_hash(route)
+    cache.content_hash(routes[2])
+    cache.content_hash(routes[0])
+
+    assert [version[0] for version in cache.hashes] == [os.path.abspath(routes[i]) for i in (4, 2, 0)]
+
+def test_copies_in_other_processes_do_not_evict(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=2_500, low_water=0.5)
+    copy = pickle.loads(pickle.dumps(cache))
+    for i in range(4):
+        copy.put(f"key{i}.bin", entry(tmp_path, f"{i}.bin"))
+
+    assert len(list(copy.entries())) == 4
+    cache.refresh()
+    assert cache.size <= 1_250 and len(list(cache.entries())) == 1
@@ -0,0 +1,28 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from open_cv_library.cascades import get_cascade, clear_cascades, FACE_CASCADE
+from open_cv_library.images import detect_faces
+from resources.resources import resources_in_dir
+
+def test_every_thread_gets_its_own_classifier():
+    first = get_cascade(FACE_CASCADE)
+    assert get_cascade(FACE_CASCADE) is first
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        others = list(executor.map(lambda _: id(get_cascade(FACE_CASCADE)), range(2)))
+    assert id(first) not in others
+
+    clear_cascades()
+    assert get_cascade(FACE_CASCADE) is not first
+
+def test_detection_from_threads_matches_the_serial_result():
+    gray_image = cv2.cvtColor(cv2.imread(f"{resources_in_dir}/grupo.png"), cv2.COLOR_BGR2GRAY)
+
+    def detect(_=None):
+        return sorted(map(tuple, detect_faces(gray_image, get_cascade(FACE_CASCADE)).tolist()))
+
+    expected = detect()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert all(result == expected for result in executor.map(detect, range(16)))
@@ -0,0 +1,33 @@
+import json
+
+import numpy as np
+
+from aws_rekognition_library import faces
+
+def write_response(route, left=0.1):
+    route.write_text(json.dumps({"FaceDetails": [{"BoundingBox": {"Width": 0.2, "Height": 0.2, "Left": left,
+                                                                  "Top": 0.1}}]}))
+    return str(route)
+
+def test_face_tables_are_memoized_with_a_bounded_lru(tmp_path):
+    routes = [write_response(tmp_path / f"{i}.json") for i in range(faces.TABLE_CACHE_SIZE + 10)]
+
+    first = faces.load_face_table(routes[0])
+    assert faces.load_face_table(routes[0]) is first
+
+    for route in routes:
+        faces.load_face_table(route)
+
+    assert len(faces._tables) <= faces.TABLE_CACHE_SIZE
+    assert faces.load_face_table(routes[0]) is not first
+
+def test_pixel_boxes_match_the_float64_truncation():
+    rng = np.random.default_rng(0)
+    boxes = rng.uniform(0, 0.5, (20000, 4))
+    table = faces.FaceTable({"FaceDetails": [{"BoundingBox": dict(zip(("Left", "Top", "Width", "Height"), box))}
+                                             for box in boxes.tolist()]})
+    width, height = 12000, 9000
+
+    expected = [(int(left * width), int(top * height), int(w * width), int(h * height))
+                for left, top, w, h in boxes.tolist()]
+    assert table.pixel_boxes(width, height).tolist() == [list(box) for box in expected]
@@ -0,0 +1,124 @@
+import os
+
+import cv2
+import numpy as np
+
+from open_cv_library import images, metrics
+from open_cv_library.cache import ResultCache
+from open_cv_library.pipeline import ImagePipeline
+
+# JPEG of 'width' x 'height' with two 65 kB APP2 segments (like a large ICC profile) before the start of frame
+def jpeg_with_large_header(width=320, height=200):
+    encoded = cv2.imencode('.jpg', np.full((height, width, 3), 128, np.uint8))[1].tobytes()
+    segment = b"\xff\xe2" + (65000 + 2).to_bytes(2, 'big') + b"\x00" * 65000
+    return encoded[:2] + segment * 2 + encoded[2:]
+
+def test_image_size_reads_past_large_app_segments(tmp_path):
+    data = jpeg_with_large_header()
+    route = tmp_path / "large_header.jpg"
+    route.write_bytes(data)
+
+    assert images.image_size(str(route)) == (320, 200)
+    assert images.image_size(data) == (320, 200)
+
+def test_thumbnail_source_with_large_app_segments(tmp_path):
+    route = tmp_path / "large_header.jpg"
+    route.write_bytes(jpeg_with_large_header(1600, 1000))
+
+    assert images.load_thumbnail_source(str(route), 200).shape[1] >= 200
+
+def test_image_size_of_png_and_unknown_formats():
+    png = cv2.imencode('.png', np.zeros((30, 40, 3), np.uint8))[1].tobytes()
+
+    assert images.image_size(png) == (40, 30)
+    assert images.image_size(b"not an image") is None
+
+def test_detect_and_mark_faces_from_bytes_with_metrics(tmp_path):
+    data = cv2.imencode('.jpg', np.full((120, 160, 3), 90, np.uint8))[1].tobytes()
+    route_out = str(tmp_path / "marked.jpg")
+
+    with metrics.collect(metrics.HistogramSink()) as sink:
+        assert images.detect_and_mark_faces(data, route_out, (0, 255, 0), "")
+
+    assert sink.summary()["counters"]["bytes_read"] == len(data)
+
+def test_encode_quality_reaches_pipeline_and_face_marking(tmp_path):
+    route_in = str(tmp_path / "noise.png")
+    cv2.imwrite(route_in, np.random.default_rng(0).integers(0, 256, (200, 300, 3), dtype=np.uint8))
+
+    sizes = {}
+    for quality in (20, 95):
+        pipeline_out, marked_out = str(tmp_path / f"pipeline_{quality}.jpg"), str(tmp_path / f"marked_{quality}.jpg")
+        ImagePipeline().mirror().run(route_in, pipeline_out, quality=quality)
+        images.detect_and_mark_faces(route_in, marked_out, (0, 255, 0), "", quality=quality)
+        sizes[quality] = os.path.getsize(pipeline_out), os.path.getsize(marked_out)
+
+    assert sizes[20][0] < sizes[95][0] and sizes[20][1] < sizes[95][1]
+
+# JPEG of 'width' x 'height' stored pixels with an EXIF orientation (6: displayed rotated 90º, sides swapped)
+def jpeg_with_orientation(width, height, orientation):
+    encoded = cv2.imencode('.jpg', np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8))[1]
+    tiff = (b"MM\x00*\x00\x00\x00\x08" + b"\x00\x01" + b"\x01\x12\x00\x03\x00\x00\x00\x01" +
+            orientation.to_bytes(2, 'big') + b"\x00\x00" + b"\x00\x00\x00\x00")
+    payload = b"Exif\x00\x00" + tiff
+    encoded = encoded.tobytes()
+    return encoded[:2] + b"\xff\xe1" + (len(payload) + 2).to_bytes(2, 'big') + payload + encoded[2:]
+
+def html_outputs(tmp_path, name):
+    return [str(tmp_path / f"{name}_{variant}.jpg") for variant in ("mirror", "vertical", "horizontal")]
+
+def record_decodes(monkeypatch):
+    scales = []
+    load_image = images.load_image
+    monkeypatch.setattr(images, "load_image", lambda route, scale=None, gray=False: scales.append(scale) or
+                        load_image(route, scale, gray))
+    return scales
+
+def test_thumbnails_are_generated_from_a_reduced_decode(tmp_path, monkeypatch):
+    route_in = str(tmp_path / "large.jpg")
+    cv2.imwrite(route_in, np.random.default_rng(0).integers(0, 256, (1200, 1600, 3), dtype=np.uint8))
+    scales = record_decodes(monkeypatch)
+
+    outputs = images.generate_html_images(route_in, *html_outputs(tmp_path, "large"), thumbnail_width=400)
+
+    assert scales == [0.25]
+    assert all(cv2.imread(output).shape == (300, 400, 3) for output in outputs)
+
+def test_thumbnails_of_rotated_photos_decode_again_at_full_size(tmp_path, monkeypatch):
+    route_in = tmp_path / "rotated.jpg"
+    route_in.write_bytes(jpeg_with_orientation(1600, 800, 6))
+    scales = record_decodes(monkeypatch)
+
+    outputs = images.generate_html_images(str(route_in), *html_outputs(tmp_path, "rotated"), thumbnail_width=400)
+
+    # The header says 1600 wide, but the photo is displayed 800 wide: the 1/4 decode is only 200 wide
+    assert scales == [0.25, None]
+    assert all(cv2.imread(output).shape == (800, 400, 3) for output in outputs)
+
+def test_only_the_images_missing_from_the_cache_are_generated_again(tmp_path, monkeypatch):
+    route_in = str(tmp_path / "in.png")
+    cv2.imwrite(route_in, np.random.default_rng(0).integers(0, 256, (60, 80, 3), dtype=np.uint8))
+    cache = ResultCache(str(tmp_path / "cache"))
+    outputs = html_outputs(tmp_path, "html")
+    images.generate_html_images(route_in, *outputs, cache=cache, thumbnail_width=40)
+    expected = [cv2.imread(output) for output in outputs]
+
+    scales = record_decodes(monkeypatch)
+    saved = []
+    save_image = images.save_image
+    monkeypatch.setattr(images, "save_image", lambda image, route, *args: saved.append(route) or
+                        save_image(image, route, *args))
+
+    images.generate_html_images(route_in, *outputs, cache=cache, thumbnail_width=40)
+    assert (scales, saved) == ([], [])
+
+    # Evicting the vertical image only rebuilds that one
+    os.remove(cache.entry_route(cache.key(route_in, "get_inverted_image", ('vertical', ("thumbnail_width", 40)),
+                                          ".jpg")))
+    for output in outputs:
+        os.remove(output)
+    images.generate_html_images(route_in, *outputs, cache=cache, thumbnail_width=40)
+
+    assert (len(scales), saved) == (1, [outputs[1]])
+    for output, image in zip(outputs, expected):
+        np.testing.assert_array_equal(cv2.imread(output), image)
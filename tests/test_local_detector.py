@@ -0,0 +1,49 @@
+import json, os
+
+import cv2
+import numpy as np
+import pytest
+
+from aws_rekognition_library.aws_images import blur_faces, get_square_on_faces
+from aws_rekognition_library.faces import FaceTable
+from aws_rekognition_library.local_detector import detect_batch, detect_to_json
+from open_cv_library.cache import ResultCache
+
+def test_responses_without_faces_work_with_the_annotation_tools(tmp_path):
+    image = np.full((120, 160, 3), 128, np.uint8)
+    image_route = str(tmp_path / "grey.png")
+    cv2.imwrite(image_route, image)
+    json_route = str(tmp_path / "grey.json")
+
+    result = detect_to_json(image_route, json_route, ResultCache(str(tmp_path / "cache")))
+
+    assert result["ok"] and result["faces"] == 0
+    with open(json_route) as file:
+        assert json.load(file) == {"FaceDetails": []}
+    assert (blur_faces(image.copy(), json_route) == image).all()
+    assert (get_square_on_faces(image.copy(), json_route) == image).all()
+    assert detect_to_json(image_route, json_route, ResultCache(str(tmp_path / "cache")))["cached"]
+
+def test_responses_without_face_details_are_rejected():
+    with pytest.raises(ValueError):
+        FaceTable({"Labels": []})
+
+def test_images_with_the_same_name_in_different_folders_keep_their_own_json(tmp_path):
+    for folder, side in (("a", 40), ("b", 60)):
+        (tmp_path / "in" / folder).mkdir(parents=True)
+        cv2.imwrite(str(tmp_path / "in" / folder / "x.png"), np.full((side, side, 3), 128, np.uint8))
+    json_dir = tmp_path / "json"
+
+    summary = detect_batch(os.path.join(str(tmp_path / "in"), "**", "*.png"), str(json_dir), workers=1)
+
+    assert summary["processed"] == 2
+    assert sorted(result["json"] for result in summary["results"]) == [str(json_dir / "a" / "x.json"),
+                                                                      str(json_dir / "b" / "x.json")]
+
+def test_images_that_would_share_a_json_are_rejected(tmp_path):
+    for extension in ("jpg", "png"):
+        cv2.imwrite(str(tmp_path / f"x.{extension}"), np.full((40, 40, 3), 128, np.uint8))
+
+    with pytest.raises(ValueError, match="x.json"):
+        detect_batch(str(tmp_path), str(tmp_path / "json"), workers=1)
+    assert not (tmp_path / "json" / "x.json").exists()
@@ -0,0 +1,96 @@
+import logging, os
+
+import pytest
+
+from open_cv_library import metrics
+from open_cv_library.metrics import HistogramSink, LoggingSink, PrometheusSink
+
+def test_stage_is_the_shared_no_op_without_sinks():
+    assert metrics.stage("decode") is metrics.stage("encode") is metrics._disabled
+    assert not metrics.enabled()
+
+    with metrics.collect(HistogramSink()) as sink:
+        with metrics.stage("decode"):
+            pass
+        assert metrics.stage("decode") is not metrics._disabled
+
+    assert metrics.stage("decode") is metrics._disabled
+    assert sink.summary()["stages"]["decode"]["count"] == 1
+
+def test_percentiles_interpolate_inside_the_buckets():
+    sink = HistogramSink(buckets=(1.0, 2.0, 4.0))
+    for seconds in (0.5, 1.5, 1.5, 3.0):
+        sink.observe("stage", seconds)
+
+    assert sink.percentile("stage", 12.5) == pytest.approx(0.5)
+    assert sink.percentile("stage", 50) == pytest.approx(1.5)
+    assert sink.percentile("stage", 100) == pytest.approx(3.0)  # The last bucket ends at the maximum, not at 4
+
+def test_percentiles_of_samples_over_every_bucket():
+    sink = HistogramSink(buckets=(1.0,))
+    for seconds in (5.0, 9.0):
+        sink.observe("stage", seconds)
+
+    assert sink.histograms["stage"][0] == [0, 2]
+    assert sink.percentile("stage", 50) == pytest.approx(5.0)
+    assert sink.percentile("stage", 100) == pytest.approx(9.0)
+
+def test_reset_clears_stages_and_counters():
+    sink = HistogramSink()
+    sink.observe("stage", 0.1)
+    sink.increment("frames", 3)
+
+    sink.reset()
+
+    assert sink.summary() == {"stages": {}, "counters": {}}
+
+def test_render_writes_cumulative_buckets_in_the_prometheus_text_format(tmp_path):
+    sink = PrometheusSink(str(tmp_path / "metrics.prom"), prefix="test", interval=3600, buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 0.5, 2.0):
+        sink.observe("detect", seconds)
+    sink.increment("faces_detected", 7)
+
+    assert sink.render().splitlines() == [
+        "# HELP test_stage_seconds Time spent in each processing stage",
+        "# TYPE test_stage_seconds histogram",
+        'test_stage_seconds_bucket{stage="detect",le="0.1"} 1',
+        'test_stage_seconds_bucket{stage="detect",le="1.0"} 3',
+        'test_stage_seconds_bucket{stage="detect",le="+Inf"} 4',
+        'test_stage_seconds_sum{stage="detect"} 3.05',
+        'test_stage_seconds_count{stage="detect"} 4',
+        "# TYPE test_faces_detected_total counter",
+        "test_faces_detected_total 7",
+    ]
+
+def test_flush_replaces_the_file_atomically(tmp_path, monkeypatch):
+    route = str(tmp_path / "metrics.prom")
+    sink = PrometheusSink(route, interval=3600)
+
+    # The first measure writes the file, the next ones wait for the interval
+    sink.observe("decode", 0.01)
+    first = open(route).read()
+    sink.observe("decode", 0.02)
+    assert open(route).read() == first and 'le="+Inf"} 1' in first
+
+    # Readers see the previous file until the new one is complete
+    replace = os.replace
+    def checked_replace(source, target):
+        assert open(target).read() == first and open(source).read() == sink.render()
+        replace(source, target)
+    monkeypatch.setattr(os, "replace", checked_replace)
+
+    sink.flush()
+
+    assert 'le="+Inf"} 2' in open(route).read()
+    assert os.listdir(tmp_path) == ["metrics.prom"]
+
+def test_logging_sink_logs_stages_and_counters(caplog):
+    with caplog.at_level(logging.DEBUG, logger="open_cv_library.metrics"):
+        with metrics.collect(LoggingSink()):
+            with metrics.stage("encode"):
+                pass
+            metrics.count("bytes_written", 42)
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert messages[0].startswith("stage encode: ") and messages[0].endswith(" ms")
+    assert messages[1] == "counter bytes_written: +42"
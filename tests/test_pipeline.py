@@ -0,0 +1,35 @@
+import cv2
+import numpy as np
+
+from open_cv_library import images, pipeline
+from open_cv_library.pipeline import ImagePipeline
+
+def test_a_chain_matches_the_operations_one_after_another(tmp_path, monkeypatch):
+    route_in = str(tmp_path / "in.png")
+    cv2.imwrite(route_in, np.random.default_rng(0).integers(0, 256, (90, 121, 3), dtype=np.uint8))
+
+    # Every operation on its own, through lossless PNG files
+    steps = [
+        lambda route_in, route_out: images.rotate_180_image(route_in, route_out),
+        lambda route_in, route_out: images.get_negative_colors(route_in, route_out),
+        lambda route_in, route_out: images.get_inverted_image(route_in, route_out, 'vertical'),
+        lambda route_in, route_out: images.get_image_blurred(route_in, route_out, (10, 30), (20, 60)),
+        lambda route_in, route_out: images.get_rectangle_with_coordinates(route_in, route_out, (5, 5), (50, 40),
+                                                                          (0, 255, 0)),
+        lambda route_in, route_out: images.get_gray_scale(route_in, route_out),
+    ]
+    route = route_in
+    for i, step in enumerate(steps):
+        step(route, str(tmp_path / f"step_{i}.png"))
+        route = str(tmp_path / f"step_{i}.png")
+
+    decoded, encoded = [], []
+    monkeypatch.setattr(pipeline, "load_image", lambda *args: decoded.append(args) or images.load_image(*args))
+    monkeypatch.setattr(pipeline, "save_image", lambda *args: encoded.append(args[1]) or images.save_image(*args))
+
+    (ImagePipeline().rotate_180().negative().inverted('vertical').blur((10, 30), (20, 60))
+     .rectangle((5, 5), (50, 40), (0, 255, 0)).gray().run(route_in, str(tmp_path / "chain.png")))
+
+    assert (len(decoded), encoded) == (1, [str(tmp_path / "chain.png")])
+    np.testing.assert_array_equal(cv2.imread(str(tmp_path / "chain.png"), cv2.IMREAD_UNCHANGED),
+                                  cv2.imread(route, cv2.IMREAD_UNCHANGED))
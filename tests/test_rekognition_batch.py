@@ -0,0 +1,88 @@
+import csv, json, os
+
+import cv2
+import numpy as np
+import pytest
+
+from aws_rekognition_library.batch import assign_outputs, read_manifest, run_manifest
+from resources.resources import images_aws_json_dir
+
+GROUP_JSON = os.path.join(images_aws_json_dir, "group.json")
+
+def write_image(route, level=128):
+    os.makedirs(os.path.dirname(route), exist_ok=True)
+    cv2.imwrite(route, np.full((120, 160, 3), level, np.uint8))
+    return route
+
+def write_csv(route, rows):
+    with open(route, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=["image", "json", "operation", "output", "save_json", "labels"])
+        writer.writeheader()
+        writer.writerows(rows)
+    return route
+
+def test_csv_and_jsonl_manifests_give_the_same_rows(tmp_path):
+    rows = [{"image": "a.jpg", "json": "a.json", "operation": "apply_labels", "labels": ["Ana", "Luis"]},
+            {"image": "b.jpg", "json": "b.json", "operation": "blur", "labels": []}]
+    write_csv(tmp_path / "manifest.csv", [dict(row, labels='|'.join(row["labels"])) for row in rows])
+    with open(tmp_path / "manifest.jsonl", 'w') as file:
+        file.write('\n'.join(json.dumps(row) for row in rows) + '\n\n')
+
+    from_csv = read_manifest(str(tmp_path / "manifest.csv"))
+    from_jsonl = read_manifest(str(tmp_path / "manifest.jsonl"))
+
+    assert [(row["image"], row["json"], row["operation"], row["labels"]) for row in from_csv] == \
+           [(row["image"], row["json"], row["operation"], row["labels"]) for row in from_jsonl]
+    assert from_csv[0]["labels"] == ["Ana", "Luis"] and from_csv[1]["labels"] == []
+
+def test_rows_without_the_required_columns_are_rejected(tmp_path):
+    write_csv(tmp_path / "manifest.csv", [{"image": "a.jpg", "operation": "blur"}])
+
+    with pytest.raises(ValueError, match="json"):
+        read_manifest(str(tmp_path / "manifest.csv"))
+
+def test_every_row_is_reported_and_errors_do_not_stop_the_manifest(tmp_path, capfd):
+    image = write_image(str(tmp_path / "in" / "a.png"))
+    manifest = write_csv(tmp_path / "manifest.csv", [
+        {"image": image, "json": GROUP_JSON, "operation": "square_face"},
+        {"image": image, "json": GROUP_JSON, "operation": "apply_labels", "labels": "Ana|Luis"},
+        {"image": image, "json": GROUP_JSON, "operation": "unknown"},
+        {"image": str(tmp_path / "in" / "missing.png"), "json": GROUP_JSON, "operation": "blur"},
+    ])
+    output_dir = str(tmp_path / "out")
+
+    summary = run_manifest(str(manifest), output_dir, workers=2)
+
+    assert (summary["rows"], summary["processed"], summary["errors"]) == (4, 2, 2)
+    assert [result["ok"] for result in summary["results"]] == [True, True, False, False]
+    assert "Invalid operation" in summary["results"][2]["error"]
+    assert "could not be read" in summary["results"][3]["error"]
+    with open(os.path.join(output_dir, "a_labels.json")) as file:
+        assert [face["Name"] for face in json.load(file)["FaceDetails"]][:3] == ["Ana", "Luis", ""]
+    with open(os.path.join(output_dir, "summary.json")) as file:
+        assert json.load(file)["errors"] == 2
+    assert "Labeled face data saved" not in capfd.readouterr().out
+
+def test_images_with_the_same_name_and_repeated_rows_get_their_own_outputs(tmp_path):
+    first = write_image(str(tmp_path / "in" / "a" / "x.png"), 10)
+    second = write_image(str(tmp_path / "in" / "b" / "x.png"), 200)
+    manifest = write_csv(tmp_path / "manifest.csv", [
+        {"image": first, "json": GROUP_JSON, "operation": "blur"},
+        {"image": second, "json": GROUP_JSON, "operation": "blur"},
+        {"image": second, "json": GROUP_JSON, "operation": "blur"},
+    ])
+
+    summary = run_manifest(str(manifest), str(tmp_path / "out"), workers=2)
+
+    outputs = [result["output"] for result in summary["results"]]
+    assert len(set(outputs)) == 3
+    assert outputs[:2] == [os.path.join(str(tmp_path / "out"), "a", "x_blur.jpg"),
+                           os.path.join(str(tmp_path / "out"), "b", "x_blur.jpg")]
+    assert cv2.imread(outputs[0])[0, 0, 0] < 50 and cv2.imread(outputs[1])[0, 0, 0] > 150
+
+def test_rows_that_give_the_same_output_are_rejected(tmp_path):
+    rows = [{"image": "a.jpg", "json": "a.json", "operation": "blur", "output": "out.jpg"},
+            {"image": "b.jpg", "json": "b.json", "operation": "blur", "output": "out"}]
+
+    with pytest.raises(ValueError, match="rows 0 and 1"):
+        assign_outputs(rows, str(tmp_path))
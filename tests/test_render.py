@@ -0,0 +1,38 @@
+import json, os
+
+import cv2
+import numpy as np
+import pytest
+
+from aws_rekognition_library.aws_images import get_square_on_faces, apply_labels_to_image
+from resources.resources import images_aws_json_dir
+
+# References rendered by get_square_on_faces and apply_labels_to_image before the face-table rendering layer (one
+# cv2.rectangle/putText per face from the JSON), on the same canvas and with the same names
+REFERENCES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "render")
+NAMES = [f"Person {i}" for i in range(1, 20)]
+
+def canvas():
+    y, x = np.mgrid[0:360, 0:480]
+    return np.stack([x * 255 // 479, y * 255 // 359, np.full_like(x, 96)], axis=2).astype(np.uint8)
+
+def reference(name):
+    return cv2.imread(os.path.join(REFERENCES, f"{name}.png"))
+
+@pytest.mark.parametrize("response", ["group", "family"])
+def test_square_on_faces_matches_the_reference(response):
+    image = get_square_on_faces(canvas(), os.path.join(images_aws_json_dir, f"{response}.json"))
+
+    np.testing.assert_array_equal(image, reference(f"{response}_square"))
+
+@pytest.mark.parametrize("response", ["group", "family"])
+def test_labels_match_the_reference(tmp_path, response):
+    json_route = os.path.join(images_aws_json_dir, f"{response}.json")
+    save_json = str(tmp_path / "labels.json")
+
+    image = apply_labels_to_image(canvas(), json_route, save_json, labels=NAMES)
+
+    np.testing.assert_array_equal(image, reference(f"{response}_labels"))
+    with open(save_json) as file:
+        faces = json.load(file)["FaceDetails"]
+    assert [face["Name"] for face in faces] == NAMES[:len(faces)]
@@ -0,0 +1,147 @@
+import asyncio, json, os, signal, socket
+
+import cv2
+import numpy as np
+
+from resources.resources import resources_in_dir
+from service import server
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+# An event loop without add_signal_handler, like the ones of Windows
+def test_serve_falls_back_to_signal_signal(monkeypatch):
+    def unsupported(self, *args):
+        raise NotImplementedError
+
+    monkeypatch.setattr(asyncio.SelectorEventLoop, "add_signal_handler", unsupported)
+    previous = signal.getsignal(signal.SIGTERM)
+
+    async def run():
+        serving = asyncio.ensure_future(server.serve("127.0.0.1", free_port(), workers=1))
+        while signal.getsignal(signal.SIGTERM) is previous and not serving.done():
+            await asyncio.sleep(0.05)
+
+        signal.getsignal(signal.SIGTERM)(signal.SIGTERM, None)
+        await asyncio.wait_for(serving, 30)
+
+    try:
+        asyncio.run(run())
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+def run_service(scenario, **kwargs):
+    async def run():
+        service = server.ImageService(workers=1, **kwargs)
+        _, port = await service.start("127.0.0.1", 0)
+        try:
+            return await scenario(service, port)
+        finally:
+            await service.stop()
+
+    return asyncio.run(run())
+
+# Sends a raw request and returns (status, headers, body) of the response
+async def exchange(port, data):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(data)
+        await writer.drain()
+
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip()
+
+        return status, headers, await reader.readexactly(int(headers["content-length"]))
+    finally:
+        writer.close()
+
+def post(target, body, headers=None):
+    headers = dict({"Content-Length": str(len(body))}, **(headers or {}))
+    head = [f"POST {target} HTTP/1.1", "Host: localhost", "Connection: close"]
+    head += [f"{key}: {value}" for key, value in headers.items() if value is not None]
+    return ("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + body
+
+def png(image):
+    return cv2.imencode('.png', image)[1].tobytes()
+
+def test_image_operations_return_the_encoded_result():
+    image = np.random.default_rng(0).integers(0, 256, (40, 60, 3), dtype=np.uint8)
+
+    status, headers, body = run_service(lambda service, port: exchange(port, post("/images/mirror?format=png",
+                                                                                   png(image))))
+
+    assert (status, headers["content-type"]) == (200, "image/png")
+    np.testing.assert_array_equal(cv2.imdecode(np.frombuffer(body, np.uint8), cv2.IMREAD_COLOR), image[:, ::-1])
+
+def test_faces_detect_returns_the_boxes():
+    with open(os.path.join(resources_in_dir, "B.jpg"), 'rb') as file:
+        data = file.read()
+
+    status, _, body = run_service(lambda service, port: exchange(port, post("/faces/detect?max_side=640", data)))
+
+    assert status == 200
+    faces = json.loads(body)["faces"]
+    assert faces and all(len(face) == 4 for face in faces)
+
+def test_rekognition_operations_read_a_multipart_body():
+    image = np.full((100, 100, 3), 128, np.uint8)
+    response = {"FaceDetails": [{"BoundingBox": {"Width": 0.5, "Height": 0.5, "Left": 0.25, "Top": 0.25}}]}
+    boundary = "test-boundary"
+    body = b"".join(f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n".encode() + value +
+                    b"\r\n" for name, value in (("image", png(image)), ("response", json.dumps(response).encode())))
+    body += f"--{boundary}--\r\n".encode()
+
+    status, _, payload = run_service(lambda service, port: exchange(port, post(
+        "/rekognition/square_face?format=png", body, {"Content-Type": f"multipart/form-data; boundary={boundary}"})))
+
+    assert status == 200
+    result = cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_COLOR)
+    assert result.shape == image.shape and not (result == image).all()
+
+def test_a_full_queue_answers_503_without_reading_the_body():
+    async def scenario(service, port):
+        # Without dispatchers nothing leaves the queue
+        for dispatcher in service.dispatchers:
+            dispatcher.cancel()
+        while not service.queue.full():
+            service.queue.put_nowait(None)
+
+        result = await exchange(port, post("/images/gray", b"", {"Content-Length": "1000000"}))
+        while not service.queue.empty():
+            service.queue.get_nowait()
+            service.queue.task_done()
+        return result
+
+    status, headers, _ = run_service(scenario, queue_size=1)
+
+    assert (status, headers["retry-after"]) == (503, "1")
+
+def test_bodies_without_length_or_over_the_limit_are_rejected():
+    async def scenario(service, port):
+        return [(await exchange(port, data))[0] for data in (
+            post("/images/gray", b"", {"Content-Length": None}),
+            post("/images/gray", b"", {"Content-Length": "5000"}),
+            post("/images/gray", b"", {"Content-Length": "many"}))]
+
+    assert run_service(scenario, max_body=1000) == [411, 413, 400]
+
+def test_chunked_bodies_are_read_and_malformed_chunk_sizes_are_rejected():
+    image = np.full((30, 40, 3), 200, np.uint8)
+    data = png(image)
+    chunks = b"".join(f"{len(part):x}\r\n".encode() + part + b"\r\n" for part in (data[:100], data[100:]))
+    chunks += b"0\r\n\r\n"
+    chunked = {"Content-Length": None, "Transfer-Encoding": "chunked"}
+
+    async def scenario(service, port):
+        return (await exchange(port, post("/images/negative?format=png", chunks, chunked)),
+                await exchange(port, post("/images/negative", b"zz\r\n" + data + b"\r\n0\r\n\r\n", chunked)))
+
+    (status, _, body), (malformed, _, _) = run_service(scenario)
+
+    assert (status, malformed) == (200, 400)
+    assert (cv2.imdecode(np.frombuffer(body, np.uint8), cv2.IMREAD_COLOR) == 55).all()
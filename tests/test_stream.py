@@ -0,0 +1,69 @@
+import json, os
+
+import cv2
+import numpy as np
+import pytest
+
+from aws_rekognition_library.stream import process_stream, read_checkpoint
+
+FACE = {"BoundingBox": {"Width": 0.25, "Height": 0.25, "Left": 0.25, "Top": 0.25}}
+
+def write_dump(tmp_path, lines):
+    image_dir = tmp_path / "images"
+    image_dir.mkdir()
+    cv2.imwrite(str(image_dir / "a.jpg"), np.full((80, 120, 3), 200, np.uint8))
+
+    dump_route = tmp_path / "dump.ndjson"
+    dump_route.write_text("".join(line + "\n" for line in lines))
+    return str(dump_route), str(image_dir)
+
+def record(image="a.jpg"):
+    return json.dumps({"Image": image, "FaceDetails": [FACE]})
+
+def test_malformed_records_are_errors_and_skipped(tmp_path):
+    dump_route, image_dir = write_dump(tmp_path, [record(), '{"Image": "a.jpg", "FaceDe', '[1, 2]', record()])
+    checkpoint_route = str(tmp_path / "checkpoint.json")
+    results = []
+
+    summary = process_stream(dump_route, image_dir, str(tmp_path / "out"), "blur", checkpoint_route,
+                             on_result=results.append)
+
+    assert (summary["processed"], summary["errors"]) == (2, 2)
+    assert [result["ok"] for result in results] == [True, False, False, True]
+    assert summary["end_offset"] == read_checkpoint(checkpoint_route) == os.path.getsize(dump_route)
+
+def test_an_interrupted_run_resumes_from_the_checkpoint(tmp_path):
+    dump_route, image_dir = write_dump(tmp_path, [record() for _ in range(5)])
+    checkpoint_route = str(tmp_path / "checkpoint.json")
+    seen = []
+
+    def crash_at_the_third(result):
+        seen.append(result)
+        if len(seen) == 3:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        process_stream(dump_route, image_dir, str(tmp_path / "out"), "blur", checkpoint_route, checkpoint_every=1,
+                       on_result=crash_at_the_third)
+
+    resumed = process_stream(dump_route, image_dir, str(tmp_path / "out"), "blur", checkpoint_route)
+
+    # The third record had no checkpoint yet, so it runs again
+    assert resumed["start_offset"] == seen[1]["offset"]
+    assert (resumed["processed"], resumed["errors"]) == (3, 0)
+    assert resumed["end_offset"] == read_checkpoint(checkpoint_route) == os.path.getsize(dump_route)
+
+def test_nested_keys_with_the_same_name_keep_their_folders(tmp_path):
+    dump_route, image_dir = write_dump(tmp_path, [record("a/x.jpg"), record("b/x.jpg"), record("../a.jpg")])
+    for folder, level in (("a", 40), ("b", 220)):
+        os.makedirs(os.path.join(image_dir, folder))
+        cv2.imwrite(os.path.join(image_dir, folder, "x.jpg"), np.full((80, 120, 3), level, np.uint8))
+    output_dir = tmp_path / "out"
+    results = []
+
+    summary = process_stream(dump_route, image_dir, str(output_dir), "square_face", on_result=results.append)
+
+    assert (summary["processed"], summary["errors"]) == (2, 1)
+    assert "outside" in results[2]["error"]
+    assert abs(int(cv2.imread(str(output_dir / "a" / "x.jpg"))[0, 0, 0]) - 40) < 5
+    assert abs(int(cv2.imread(str(output_dir / "b" / "x.jpg"))[0, 0, 0]) - 220) < 5
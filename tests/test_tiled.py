@@ -0,0 +1,43 @@
+import cv2
+import numpy as np
+import pytest
+
+from open_cv_library import tiled
+from open_cv_library.images import negative_action, gray_action, rotate_180_action
+
+WHOLE = {
+    "negative": lambda image: negative_action(image.copy()),
+    "gray": gray_action,
+    "blur": lambda image: cv2.GaussianBlur(image, (31, 31), 0),
+    "rotate_180": lambda image: rotate_180_action(image.copy()),
+}
+
+def params(operation):
+    return {"kernel": 31} if operation == "blur" else {}
+
+@pytest.fixture
+def image():
+    return np.random.default_rng(0).integers(0, 256, (300, 420, 3), dtype=np.uint8)
+
+@pytest.mark.parametrize("positioned_io", [True, False])
+@pytest.mark.parametrize("operation", list(WHOLE))
+def test_tiled_npy_matches_whole_image(tmp_path, monkeypatch, image, operation, positioned_io):
+    if positioned_io and not tiled.POSITIONED_IO:
+        pytest.skip("os.preadv/os.pwrite are not available")
+    monkeypatch.setattr(tiled, "POSITIONED_IO", positioned_io)
+
+    route_in, route_out = str(tmp_path / "in.npy"), str(tmp_path / "out.npy")
+    np.save(route_in, image)
+
+    tiled.process_tiled(route_in, route_out, operation, tile_size=128, workers=3, **params(operation))
+
+    np.testing.assert_array_equal(np.load(route_out), WHOLE[operation](image))
+
+@pytest.mark.parametrize("operation", list(WHOLE))
+def test_tiled_png_matches_whole_image(tmp_path, image, operation):
+    route_in, route_out = str(tmp_path / "in.png"), str(tmp_path / "out.png")
+    cv2.imwrite(route_in, image)
+
+    tiled.process_tiled(route_in, route_out, operation, tile_size=100, workers=2, **params(operation))
+
+    np.testing.assert_array_equal(cv2.imread(route_out, cv2.IMREAD_UNCHANGED), WHOLE[operation](image))
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from open_cv_library.tracking import FaceTracker, TemplateTracker
+
+BOX = (100, 80, 40, 40)
+
+# Cascade that always finds the same face and counts how many times it ran
+class FakeCascade:
+
+    def __init__(self):
+        self.calls = 0
+
+    def detectMultiScale(self, gray, *args, **kwargs):
+        self.calls += 1
+        return np.array([BOX])
+
+def frame(seed=0):
+    return np.random.default_rng(seed).integers(0, 256, (240, 320), dtype=np.uint8)
+
+def detected_frames(tracker, frames):
+    detected = []
+
+    for i, gray in enumerate(frames):
+        before = tracker.detections
+        tracker.update(None, gray)
+        if tracker.detections > before:
+            detected.append(i)
+
+    return detected
+
+@pytest.mark.parametrize("kind", ["template", "static"])
+def test_the_cascade_only_runs_on_keyframes(kind):
+    cascade = FakeCascade()
+    tracker = FaceTracker(cascade, keyframe_interval=5, tracker=kind)
+
+    assert detected_frames(tracker, [frame()] * 12) == [0, 5, 10]
+    assert cascade.calls == 3
+    assert tracker.update(None, frame()) == [BOX]
+
+# The static tracker never loses a face, so only the scene change can trigger the detection
+def test_a_scene_change_detects_again():
+    tracker = FaceTracker(FakeCascade(), keyframe_interval=100, tracker="static")
+    frames = [frame() // 4] * 3 + [frame() // 4 + 150] * 3
+
+    assert detected_frames(tracker, frames) == [0, 3]
+
+def test_a_lost_face_detects_again():
+    tracker = FaceTracker(FakeCascade(), keyframe_interval=100)
+    x, y, w, h = BOX
+    lost = frame()
+    lost[y - 20:y + h + 20, x - 20:x + w + 20] = 128
+
+    assert detected_frames(tracker, [frame(), frame(), lost, lost]) == [0, 2]
+
+    # The covered face barely changes the thumbnail: it was the tracker that noticed it
+    tracker.detect(frame())
+    assert not tracker.scene_changed(lost)
+
+def test_the_template_tracker_follows_a_moving_face():
+    tracker = TemplateTracker()
+    first = frame()
+    moved = np.roll(first, (6, -4), axis=(0, 1))
+
+    tracker.init(first, [BOX])
+
+    assert tracker.update(moved) == [(BOX[0] - 4, BOX[1] + 6, BOX[2], BOX[3])]
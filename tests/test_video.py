@@ -0,0 +1,38 @@
+import cv2
+import numpy as np
+import pytest
+
+from open_cv_library.video import VideoPipeline, synthetic_frames, is_live_source
+
+def write_video(route, count=30):
+    writer = cv2.VideoWriter(route, cv2.VideoWriter_fourcc(*"MJPG"), 30, (160, 120))
+    for i in range(count):
+        writer.write(np.full((120, 160, 3), i * 8, np.uint8))
+    writer.release()
+
+def test_recorded_sources_keep_every_frame(tmp_path):
+    route = str(tmp_path / "clip.avi")
+    write_video(route)
+    seen = []
+
+    stats = VideoPipeline(route, None, workers=2).run(lambda frame: seen.append(int(frame[0, 0, 0])))
+
+    assert (stats["processed"], stats["dropped"]) == (30, 0)
+    # Every frame arrives in order (MJPG shifts the levels by a few units)
+    assert all(abs(level - i * 8) <= 3 for i, level in enumerate(seen)) and len(seen) == 30
+
+def test_unpaced_iterables_keep_every_frame():
+    stats = VideoPipeline(synthetic_frames(count=40, size=(64, 48)), "blur_faces", workers=2).run()
+
+    assert (stats["processed"], stats["dropped"]) == (40, 0)
+
+def test_live_sources_drop_by_default():
+    assert is_live_source(0) and is_live_source("rtsp://camera/stream")
+    assert not is_live_source("clip.avi") and not is_live_source(iter([]))
+
+def test_a_failing_worker_does_not_block_the_capture():
+    def fail(frame, cascades):
+        raise RuntimeError("operation failed")
+
+    with pytest.raises(RuntimeError):
+        VideoPipeline(synthetic_frames(count=50, size=(64, 48)), fail, workers=2).run()
@@ -0,0 +1,126 @@
+import json, os, shutil
+
+import cv2
+import numpy as np
+import pytest
+
+from open_cv_library.watch import DirectoryWatcher
+
+def write_image(route, level):
+    os.makedirs(os.path.dirname(route), exist_ok=True)
+    cv2.imwrite(route, np.full((16, 16, 3), level, np.uint8))
+
+def bump_mtime(route, seconds=10):
+    stat = os.stat(route)
+    os.utime(route, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10 ** 9))
+
+@pytest.fixture
+def folders(tmp_path):
+    source, output_dir = str(tmp_path / "in"), str(tmp_path / "out")
+    write_image(os.path.join(source, "a.png"), 10)
+    write_image(os.path.join(source, "sub", "b.png"), 20)
+    return source, output_dir
+
+def watcher(source, output_dir, operation="get_negative_colors", **kwargs):
+    return DirectoryWatcher(source, operation, output_dir, workers=1, settle=0, **kwargs)
+
+def counts(report):
+    return {key: report[key] for key in ("processed", "unchanged", "touched", "hashed", "removed", "failed")}
+
+def test_new_files_are_processed_and_unchanged_ones_are_not_read(folders):
+    source, output_dir = folders
+    watch = watcher(source, output_dir)
+
+    assert counts(watch.scan()) == {"processed": 2, "unchanged": 0, "touched": 0, "hashed": 2, "removed": 0,
+                                    "failed": 0}
+    assert cv2.imread(os.path.join(output_dir, "sub", "b.png"))[0, 0, 0] == 235
+    assert counts(watch.scan()) == {"processed": 0, "unchanged": 2, "touched": 0, "hashed": 0, "removed": 0,
+                                    "failed": 0}
+    watch.close()
+
+def test_touched_files_are_hashed_but_not_processed(folders):
+    source, output_dir = folders
+    watch = watcher(source, output_dir)
+    watch.scan()
+
+    bump_mtime(os.path.join(source, "a.png"))
+    assert counts(watch.scan()) == {"processed": 0, "unchanged": 1, "touched": 1, "hashed": 1, "removed": 0,
+                                    "failed": 0}
+    assert watch.scan()["unchanged"] == 2
+    watch.close()
+
+def test_changed_files_refresh_their_output(folders):
+    source, output_dir = folders
+    watch = watcher(source, output_dir)
+    watch.scan()
+
+    write_image(os.path.join(source, "a.png"), 100)
+    bump_mtime(os.path.join(source, "a.png"))
+    assert counts(watch.scan()) == {"processed": 1, "unchanged": 1, "touched": 0, "hashed": 1, "removed": 0,
+                                    "failed": 0}
+    assert cv2.imread(os.path.join(output_dir, "a.png"))[0, 0, 0] == 155
+    watch.close()
+
+def test_removed_and_broken_inputs_lose_their_outputs(folders):
+    source, output_dir = folders
+    watch = watcher(source, output_dir)
+    watch.scan()
+
+    os.remove(os.path.join(source, "sub", "b.png"))
+    with open(os.path.join(source, "a.png"), 'wb') as file:
+        file.write(b"not an image")
+    bump_mtime(os.path.join(source, "a.png"))
+
+    report = watch.scan()
+    assert (report["removed"], report["failed"]) == (1, 1)
+    assert not os.path.exists(os.path.join(output_dir, "sub", "b.png"))
+    assert not os.path.exists(os.path.join(output_dir, "a.png"))
+    watch.close()
+
+def test_the_index_survives_a_restart_and_a_new_operation_reprocesses(folders):
+    source, output_dir = folders
+    watcher(source, output_dir).watch(once=True)
+
+    assert watcher(source, output_dir).watch(once=True)["unchanged"] == 2
+    assert watcher(source, output_dir, "get_gray_scale").watch(once=True)["processed"] == 2
+
+def test_files_still_being_written_wait_for_the_next_scan(folders):
+    source, output_dir = folders
+    watch = DirectoryWatcher(source, "get_negative_colors", output_dir, workers=1, settle=3600)
+
+    assert (watch.scan()["pending"], watch.scan()["processed"]) == (2, 0)
+    watch.close()
+
+def test_a_new_rekognition_response_refreshes_the_output(tmp_path):
+    source, output_dir = str(tmp_path / "in"), str(tmp_path / "out")
+    write_image(os.path.join(source, "a.png"), 10)
+    json_route = os.path.join(source, "a.json")
+    response = {"FaceDetails": [{"BoundingBox": {"Width": 0.5, "Height": 0.5, "Left": 0.25, "Top": 0.25}}]}
+    with open(json_route, 'w') as file:
+        json.dump(response, file)
+
+    watch = watcher(source, output_dir, "rekognition:square_face")
+    assert watch.scan()["processed"] == 1
+    assert watch.scan()["unchanged"] == 1
+
+    with open(json_route, 'w') as file:
+        json.dump({"FaceDetails": []}, file)
+    bump_mtime(json_route)
+    assert watch.scan()["processed"] == 1
+    assert (cv2.imread(os.path.join(output_dir, "a.png")) == 10).all()
+    watch.close()
+
+def test_rekognition_responses_are_read_from_the_mirrored_json_dir(tmp_path):
+    source, output_dir, json_dir = str(tmp_path / "in"), str(tmp_path / "out"), str(tmp_path / "json")
+    box = {"BoundingBox": {"Width": 0.5, "Height": 0.5, "Left": 0.25, "Top": 0.25}}
+    for folder, details in (("a", [box]), ("b", [])):
+        write_image(os.path.join(source, folder, "x.png"), 10)
+        os.makedirs(os.path.join(json_dir, folder))
+        with open(os.path.join(json_dir, folder, "x.json"), 'w') as file:
+            json.dump({"FaceDetails": details}, file)
+
+    watch = watcher(source, output_dir, "rekognition:square_face", json_dir=json_dir)
+    assert watch.scan()["processed"] == 2
+    assert not (cv2.imread(os.path.join(output_dir, "a", "x.png")) == 10).all()
+    assert (cv2.imread(os.path.join(output_dir, "b", "x.png")) == 10).all()
+    watch.close()